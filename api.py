@@ -0,0 +1,208 @@
+import json
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import tuple_
+
+from models import db, Area, Venue, Artist, Show
+from pagination import decode_cursor, encode_cursor
+from queries import search_criteria, venue_shows, artist_shows
+from genres import facets_select, genre_filter, unknown_genres
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+#----------------------------------------------------------------------------#
+# JSON API.
+#----------------------------------------------------------------------------#
+# Read-only endpoints over the same data as the html pages. ?fields= picks
+# the columns to SELECT, listings are keyset paginated with ?after= and the
+# response array is streamed from a server side cursor. Venue and artist
+# listings take ?genre= (repeatable, any of them matches) and ?area=, and
+# /facets counts them per genre.
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+VENUE_FIELDS = {name: getattr(Venue, name) for name in (
+    'id', 'name', 'city', 'state', 'area_id', 'address', 'phone', 'genres', 'image_link',
+    'facebook_link', 'website_link', 'seeking_talent', 'seeking_description',
+    'upcoming_shows_count', 'past_shows_count')}
+ARTIST_FIELDS = {name: getattr(Artist, name) for name in (
+    'id', 'name', 'city', 'state', 'area_id', 'phone', 'genres', 'image_link',
+    'facebook_link', 'website_link', 'seeking_venue', 'seeking_description',
+    'upcoming_shows_count', 'past_shows_count')}
+AREA_FIELDS = {name: getattr(Area, name) for name in (
+    'id', 'city', 'state', 'venue_count', 'artist_count')}
+SHOW_FIELDS = {
+    'id': Show.id,
+    'start_time': Show.start_time,
+    'venue_id': Show.venue_id,
+    'venue_name': Venue.name,
+    'venue_image_link': Venue.image_link,
+    'artist_id': Show.artist_id,
+    'artist_name': Artist.name,
+    'artist_image_link': Artist.image_link,
+}
+LISTING_FIELDS = ('id', 'name', 'city', 'state', 'upcoming_shows_count')
+SHOW_LISTING_FIELDS = ('id', 'start_time', 'venue_id', 'venue_name',
+                       'artist_id', 'artist_name', 'artist_image_link')
+
+# rows per chunk of a streamed response body
+STREAM_CHUNK_ROWS = 500
+
+
+class FieldError(ValueError):
+    pass
+
+
+def _json_default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError('{0!r} is not JSON serializable'.format(value))
+
+
+def dumps(value):
+    """Serialize value to json bytes; datetimes become ISO 8601 strings."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_json_default, separators=(',', ':')).encode()
+
+
+def requested_fields(available, default):
+    fields = request.args.get('fields')
+    if not fields:
+        return list(default)
+    fields = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise FieldError('Unknown fields: {0}'.format(', '.join(unknown)))
+    return fields
+
+
+def area_filter(model):
+    area_id = request.args.get('area', type=int)
+    return [] if area_id is None else [model.area_id == area_id]
+
+
+def requested_genres():
+    genres = request.args.getlist('genre')
+    unknown = unknown_genres(genres)
+    if unknown:
+        raise FieldError('Unknown genres: {0}'.format(', '.join(unknown)))
+    return genres
+
+
+@api.errorhandler(FieldError)
+def field_error(error):
+    return jsonify({'error': str(error)}), 400
+
+
+def stream_listing(available, default, sort_columns, select_from):
+    """Stream one keyset page of rows as {"data": [...], "next": cursor}."""
+    fields = requested_fields(available, default)
+    limit = max(1, min(request.args.get('limit', current_app.config['PAGE_SIZE'], type=int),
+                       current_app.config['API_MAX_LIMIT']))
+    after = decode_cursor(request.args.get('after'), sort_columns)
+    if after is None and request.args.get('after'):
+        raise FieldError('Invalid cursor')
+
+    # the sort key is selected after the requested fields to build the cursor
+    query = select_from(db.session.query(
+        *[available[field].label(field) for field in fields], *sort_columns))
+    if after is not None:
+        query = query.filter(tuple_(*sort_columns) > tuple_(*after))
+    # executed before the response starts, so that a failing query is an
+    # error response rather than a truncated body
+    rows = iter(query.order_by(*sort_columns).limit(limit + 1).yield_per(
+        current_app.config['STREAM_BATCH_SIZE']))
+
+    def generate():
+        yield b'{"data":['
+        chunk, count, last_key, has_more = [], 0, None, False
+        for row in rows:
+            if count == limit:
+                # the extra row fetched past the limit
+                has_more = True
+                break
+            chunk.append(dumps(dict(zip(fields, row[:len(fields)]))))
+            last_key = tuple(row[len(fields):])
+            count += 1
+            if len(chunk) == STREAM_CHUNK_ROWS:
+                yield (b',' if count > len(chunk) else b'') + b','.join(chunk)
+                chunk = []
+        if chunk:
+            yield (b',' if count > len(chunk) else b'') + b','.join(chunk)
+        yield b'],"next":' + dumps(encode_cursor(last_key) if has_more else None) + b'}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def facets(model):
+    """{"data": {genre: count}} over every row, or the names containing ?q=."""
+    search_term = request.args.get('q')
+    criteria = search_criteria(model, search_term) if search_term else []
+    row = db.session.execute(facets_select(model, *criteria)).one()
+    return jsonify({'data': row._asdict()})
+
+
+def detail(model, available, row_id, shows):
+    fields = requested_fields(available, available)
+    row = db.session.query(*[available[field].label(field) for field in fields]).filter(
+        model.id == row_id).first()
+    if row is None:
+        return jsonify({'error': 'Not found'}), 404
+    data = row._asdict()
+    past_shows, upcoming_shows = shows(row_id)
+    data['past_shows'] = past_shows
+    data['upcoming_shows'] = upcoming_shows
+    return Response(dumps(data), mimetype='application/json')
+
+
+@api.route('/venues')
+def venues():
+    genres = requested_genres()
+    return stream_listing(VENUE_FIELDS, LISTING_FIELDS, [Venue.name, Venue.id],
+                          lambda query: query.select_from(Venue).filter(
+                              *genre_filter(Venue, genres), *area_filter(Venue)))
+
+
+@api.route('/venues/facets')
+def venue_facets():
+    return facets(Venue)
+
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    return detail(Venue, VENUE_FIELDS, venue_id, venue_shows)
+
+
+@api.route('/artists')
+def artists():
+    genres = requested_genres()
+    return stream_listing(ARTIST_FIELDS, LISTING_FIELDS, [Artist.name, Artist.id],
+                          lambda query: query.select_from(Artist).filter(
+                              *genre_filter(Artist, genres), *area_filter(Artist)))
+
+
+@api.route('/artists/facets')
+def artist_facets():
+    return facets(Artist)
+
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    return detail(Artist, ARTIST_FIELDS, artist_id, artist_shows)
+
+
+@api.route('/areas')
+def areas():
+    return stream_listing(AREA_FIELDS, AREA_FIELDS, [Area.key, Area.state],
+                          lambda query: query.select_from(Area))
+
+
+@api.route('/shows')
+def shows():
+    return stream_listing(SHOW_FIELDS, SHOW_LISTING_FIELDS, [Show.start_time, Show.id],
+                          lambda query: query.select_from(Show).join(
+                              Artist, Show.artist_id == Artist.id).join(Venue, Show.venue_id == Venue.id))
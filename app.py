@@ -1,20 +1,41 @@
 #----------------------------------------------------------------------------#
 # Imports
 #----------------------------------------------------------------------------#
-from models import *
-from forms import *
+from models import db, Area, Venue, Artist, Show, ShowCard
+from forms import VenueForm, ArtistForm, ShowForm, states_list
+import counters
+import areas
+import assets
+import autocomplete
+import bulk
+import db_pool
+import export
+import partitions
+import show_cards
+from pagination import keyset_page
+from page_cache import MemoryBackend, PageCache
+from replicas import ReplicaSet
+from sql_stats import SQLStats
+from conditional import conditional
+from queries import search_by_name, search_facets_select, venue_shows, artist_shows
+from genres import facet_list, facets_select, genre_filter, selected_genres
+from api import api
+import click
 import json
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+from flask import Flask, render_template, stream_template, request, Response, flash, redirect, url_for, jsonify, abort, g
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask.cli import AppGroup
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import Form
 from flask_wtf.csrf import CSRFProtect
 import datetime
+from functools import lru_cache
+from itertools import groupby
+from jinja2 import FileSystemBytecodeCache
+import os
+from zoneinfo import ZoneInfo
 
 #----------------------------------------------------------------------------#
 # App Config.
@@ -25,9 +46,27 @@ app = Flask(__name__)
 
 moment = Moment(app)
 app.config.from_object('config')
+db_pool.init_app(app)
 db.init_app(app)
-migrate = Migrate(app, db)
+replica_set = ReplicaSet(app)
+sql_stats = SQLStats(app)
 csrf.init_app(app)
+page_cache = PageCache(app)
+app.register_blueprint(api)
+app.register_blueprint(export.exports)
+assets.init_app(app)
+
+# Flask-Migrate loads alembic, a fifth of the import time, and only the
+# `flask db` commands use it
+if os.environ.get('FLASK_RUN_FROM_CLI'):
+    from flask_migrate import Migrate
+    migrate = Migrate(app, db)
+
+# Compiled templates are kept on disk, so a fresh process loads them instead
+# of parsing them again; entries are keyed by source checksum.
+if app.config['TEMPLATE_CACHE_DIR']:
+    os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])
 
 #----------------------------------------------------------------------------#
 # models.
@@ -40,16 +79,103 @@ csrf.init_app(app)
 #----------------------------------------------------------------------------#
 
 
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
+@lru_cache(maxsize=None)
+def datetime_pattern(format, locale):
+    """Compiled babel pattern and parsed locale for a (format, locale) pair."""
+    import babel.dates
     if format == 'full':
         format = "EEEE MMMM, d, y 'at' h:mma"
     elif format == 'medium':
         format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale='en')
+    return babel.dates.parse_pattern(format), babel.Locale.parse(locale)
+
+
+def format_datetime(value, format='medium'):
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    timezone = app.config['DATETIME_TIMEZONE']
+    if timezone:
+        # naive values are in server local time, like datetime.now()
+        value = value.astimezone(ZoneInfo(timezone))
+    pattern, locale = datetime_pattern(format, app.config['DATETIME_LOCALE'])
+    return pattern.apply(value, locale)
 
 
 app.jinja_env.filters['datetime'] = format_datetime
+# the choices of the search pages' state filter
+app.jinja_env.globals['states_list'] = states_list
+
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+
+
+def venue_page_tags(venue_id):
+    """Cache tags of the pages that show venue_id's name or shows."""
+    artist_ids = db.session.query(Show.artist_id).filter(
+        Show.venue_id == venue_id).distinct()
+    return ['venue:{0}'.format(venue_id), 'venues', 'areas', 'shows'] + [
+        'artist:{0}'.format(artist_id) for artist_id, in artist_ids]
+
+
+def artist_page_tags(artist_id):
+    """Cache tags of the pages that show artist_id's name or shows."""
+    venue_ids = db.session.query(Show.venue_id).filter(
+        Show.artist_id == artist_id).distinct()
+    return ['artist:{0}'.format(artist_id), 'artists', 'areas', 'shows'] + [
+        'venue:{0}'.format(venue_id) for venue_id, in venue_ids]
+
+
+def row_state(model, row_id):
+    """ETag token and Last-Modified of a detail page, None if there is no row.
+
+    Loads the whole row, so the view's own primary key lookup is answered
+    from the session's identity map instead of a second query. The identity
+    map only holds weak references, so g keeps the row alive until then.
+    """
+    row = db.session.get(model, row_id)
+    g.setdefault('preloaded_rows', []).append(row)
+    return (row.version, row.updated_at) if row else None
+
+
+def listing_state_select(model):
+    # the count catches deletes, which leave max(updated_at) unchanged
+    return db.select(db.func.count(model.id), db.func.max(model.updated_at))
+
+
+def listing_token(row):
+    count, updated_at = row
+    return ('{0}|{1}'.format(count, updated_at), updated_at)
+
+
+def listing_state(model):
+    return listing_token(db.session.execute(listing_state_select(model)).one())
+
+
+def shows_state_select():
+    # deleting shows updates the counters, and so updated_at, of their
+    # venues and artists, so the three maxima cover every change to the page
+    return db.select(*[
+        db.select(db.func.max(model.updated_at)).scalar_subquery()
+        for model in (Show, Venue, Artist)])
+
+
+def shows_token(updated_ats):
+    updated_at = max((value for value in updated_ats if value is not None), default=None)
+    return ('|'.join(str(value) for value in updated_ats), updated_at)
+
+
+def shows_state():
+    return shows_token(db.session.execute(shows_state_select()).one())
+
+
+def touch_show_partners(model, show_column, partner_column, row_id):
+    """Bump the version of the model rows sharing shows with row_id, whose
+    pages display its name and image."""
+    db.session.query(model).filter(model.id.in_(
+        db.session.query(partner_column).filter(show_column == row_id))).update(
+        {model.version: model.version + 1}, synchronize_session=False)
+
 
 #----------------------------------------------------------------------------#
 # Controllers.
@@ -60,22 +186,125 @@ app.jinja_env.filters['datetime'] = format_datetime
 def index():
     return render_template('pages/home.html')
 
+#  Autocomplete
+#  ----------------------------------------------------------------
+
+
+@app.route('/api/autocomplete')
+def autocomplete_names():
+    kind = request.args.get('type', 'venue')
+    if kind not in autocomplete.indexes:
+        abort(400)
+    prefix = request.args.get('q', '')
+    if not prefix.strip():
+        return jsonify({'data': []})
+    index = autocomplete.indexes[kind]
+    index.refresh(app.config['AUTOCOMPLETE_CHECK_INTERVAL'])
+    matches = index.search(prefix, app.config['AUTOCOMPLETE_LIMIT'])
+    return jsonify({'data': [{'id': row_id, 'name': name} for row_id, name in matches]})
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(page_cache.stats())
+
+@app.route('/db/pool/stats')
+def pool_stats():
+    return jsonify(dict(db_pool.stats(db.engine), replicas=replica_set.stats()))
+
+#  Areas
+#  ----------------------------------------------------------------
+
+
+@app.route('/areas')
+@conditional(lambda: listing_state(Area))
+@page_cache.cached(lambda: ['areas'])
+def list_areas():
+
+    # areas in city order, from the (key, state) unique index, with their
+    # denormalized venue and artist counts
+    page = keyset_page(
+        db.session.query(Area.id, Area.city, Area.state, Area.key, Area.venue_count,
+                         Area.artist_count).filter(db.or_(Area.venue_count > 0, Area.artist_count > 0)),
+        [Area.key, Area.state],
+        lambda row: (row.key, row.state),
+        app.config['PAGE_SIZE'], request.args.get('after'), request.args.get('before'))
+    return render_template('pages/areas.html', areas=page.items, page=page)
+
+
+@app.route('/areas/<int:area_id>')
+@conditional(lambda area_id: row_state(Area, area_id))
+@page_cache.cached(lambda area_id: ['areas'])
+def show_area(area_id):
+
+    area = Area.query.get_or_404(area_id)
+    # the venues and artists by name, each list paged on its own with
+    # venues_after/venues_before and artists_after/artists_before cursors,
+    # from the (area_id, name, id) indexes
+    venues = keyset_page(
+        db.session.query(Venue.id, Venue.name, Venue.area_id).filter(Venue.area_id == area.id),
+        [Venue.area_id, Venue.name, Venue.id],
+        lambda row: (row.area_id, row.name, row.id),
+        app.config['PAGE_SIZE'], request.args.get('venues_after'), request.args.get('venues_before'))
+    artists = keyset_page(
+        db.session.query(Artist.id, Artist.name, Artist.area_id).filter(Artist.area_id == area.id),
+        [Artist.area_id, Artist.name, Artist.id],
+        lambda row: (row.area_id, row.name, row.id),
+        app.config['PAGE_SIZE'], request.args.get('artists_after'), request.args.get('artists_before'))
+    return render_template('pages/show_area.html', area=area, venues=venues, artists=artists)
+
 #  Venues
 #  ----------------------------------------------------------------
 
 
 @app.route('/venues')
+@conditional(lambda: listing_state(Venue))
+@page_cache.cached(lambda: ['venues'])
 def venues():
 
-    distinct_city_state_list = Venue.query.distinct(
-        Venue.city, Venue.state).all()
+    # one ordered query: venues of the same area are adjacent and can be
+    # grouped in python, show counts come from the denormalized counters
+    genres = selected_genres(request.args.getlist('genre'))
+    page = keyset_page(
+        db.session.query(Venue.id, Venue.name, Venue.city, Venue.state, Venue.area_id,
+                         Venue.upcoming_shows_count).filter(*genre_filter(Venue, genres)),
+        [Venue.city, Venue.state, Venue.name, Venue.id],
+        lambda row: (row.city, row.state, row.name, row.id),
+        app.config['PAGE_SIZE'], request.args.get('after'), request.args.get('before'))
+    return render_template('pages/venues.html', areas=venue_areas(page.items), page=page,
+                           facets=facet_list(listing_facet_counts(Venue), genres))
+
+
+# Genre counts of the whole /venues and /artists listings, by the listing
+# state behind the ETag: every page of a listing shows them, and counting
+# the table again for each cursor would cost far more than the page itself.
+listing_facets = MemoryBackend(max_entries=16)
+
+
+def listing_facets_key(model, token):
+    return '{0}|{1}'.format(model.__tablename__, token)
+
+
+def listing_facet_counts(model):
+    """The facets_select(model) row, counted once per listing state."""
+    token = g.get('validator_token')
+    counts = listing_facets.get(listing_facets_key(model, token)) if token else None
+    if counts is None:
+        counts = tuple(db.session.execute(facets_select(model)).one())
+        if token:
+            listing_facets.set(listing_facets_key(model, token), counts)
+    return counts
+
+
+def venue_areas(rows):
     data = []
-    for dcsl in distinct_city_state_list:
-        data.append({'city': dcsl.city, 'state': dcsl.state, 'venues': []})
-        for venue_city_state in Venue.query.filter(Venue.city == dcsl.city, Venue.state == dcsl.state).all():
-            data[-1]['venues'].append({'id': venue_city_state.id, 'name': venue_city_state.name,
-                                       'num_upcoming_shows': Show.query.filter(Show.venue_id == venue_city_state.id, Show.start_time > datetime.datetime.now()).count()})
-    return render_template('pages/venues.html', areas=data)
+    for (area_id, city, state), area_venues in groupby(
+            rows, key=lambda row: (row.area_id, row.city, row.state)):
+        data.append({'id': area_id, 'city': city, 'state': state, 'venues': [{
+            'id': venue.id,
+            'name': venue.name,
+            'num_upcoming_shows': venue.upcoming_shows_count
+        } for venue in area_venues]})
+    return data
 
 #  Search Venue
 #  ----------------------------------------------------------------
@@ -84,28 +313,37 @@ def venues():
 @app.route('/venues/search', methods=['POST'])
 def search_venues():
 
-    search_word = request.form.get('search_term', '')
-    venues = Venue.query.filter(Venue.name.ilike(
-        "%{0}%".format(search_word))).all()
-    response = {"count": len(venues), "data": []}
-    for venue in venues:
-        response['data'].append({'id': venue.id, 'name': venue.name,
-                                 'num_upcoming_shows': Show.query.filter(Show.venue_id == venue.id, Show.start_time > datetime.now()).count()})
+    search_term = request.form.get('search_term', '')
+    city, state = request.form.get('city'), request.form.get('state')
+    genres = selected_genres(request.form.getlist('genre'))
+    venues = search_by_name(Venue, search_term, city, state, genres)
+    counts = db.session.execute(search_facets_select(Venue, search_term, city, state, genres)).one()
+    return render_template('pages/search_venues.html', results=search_results(venues, counts.matches),
+                           search_term=search_term, city=city, state=state,
+                           facets=facet_list(counts, genres))
+
 
-    return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+def search_results(rows, count):
+    # count is of all the matches, of which rows are the best
+    # SEARCH_RESULTS_LIMIT
+    return {"count": count, "data": [{
+        'id': row.id, 'name': row.name, 'num_upcoming_shows': row.upcoming_shows_count
+    } for row in rows]}
 
 
 @app.route('/venues/<int:venue_id>')
+@conditional(lambda venue_id: row_state(Venue, venue_id))
+@page_cache.cached(lambda venue_id: ['venue:{0}'.format(venue_id)])
 def show_venue(venue_id):
 
-    venue = Venue.query.get(venue_id)
-    past_shows = db.session.query(Show).join(Artist).filter(Show.venue_id == venue.id).filter(
-        Show.start_time > datetime.datetime.now()
-    ).all()
-    upcoming_shows = db.session.query(Show).join(Artist).filter(Show.venue_id == venue.id).filter(
-        Show.start_time < datetime.datetime.now()
-    ).all()
-    data = {
+    venue = Venue.query.get_or_404(venue_id)
+    # the shows with just the artist columns the page needs, past and
+    # upcoming against a single snapshot of now, in one statement
+    return render_template('pages/show_venue.html', venue=venue_page_data(venue, *venue_shows(venue.id)))
+
+
+def venue_page_data(venue, past_shows, upcoming_shows):
+    return {
         "id": venue.id,
         "name": venue.name,
         "genres": venue.genres,
@@ -118,24 +356,12 @@ def show_venue(venue_id):
         "seeking_talent": venue.seeking_talent,
         "seeking_description": venue.seeking_description,
         "image_link": venue.image_link,
-        "past_shows": [{
-            'artist_id': show.artist_id,
-            'artist_name': show.show_artist.name,
-            'artist_image_link': show.show_artist.image_link,
-            'start_time': show.start_time.strftime("%m/%d/%Y, %H:%M:%S")
-        } for show in past_shows],
-        "upcoming_shows": [{
-            'artist_id': show.artist_id,
-            'artist_name': show.show_artist.name,
-            'artist_image_link': show.show_artist.image_link,
-            'start_time': show.start_time.strftime("%m/%d/%Y, %H:%M:%S")
-        } for show in upcoming_shows],
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
         "past_shows_count": len(past_shows),
         "upcoming_shows_count": len(upcoming_shows),
     }
 
-    return render_template('pages/show_venue.html', venue=data)
-
 #  Create Venue
 #  ----------------------------------------------------------------
 
@@ -155,8 +381,6 @@ def create_venue_submission():
                 name=request.form['name'],
                 genres=request.form.getlist('genres'),
                 address=request.form['address'],
-                city=request.form['city'],
-                state=request.form['state'],
                 phone=request.form['phone'],
                 facebook_link=request.form['facebook_link'],
                 image_link=request.form['image_link'],
@@ -164,8 +388,11 @@ def create_venue_submission():
                 seeking_talent=True if 'seeking_talent' in request.form else False,
                 seeking_description=request.form['seeking_description']
             )
+            areas.place(venue, request.form['city'], request.form['state'])
             db.session.add(venue)
             db.session.commit()
+            autocomplete.indexes['venue'].add(venue.id, venue.name)
+            page_cache.invalidate('venues', 'areas')
             flash('Venue ' + request.form['name'] +
                   ' was successfully listed!')
         except:
@@ -188,10 +415,16 @@ def create_venue_submission():
 
 @app.route('/venues/<venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
+    venue = Venue.query.get_or_404(venue_id)
     try:
-        venue = Venue.query.get(venue_id)
+        stale_pages = venue_page_tags(venue.id)
+        counters.shows_removed(Show.venue_id == venue.id)
+        show_cards.cards_removed(ShowCard.venue_id == venue.id)
+        areas.removed(venue)
         db.session.delete(venue)
         db.session.commit()
+        autocomplete.indexes['venue'].remove(venue.id)
+        page_cache.invalidate(*stale_pages)
         flash('Venue ' + venue.name + ' was successfully deleted!')
     except:
         db.session.rollback()
@@ -199,7 +432,7 @@ def delete_venue(venue_id):
               venue.name + ' could not be deletd.')
     finally:
         db.session.close()
-    return None
+    return redirect(url_for('index'))
 
 #  Update Venue
 #  ----------------------------------------------------------------
@@ -235,15 +468,18 @@ def edit_venue_submission(venue_id):
             venue.name = request.form['name']
             venue.genres = request.form.getlist('genres')
             venue.address = request.form['address']
-            venue.city = request.form['city']
-            venue.state = request.form['state']
+            areas.place(venue, request.form['city'], request.form['state'])
             venue.phone = request.form['phone']
             venue.facebook_link = request.form['facebook_link']
             venue.image_link = request.form['image_link']
             venue.website_link = request.form['website_link']
             venue.seeking_talent = True if 'seeking_talent' in request.form else False
             venue.seeking_description = request.form['seeking_description']
+            touch_show_partners(Artist, Show.venue_id, Show.artist_id, venue.id)
+            show_cards.venue_changed(venue)
             db.session.commit()
+            autocomplete.indexes['venue'].add(venue.id, venue.name)
+            page_cache.invalidate(*venue_page_tags(venue.id))
             flash('Venue ' + request.form['name'] +
                   ' was successfully edited!')
         except:
@@ -266,10 +502,18 @@ def edit_venue_submission(venue_id):
 
 
 @ app.route('/artists')
+@ conditional(lambda: listing_state(Artist))
+@ page_cache.cached(lambda: ['artists'])
 def artists():
 
-    data = Artist.query.all()
-    return render_template('pages/artists.html', artists=data)
+    genres = selected_genres(request.args.getlist('genre'))
+    page = keyset_page(
+        db.session.query(Artist.id, Artist.name).filter(*genre_filter(Artist, genres)),
+        [Artist.name, Artist.id],
+        lambda row: (row.name, row.id),
+        app.config['PAGE_SIZE'], request.args.get('after'), request.args.get('before'))
+    return render_template('pages/artists.html', artists=page.items, page=page,
+                           facets=facet_list(listing_facet_counts(Artist), genres))
 
 #  Search Artist
 #  ----------------------------------------------------------------
@@ -278,28 +522,27 @@ def artists():
 @ app.route('/artists/search', methods=['POST'])
 def search_artists():
 
-    search_word = request.form.get('search_term', '')
-    artists = Artist.query.filter(
-        Artist.name.ilike("%{0}%".format(search_word))).all()
-    response = {"count": len(artists), "data": []}
-    for artist in artists:
-        response['data'].append({'id': artist.id, 'name': artist.name,
-                                 'num_upcoming_shows': Show.query.filter(Show.artist_id == artist.id, Show.start_time > datetime.now()).count()})
-
-    return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
+    search_term = request.form.get('search_term', '')
+    city, state = request.form.get('city'), request.form.get('state')
+    genres = selected_genres(request.form.getlist('genre'))
+    artists = search_by_name(Artist, search_term, city, state, genres)
+    counts = db.session.execute(search_facets_select(Artist, search_term, city, state, genres)).one()
+    return render_template('pages/search_artists.html', results=search_results(artists, counts.matches),
+                           search_term=search_term, city=city, state=state,
+                           facets=facet_list(counts, genres))
 
 
 @ app.route('/artists/<int:artist_id>')
+@ conditional(lambda artist_id: row_state(Artist, artist_id))
+@ page_cache.cached(lambda artist_id: ['artist:{0}'.format(artist_id)])
 def show_artist(artist_id):
 
-    artist = Artist.query.get(artist_id)
-    past_shows = db.session.query(Show).join(Venue).filter(Show.artist_id == artist_id).filter(
-        Show.start_time > datetime.datetime.now()
-    ).all()
-    upcoming_shows = db.session.query(Show).join(Venue).filter(Show.artist_id == artist_id).filter(
-        Show.start_time < datetime.datetime.now()
-    ).all()
-    data = {
+    artist = Artist.query.get_or_404(artist_id)
+    return render_template('pages/show_artist.html', artist=artist_page_data(artist, *artist_shows(artist.id)))
+
+
+def artist_page_data(artist, past_shows, upcoming_shows):
+    return {
         "id": artist.id,
         "name": artist.name,
         "genres": artist.genres,
@@ -311,24 +554,12 @@ def show_artist(artist_id):
         "seeking_venue": artist.seeking_venue,
         "seeking_description": artist.seeking_description,
         "image_link": artist.image_link,
-        "past_shows": [{
-            'venue_id': show.venue_id,
-            'venue_name': show.show_venue.name,
-            'venue_image_link': show.show_venue.image_link,
-            'start_time': show.start_time.strftime("%m/%d/%Y, %H:%M:%S")
-        } for show in past_shows],
-        "upcoming_shows": [{
-            'venue_id': show.venue_id,
-            'venue_name': show.show_venue.name,
-            'venue_image_link': show.show_venue.image_link,
-            'start_time': show.start_time.strftime("%m/%d/%Y, %H:%M:%S")
-        } for show in upcoming_shows],
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
         "past_shows_count": len(past_shows),
         "upcoming_shows_count": len(upcoming_shows),
     }
 
-    return render_template('pages/show_artist.html', artist=data)
-
 #  Create Artist
 #  ----------------------------------------------------------------
 
@@ -347,8 +578,6 @@ def create_artist_submission():
             artist = Artist(
                 name=request.form['name'],
                 genres=request.form.getlist('genres'),
-                city=request.form['city'],
-                state=request.form['state'],
                 phone=request.form['phone'],
                 facebook_link=request.form['facebook_link'],
                 image_link=request.form['image_link'],
@@ -356,9 +585,11 @@ def create_artist_submission():
                 seeking_venue=True if 'seeking_venue' in request.form else False,
                 seeking_description=request.form['seeking_description']
             )
-
+            areas.place(artist, request.form['city'], request.form['state'])
             db.session.add(artist)
             db.session.commit()
+            autocomplete.indexes['artist'].add(artist.id, artist.name)
+            page_cache.invalidate('artists', 'areas')
             flash('Artist ' + request.form['name'] +
                   ' was successfully listed!')
         except:
@@ -381,10 +612,16 @@ def create_artist_submission():
 
 @ app.route('/artists/<artist_id>', methods=['DELETE'])
 def delete_artist(artist_id):
+    artist = Artist.query.get_or_404(artist_id)
     try:
-        artist = Artist.query.get(artist_id)
+        stale_pages = artist_page_tags(artist.id)
+        counters.shows_removed(Show.artist_id == artist.id)
+        show_cards.cards_removed(ShowCard.artist_id == artist.id)
+        areas.removed(artist)
         db.session.delete(artist)
         db.session.commit()
+        autocomplete.indexes['artist'].remove(artist.id)
+        page_cache.invalidate(*stale_pages)
         flash('artist ' + artist.name + ' was successfully deleted!')
     except:
         db.session.rollback()
@@ -392,7 +629,7 @@ def delete_artist(artist_id):
               artist.name + ' could not be deletd.')
     finally:
         db.session.close()
-    return None
+    return redirect(url_for('index'))
 
 
 #  Update
@@ -426,15 +663,18 @@ def edit_artist_submission(artist_id):
         try:
             artist.name = request.form['name']
             artist.genres = request.form.getlist('genres')
-            artist.city = request.form['city']
-            artist.state = request.form['state']
+            areas.place(artist, request.form['city'], request.form['state'])
             artist.phone = request.form['phone']
             artist.facebook_link = request.form['facebook_link']
             artist.image_link = request.form['image_link']
             artist.website_link = request.form['website_link']
             artist.seeking_venue = True if 'seeking_venue' in request.form else False
             artist.seeking_description = request.form['seeking_description']
+            touch_show_partners(Venue, Show.artist_id, Show.venue_id, artist.id)
+            show_cards.artist_changed(artist)
             db.session.commit()
+            autocomplete.indexes['artist'].add(artist.id, artist.name)
+            page_cache.invalidate(*artist_page_tags(artist.id))
             flash('Artist ' + request.form['name'] +
                   ' was successfully edited!')
         except:
@@ -456,20 +696,42 @@ def edit_artist_submission(artist_id):
 
 
 @ app.route('/shows')
+@ conditional(shows_state)
+@ page_cache.cached(lambda: ['shows'])
 def shows():
 
-    shows = db.session.query(Show).join(Artist).join(Venue).all()
-    data = [{
-            "venue_id": show.venue_id,
-            "venue_name": show.show_venue.name,
-            "artist_id": show.artist_id,
-            "artist_name": show.show_artist.name,
-            "artist_image_link": show.show_artist.image_link,
-            "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M:%S")
-            }
-            for show in shows]
-
-    return render_template('pages/shows.html', shows=data)
+    # one index ordered scan of the show cards, see show_cards.py
+    query = db.session.query(*show_card_columns())
+    if request.endpoint in app.config['STREAMED_ROUTES']:
+        # the whole listing, fetched from a server side cursor in batches and
+        # rendered as it arrives, so memory stays flat whatever the row count
+        rows = query.order_by(ShowCard.start_time, ShowCard.show_id).yield_per(
+            app.config['STREAM_BATCH_SIZE'])
+        return stream_template('pages/shows.html', shows=(show_tile(row) for row in rows), page=None)
+
+    page = keyset_page(
+        query,
+        [ShowCard.start_time, ShowCard.show_id],
+        lambda row: (row.start_time, row.show_id),
+        app.config['PAGE_SIZE'], request.args.get('after'), request.args.get('before'))
+    return render_template('pages/shows.html', shows=[show_tile(row) for row in page.items], page=page)
+
+
+def show_card_columns():
+    return (ShowCard.show_id, ShowCard.venue_id, ShowCard.venue_name, ShowCard.artist_id,
+            ShowCard.artist_name, ShowCard.artist_image_link, ShowCard.start_time)
+
+
+def show_tile(row):
+    show_id, venue_id, venue_name, artist_id, artist_name, artist_image_link, start_time = row
+    return {
+        "venue_id": venue_id,
+        "venue_name": venue_name,
+        "artist_id": artist_id,
+        "artist_name": artist_name,
+        "artist_image_link": artist_image_link,
+        "start_time": start_time
+    }
 
 
 @ app.route('/shows/create')
@@ -489,7 +751,13 @@ def create_show_submission():
             start_time=show_form.start_time.data
         )
         db.session.add(show)
+        counters.show_added(show)
+        db.session.flush()
+        show_cards.card_added(show)
         db.session.commit()
+        # /venues lists upcoming_shows_count
+        page_cache.invalidate('venue:{0}'.format(show.venue_id),
+                              'artist:{0}'.format(show.artist_id), 'venues', 'shows')
         flash('Show was successfully listed!')
     except:
         db.session.rollback()
@@ -520,6 +788,189 @@ if not app.debug:
     app.logger.addHandler(file_handler)
     app.logger.info('errors')
 
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+fyyur_cli = AppGroup('fyyur', help='Fyyur maintenance commands.')
+
+
+def counter_page_tags(venue_ids, artist_ids):
+    """Cache tags of the pages that show the counters of these rows."""
+    return ['venues', 'artists', 'areas'] + ['venue:{0}'.format(row_id) for row_id in venue_ids] + [
+        'artist:{0}'.format(row_id) for row_id in artist_ids]
+
+
+@fyyur_cli.command('roll-over-shows')
+def roll_over_shows_command():
+    """Move started shows from the upcoming to the past show counters."""
+    rolled = counters.roll_over_shows(rolled_over=lambda venue_ids, artist_ids: page_cache.invalidate(
+        *counter_page_tags(venue_ids, artist_ids)))
+    click.echo('{0} shows rolled over.'.format(rolled))
+
+
+@fyyur_cli.command('verify-counters')
+@click.option('--fix', is_flag=True, help='Overwrite drifted counters.')
+def verify_counters_command(fix):
+    """Recompute the show counters from scratch and report drift."""
+    drifted = {Venue: [], Artist: []}
+    for model in (Venue, Artist):
+        for row_id, upcoming, past, actual_upcoming, actual_past in counters.counter_drift(model, fix=fix):
+            drifted[model].append(row_id)
+            click.echo('{0} {1}: upcoming {2} (actual {3}), past {4} (actual {5})'.format(
+                model.__tablename__, row_id, upcoming, actual_upcoming, past, actual_past))
+    if fix:
+        page_cache.invalidate(*counter_page_tags(drifted[Venue], drifted[Artist]))
+    drifted = len(drifted[Venue]) + len(drifted[Artist])
+    pending = counters.pending_roll_over()
+    if pending:
+        click.echo('{0} started shows are waiting for roll-over-shows.'.format(pending))
+    click.echo('{0} rows drifted{1}.'.format(drifted, ', fixed' if fix and drifted else ''))
+    if drifted and not fix:
+        raise SystemExit(1)
+
+
+@fyyur_cli.command('verify-areas')
+@click.option('--fix', is_flag=True, help='Overwrite drifted counts.')
+def verify_areas_command(fix):
+    """Recount the venues and artists of every area and report drift."""
+    drifted = 0
+    for model in (Venue, Artist):
+        for area_id, count, actual in areas.area_drift(model, fix=fix):
+            drifted += 1
+            click.echo('Area {0}: {1} {2} (actual {3})'.format(
+                area_id, areas.COUNT_COLUMNS[model], count, actual))
+    if fix and drifted:
+        page_cache.invalidate('areas')
+    unplaced = sum(model.query.filter(model.area_id.is_(None)).count() for model in (Venue, Artist))
+    if unplaced:
+        click.echo('{0} venues and artists have no area.'.format(unplaced))
+    click.echo('{0} counts drifted{1}.'.format(drifted, ', fixed' if fix and drifted else ''))
+    if drifted and not fix:
+        raise SystemExit(1)
+
+
+@fyyur_cli.command('verify-show-cards')
+@click.option('--fix', is_flag=True, help='Refresh the drifted cards.')
+@click.option('--limit', default=100, show_default=True, help='Drifted shows to list at most.')
+def verify_show_cards_command(fix, limit):
+    """Compare the /shows cards with the Show, Venue and Artist tables."""
+    drift = show_cards.card_drift(limit=limit)
+    for show_id, problem in drift:
+        click.echo('show {0}: {1}'.format(show_id, problem))
+    if fix and drift:
+        deleted, inserted = show_cards.refresh_cards()
+        page_cache.invalidate('shows')
+        click.echo('{0} cards deleted, {1} inserted.'.format(deleted, inserted))
+    click.echo('{0}{1} shows drifted{2}.'.format(
+        'at least ' if len(drift) == limit else '', len(drift), ', fixed' if fix and drift else ''))
+    if drift and not fix:
+        raise SystemExit(1)
+
+
+@fyyur_cli.command('create-partitions')
+def create_partitions_command():
+    """Create the Show partitions of the coming months."""
+    created = partitions.create_partitions(app.config['SHOW_PARTITION_MONTHS_AHEAD'])
+    if created:
+        # shows moved out of the default partition
+        page_cache.clear()
+    click.echo('{0} partitions created{1}.'.format(
+        len(created), ': ' + ', '.join(created) if created else ''))
+
+
+@fyyur_cli.command('archive-shows')
+@click.option('--before', required=True, type=click.DateTime(['%Y-%m', '%Y-%m-%d']),
+              help='Archive the months that ended by this date.')
+def archive_shows_command(before):
+    """Fold the Show partitions of old months into the archive partition."""
+    try:
+        moved = partitions.archive_partitions(before)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint='--before')
+    page_cache.clear()
+    click.echo('{0} shows archived.'.format(moved))
+
+
+@fyyur_cli.command('import')
+@click.argument('entity', type=click.Choice(sorted(bulk.ENTITIES)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'format', type=click.Choice(['csv', 'ndjson']),
+              help='File format; guessed from the extension by default.')
+@click.option('--chunk-size', default=5000, show_default=True,
+              help='Records inserted and committed per transaction.')
+@click.option('--rejects', 'rejects_path', type=click.Path(dir_okay=False),
+              help='Where to write rejected records (default: PATH.rejects.ndjson).')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint of a previous run.')
+def import_command(entity, path, format, chunk_size, rejects_path, restart):
+    """Bulk load venues, artists or shows from a CSV or NDJSON file."""
+    result = bulk.import_file(entity, path, format=format, chunk_size=chunk_size,
+                              rejects_path=rejects_path, restart=restart, echo=click.echo)
+    if result['inserted']:
+        # new rows land on listings, areas and the pages of their partners
+        page_cache.clear()
+    click.echo('{records} records, {inserted} inserted, {rejected} rejected '
+               'in {seconds:.1f}s ({rows_per_second:.0f} rows/s).'.format(**result))
+
+
+@fyyur_cli.command('export')
+@click.argument('entity', type=click.Choice(sorted(export.ENTITIES)))
+@click.option('--format', 'format', type=click.Choice(export.FORMATS), default='ndjson',
+              show_default=True)
+@click.option('--since', type=click.DateTime(['%Y-%m-%d', '%Y-%m-%dT%H:%M:%S']),
+              help='Only rows created or updated after this time.')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--output', '-o', type=click.File('wb'), default='-',
+              help='Output file (default: stdout).')
+def export_command(entity, format, since, compress, output):
+    """Stream venues, artists or shows as NDJSON or CSV."""
+    columns, rows = export.export_rows(entity, since)
+    chunks = export.encode(columns, rows, format, app.config['STREAM_BATCH_SIZE'])
+    if compress:
+        chunks = export.gzipped(chunks)
+    for chunk in chunks:
+        output.write(chunk)
+
+
+@fyyur_cli.command('build-assets')
+def build_assets():
+    """Bundle, minify and fingerprint the static CSS and JS."""
+    assets.build(app, echo=click.echo)
+
+
+@fyyur_cli.command('compile-templates')
+def compile_templates_command():
+    """Compile every template into TEMPLATE_CACHE_DIR."""
+    click.echo('{0} templates compiled.'.format(compile_templates()))
+
+
+app.cli.add_command(fyyur_cli)
+
+#----------------------------------------------------------------------------#
+# Application factory.
+#----------------------------------------------------------------------------#
+# Entry point for pre-forking servers: gunicorn --preload 'app:create_app()'.
+# The master compiles every template and loads the autocomplete indexes
+# once, and the workers inherit them.
+# Each engine drops the pooled connections it had before a fork, so no two
+# processes share a socket.
+
+
+def compile_templates():
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def create_app():
+    compile_templates()
+    with app.app_context():
+        autocomplete.load_indexes()
+        engines = list(db.engines.values())
+    db_pool.dispose_after_fork(engines + [replica.engine for replica in replica_set.replicas])
+    return app
+
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
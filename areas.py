@@ -0,0 +1,131 @@
+from collections import Counter
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.dialects.postgresql import insert
+
+from models import db, Area, Venue, Artist
+
+#----------------------------------------------------------------------------#
+# Areas.
+#----------------------------------------------------------------------------#
+# Venues and artists point at an Area row, one per (city, state), keyed by
+# area_key(city): the city in lower case with runs of spaces, dots and
+# commas collapsed, so "New York" and "new  york " are the same area. The
+# create, edit and import paths call place(), which also respells the row's
+# city the way its area does, so near duplicates merge as they are written.
+#
+# Area.venue_count and Area.artist_count are kept in step in the same
+# transaction; area_drift() (flask fyyur verify-areas) recomputes them.
+
+COUNT_COLUMNS = {Venue: 'venue_count', Artist: 'artist_count'}
+
+
+def spelled(city):
+    return ' '.join(city.split())
+
+
+def resolve(places):
+    """{(city, state): (area id, area city)} for places, creating the
+    missing areas."""
+    places = sorted({(city, state) for city, state in places if city and state})
+    if not places:
+        return {}
+    # concurrent writers of the same area both end up with the one row
+    db.session.execute(insert(Area).values([
+        {'city': spelled(city), 'state': state} for city, state in places
+    ]).on_conflict_do_nothing(index_elements=['key', 'state']))
+    given = db.values(db.column('city', db.String), db.column('state', db.String),
+                      name='given').data(places)
+    rows = db.session.execute(db.select(given.c.city, given.c.state, Area.id, Area.city).join(
+        Area, db.and_(Area.key == db.func.area_key(given.c.city), Area.state == given.c.state)))
+    return {(city, state): (area_id, area_city) for city, state, area_id, area_city in rows}
+
+
+def _apply_deltas(model, deltas):
+    """Add deltas to the venue or artist counts of many areas at once.
+
+    A zero delta still bumps the area's version, for pages listing the
+    rows of the area.
+    """
+    if not deltas:
+        return
+    table = Area.__table__
+    column = table.c[COUNT_COLUMNS[model]]
+    stmt = update(table).where(table.c.id == bindparam('b_id')).values(
+        {column: column + bindparam('b_delta')})
+    db.session.execute(stmt, [{'b_id': area_id, 'b_delta': delta}
+                              for area_id, delta in sorted(deltas.items())])
+
+
+def place(row, city, state):
+    """Put row, a Venue or Artist, in the area of city and state, spelling
+    its city the way the area does. Call before commit."""
+    area_id, area_city = resolve([(city, state)]).get((city, state), (None, city))
+    deltas = Counter()
+    if row.area_id != area_id:
+        if row.area_id is not None:
+            deltas[row.area_id] -= 1
+        if area_id is not None:
+            deltas[area_id] += 1
+    elif area_id is not None:
+        deltas[area_id] += 0
+    _apply_deltas(type(row), deltas)
+    row.area_id, row.city, row.state = area_id, area_city, state
+
+
+def removed(row):
+    """Uncount row, a Venue or Artist about to be deleted."""
+    if row.area_id is not None:
+        _apply_deltas(type(row), {row.area_id: -1})
+
+
+def rows_bulk_added(model, rows):
+    """Place many new rows (dicts) at once, setting their area_id and city."""
+    areas = resolve((row['city'], row['state']) for row in rows)
+    deltas = Counter()
+    for row in rows:
+        area_id, row['city'] = areas.get((row['city'], row['state']), (None, row['city']))
+        row['area_id'] = area_id
+        if area_id is not None:
+            deltas[area_id] += 1
+    _apply_deltas(model, deltas)
+
+
+def backfill():
+    """Place every venue and artist without an area, set based, and
+    recount all areas; for rows written with plain SQL."""
+    db.session.execute(db.text('''
+        WITH spellings AS (
+            SELECT regexp_replace(btrim(city), '\\s+', ' ', 'g') AS city, state, count(*) AS n
+            FROM (SELECT city, state FROM "Venue" WHERE area_id IS NULL
+                  UNION ALL SELECT city, state FROM "Artist" WHERE area_id IS NULL) AS unplaced
+            WHERE city <> '' AND state <> ''
+            GROUP BY 1, 2)
+        INSERT INTO "Area" (city, state)
+        SELECT DISTINCT ON (area_key(city), state) city, state FROM spellings
+        ORDER BY area_key(city), state, n DESC, city
+        ON CONFLICT (key, state) DO NOTHING'''))
+    for table in ('Venue', 'Artist'):
+        db.session.execute(db.text('''
+            UPDATE "{0}" AS placed SET area_id = area.id, city = area.city FROM "Area" AS area
+            WHERE placed.area_id IS NULL AND area.key = area_key(placed.city) AND area.state = placed.state
+        '''.format(table)))
+    for model in COUNT_COLUMNS:
+        area_drift(model, fix=True)
+    db.session.commit()
+
+
+def area_drift(model, fix=False):
+    """Recount the venues or artists of every area and return the areas
+    that drifted, as (id, stored count, actual count). With fix=True the
+    stored counts are overwritten."""
+    stored = getattr(Area, COUNT_COLUMNS[model])
+    actual = db.func.count(model.id)
+    drift = db.session.query(Area.id, stored, actual).outerjoin(
+        model, model.area_id == Area.id).group_by(Area.id).having(
+        stored != actual).order_by(Area.id).all()
+    if fix and drift:
+        _apply_deltas(model, {area_id: count - stored_count
+                              for area_id, stored_count, count in drift})
+        db.session.commit()
+    return drift
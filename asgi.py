@@ -0,0 +1,276 @@
+import asyncio
+import datetime
+import io
+
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from flask import abort, make_response, render_template, request, session
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from werkzeug.exceptions import HTTPException
+
+from app import (app, show_card_columns, show_tile, venue_areas, search_results, venue_page_data, artist_page_data,
+                 listing_state_select, listing_token, shows_state_select, shows_token, listing_facets,
+                 listing_facets_key)
+from conditional import make_etag
+from models import Venue, Artist, ShowCard
+from pagination import decode_cursor, keyset_select, keyset_result
+from queries import search_select, search_facets_select, split_shows, venue_shows_select, artist_shows_select
+from genres import facet_list, facets_select, genre_filter, selected_genres
+
+#----------------------------------------------------------------------------#
+# Async read path.
+#----------------------------------------------------------------------------#
+# ASGI entry point (uvicorn asgi:application). The listing, search and
+# detail pages are served by coroutines on an asyncpg engine, running their
+# independent queries concurrently on separate connections (after the ETag
+# state, which the other queries must not be older than), so a worker
+# keeps serving while queries are in flight. Every other request, and the
+# routes in STREAMED_ROUTES, go to the Flask app on a thread pool.
+#
+# The coroutines run inside a Flask request context, which lives in the
+# request's own task, so templates, sessions, CSRF and error pages behave as
+# in app.py.
+
+ASYNC_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping')
+
+_engine = None
+
+
+def async_engine():
+    global _engine
+    if _engine is None:
+        url = make_url(app.config['SQLALCHEMY_DATABASE_URI']).set(drivername='postgresql+asyncpg')
+        options = {key: value for key, value in app.config['SQLALCHEMY_ENGINE_OPTIONS'].items()
+                   if key in ASYNC_POOL_OPTIONS}
+        connect_args = {}
+        if app.config['DB_STATEMENT_TIMEOUT']:
+            # asyncpg cancels the statement itself, which works through PgBouncer
+            connect_args['command_timeout'] = app.config['DB_STATEMENT_TIMEOUT'] / 1000
+        if app.config['DB_PGBOUNCER']:
+            # prepared statements don't survive transaction mode pooling
+            options['poolclass'] = NullPool
+            connect_args.update(statement_cache_size=0, prepared_statement_cache_size=0)
+        _engine = create_async_engine(url, connect_args=connect_args, **options)
+    return _engine
+
+
+async def fetch_all(statement):
+    async with async_engine().connect() as connection:
+        return (await connection.execute(statement)).all()
+
+
+async def fetch_one(statement):
+    async with async_engine().connect() as connection:
+        return (await connection.execute(statement)).one_or_none()
+
+
+def cursors(columns):
+    return (decode_cursor(request.args.get('after'), columns),
+            decode_cursor(request.args.get('before'), columns))
+
+
+def validated(response, token, last_modified):
+    if not session.get('_flashes'):
+        response.set_etag(make_etag(request.full_path, token))
+        if last_modified is not None:
+            response.last_modified = last_modified
+        response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(token):
+    return (not session.get('_flashes') and
+            request.if_none_match.contains(make_etag(request.full_path, token)))
+
+
+async def listing(state_select, token, statement, render, *extras):
+    """Fetch the page's ETag state, then statement and extras (functions of
+    the state token returning awaitables) concurrently, and render them.
+    The state is read first, so the ETag never describes newer rows than
+    the body it goes with (a 304 would pin the client to that body); a
+    matching If-None-Match skips the page."""
+    state = token(await fetch_one(state_select))
+    if not_modified(state[0]):
+        return validated(make_response('', 304), *state)
+    rows, *extra_rows = await asyncio.gather(
+        fetch_all(statement), *[extra(state[0]) for extra in extras])
+    return validated(make_response(render(rows, *extra_rows)), *state)
+
+
+def facet_counts(model):
+    """An extra for listing(): the facets_select(model) row, counted once
+    per listing state, as in app.listing_facet_counts."""
+    async def counts(token):
+        key = listing_facets_key(model, token)
+        row = listing_facets.get(key)
+        if row is None:
+            row = tuple(await fetch_one(facets_select(model)))
+            listing_facets.set(key, row)
+        return row
+    return counts
+
+
+async def venues():
+    columns = [Venue.city, Venue.state, Venue.name, Venue.id]
+    after, before = cursors(columns)
+    genres = selected_genres(request.args.getlist('genre'))
+    statement = keyset_select(
+        select(Venue.id, Venue.name, Venue.city, Venue.state, Venue.area_id,
+               Venue.upcoming_shows_count).where(
+            *genre_filter(Venue, genres)),
+        columns, app.config['PAGE_SIZE'], after, before)
+
+    def render(rows, facets):
+        page = keyset_result(rows, lambda row: (row.city, row.state, row.name, row.id),
+                             app.config['PAGE_SIZE'], after, before)
+        return render_template('pages/venues.html', areas=venue_areas(page.items), page=page,
+                               facets=facet_list(facets, genres))
+    return await listing(listing_state_select(Venue), listing_token, statement, render,
+                         facet_counts(Venue))
+
+
+async def artists():
+    columns = [Artist.name, Artist.id]
+    after, before = cursors(columns)
+    genres = selected_genres(request.args.getlist('genre'))
+    statement = keyset_select(select(Artist.id, Artist.name).where(*genre_filter(Artist, genres)),
+                              columns, app.config['PAGE_SIZE'], after, before)
+
+    def render(rows, facets):
+        page = keyset_result(rows, lambda row: (row.name, row.id), app.config['PAGE_SIZE'], after, before)
+        return render_template('pages/artists.html', artists=page.items, page=page,
+                               facets=facet_list(facets, genres))
+    return await listing(listing_state_select(Artist), listing_token, statement, render,
+                         facet_counts(Artist))
+
+
+async def shows():
+    columns = [ShowCard.start_time, ShowCard.show_id]
+    after, before = cursors(columns)
+    statement = keyset_select(
+        select(*show_card_columns()), columns, app.config['PAGE_SIZE'], after, before)
+
+    def render(rows):
+        page = keyset_result(rows, lambda row: (row.start_time, row.show_id), app.config['PAGE_SIZE'], after, before)
+        return render_template('pages/shows.html', shows=[show_tile(row) for row in page.items], page=page)
+    return await listing(shows_state_select(), shows_token, statement, render)
+
+
+async def search(model, template):
+    search_term = request.form.get('search_term', '')
+    city, state = request.form.get('city'), request.form.get('state')
+    genres = selected_genres(request.form.getlist('genre'))
+    rows, facets = await asyncio.gather(
+        fetch_all(search_select(model, search_term, city, state,
+                                app.config['SEARCH_RESULTS_LIMIT'], genres)),
+        fetch_one(search_facets_select(model, search_term, city, state, genres)))
+    return render_template(template, results=search_results(rows, facets.matches),
+                           search_term=search_term, city=city, state=state,
+                           facets=facet_list(facets, genres))
+
+
+async def search_venues():
+    return await search(Venue, 'pages/search_venues.html')
+
+
+async def search_artists():
+    return await search(Artist, 'pages/search_artists.html')
+
+
+async def detail(model, row_id, shows_select, page_data, template, name):
+    # the row doubles as the ETag state, so it is read before the shows,
+    # as in listing()
+    now = datetime.datetime.now()
+    row = await fetch_one(select(*model.__table__.columns).where(model.id == row_id))
+    if row is None:
+        abort(404)
+    if not_modified(row.version):
+        return validated(make_response('', 304), row.version, row.updated_at)
+    shows = await fetch_all(shows_select(row_id, now))
+    return validated(make_response(render_template(
+        template, **{name: page_data(row, *split_shows(shows))})), row.version, row.updated_at)
+
+
+async def show_venue(venue_id):
+    return await detail(Venue, venue_id, venue_shows_select, venue_page_data,
+                        'pages/show_venue.html', 'venue')
+
+
+async def show_artist(artist_id):
+    return await detail(Artist, artist_id, artist_shows_select, artist_page_data,
+                        'pages/show_artist.html', 'artist')
+
+
+VIEWS = {
+    'venues': venues,
+    'artists': artists,
+    'shows': shows,
+    'search_venues': search_venues,
+    'search_artists': search_artists,
+    'show_venue': show_venue,
+    'show_artist': show_artist,
+}
+
+#----------------------------------------------------------------------------#
+# ASGI application.
+#----------------------------------------------------------------------------#
+
+wsgi_application = WSGIMiddleware(app, workers=app.config['ASGI_WSGI_THREADS'])
+url_adapter = app.url_map.bind('localhost')
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def dispatch(view, kwargs):
+    """Run view the way Flask's full_dispatch_request runs a sync one."""
+    try:
+        try:
+            rv = app.preprocess_request()
+            if rv is None:
+                rv = await view(**kwargs)
+        except Exception as error:
+            rv = app.handle_user_exception(error)
+        return app.finalize_request(rv)
+    except Exception as error:
+        return app.handle_exception(error)
+
+
+async def send_response(send, response):
+    body = b'' if response.status_code == 304 else response.get_data()
+    if response.status_code != 304:
+        response.headers['Content-Length'] = str(len(body))
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in response.headers.items()],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['method'] in ('GET', 'POST'):
+        try:
+            endpoint, kwargs = url_adapter.match(scope['path'], scope['method'])
+        except HTTPException:
+            endpoint = None
+        view = VIEWS.get(endpoint)
+        if view is not None and endpoint not in app.config['STREAMED_ROUTES']:
+            body = await read_body(receive)
+            environ = build_environ(scope, io.BytesIO(body))
+            # the body is already buffered, chunked or not
+            environ['CONTENT_LENGTH'] = str(len(body))
+            with app.request_context(environ):
+                response = await dispatch(view, kwargs)
+            return await send_response(send, response)
+    await wsgi_application(scope, receive, send)
@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+from flask import Blueprint, abort, current_app, request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#----------------------------------------------------------------------------#
+# Static asset bundles.
+#----------------------------------------------------------------------------#
+# `flask fyyur build-assets` joins the stylesheets and scripts of the main
+# layout into one file each, minifies them, names them after a hash of their
+# content and writes gzip and brotli copies next to them in ASSETS_FOLDER.
+# Templates link bundles through asset_urls(), which returns the hashed URL
+# once the bundle is built and the source files until then. A hashed URL
+# never changes content, so /assets/ serves it as immutable for a year, in
+# the best encoding the client accepts.
+
+BUNDLES = {
+    'site.css': ['css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css',
+                 'css/main.responsive.css', 'css/main.quickfix.css'],
+    'head.js': ['js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js'],
+    # deferred, in the order the separate tags ran
+    'site.js': ['js/script.js', 'js/libs/bootstrap-3.1.1.min.js', 'js/plugins.js'],
+}
+MANIFEST = 'manifest.json'
+# (Accept-Encoding token, file suffix), best first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+CSS_TOKEN = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/)', re.S)
+CSS_URL = re.compile(r'url\(\s*([\'"]?)(.*?)\1\s*\)')
+
+assets = Blueprint('assets', __name__, url_prefix='/assets')
+
+
+def minify_css(text):
+    """Drop comments (but /*! license */ ones) and redundant whitespace,
+    leaving strings alone."""
+    def keep(match):
+        token = match.group(0)
+        return token if not token.startswith('/*') or token.startswith('/*!') else ''
+    # comments go first, so the whitespace on both sides collapses together
+    parts = CSS_TOKEN.split(CSS_TOKEN.sub(keep, text))
+    for number in range(0, len(parts), 2):
+        part = re.sub(r'\s+', ' ', parts[number])
+        part = re.sub(r'\s*([{};])\s*', r'\1', part)
+        parts[number] = part.replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def minify_js(text):
+    """Drop indentation, blank lines and whole line // comments.
+
+    Anything more needs a JavaScript parser; the libraries are shipped
+    minified already.
+    """
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+def absolute_urls(css, source, static_url):
+    """Point the relative url()s of source at static_url, as the bundle
+    lives elsewhere."""
+    def rewrite(match):
+        url = match.group(2)
+        if not url or url.startswith(('/', '#', 'data:', 'http:', 'https:')):
+            return match.group(0)
+        path, rest = re.match(r'([^?#]*)(.*)', url).groups()
+        path = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+        return 'url("{0}/{1}{2}")'.format(static_url, path, rest)
+    return CSS_URL.sub(rewrite, css)
+
+
+def bundle(name, sources, static_folder, static_url):
+    parts = []
+    for source in sources:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+            text = f.read()
+        if name.endswith('.css'):
+            parts.append(minify_css(absolute_urls(text, source, static_url)))
+        else:
+            parts.append(minify_js(text))
+    # a script without a trailing semicolon must not run into the next one
+    return ('\n' if name.endswith('.css') else '\n;\n').join(parts).encode('utf-8')
+
+
+def build(app, echo=print):
+    """Write every bundle, its compressed copies and the manifest.
+
+    Bundles of earlier builds are left in place for pages rendered before
+    a deploy; delete ASSETS_FOLDER to clear them.
+    """
+    folder = app.config['ASSETS_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        data = bundle(name, sources, app.static_folder, app.static_url_path)
+        stem, extension = os.path.splitext(name)
+        filename = '{0}.{1}{2}'.format(stem, hashlib.sha256(data).hexdigest()[:12], extension)
+        copies = {'': data, '.gz': gzip.compress(data, 9, mtime=0)}
+        if brotli is not None:
+            copies['.br'] = brotli.compress(data, quality=11)
+        for suffix, content in copies.items():
+            with open(os.path.join(folder, filename + suffix), 'wb') as f:
+                f.write(content)
+        manifest[name] = filename
+        echo('{0}: {1} bytes, {2}'.format(filename, len(data), ', '.join(
+            '{0} {1}'.format(suffix[1:], len(content)) for suffix, content in copies.items() if suffix)))
+    if brotli is None:
+        echo('brotli is not installed, only gzip copies were written.')
+    with open(os.path.join(folder, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def manifest():
+    """{bundle name: hashed filename} of the last build, read once per process."""
+    app = current_app._get_current_object()
+    if 'assets_manifest' not in app.extensions:
+        try:
+            with open(os.path.join(app.config['ASSETS_FOLDER'], MANIFEST)) as f:
+                app.extensions['assets_manifest'] = json.load(f)
+        except FileNotFoundError:
+            app.extensions['assets_manifest'] = {}
+    return app.extensions['assets_manifest']
+
+
+def asset_urls(name):
+    """URLs to link for bundle name: the built bundle, or its sources."""
+    filename = manifest().get(name)
+    if filename is not None:
+        return [url_for('assets.asset', filename=filename)]
+    return [url_for('static', filename=source) for source in BUNDLES[name]]
+
+
+@assets.route('/<path:filename>')
+def asset(filename):
+    folder = current_app.config['ASSETS_FOLDER']
+    path = safe_join(folder, filename)
+    if path is None or filename == MANIFEST or not os.path.isfile(path):
+        abort(404)
+    encoding, suffix = None, ''
+    for token, candidate in ENCODINGS:
+        if request.accept_encodings[token] and os.path.isfile(path + candidate):
+            encoding, suffix = token, candidate
+            break
+    response = send_from_directory(folder, filename + suffix,
+                                   mimetype=mimetypes.guess_type(filename)[0],
+                                   max_age=current_app.config['ASSETS_MAX_AGE'])
+    if encoding is not None:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    app.register_blueprint(assets)
+    app.add_template_global(asset_urls)
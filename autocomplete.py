@@ -0,0 +1,149 @@
+from bisect import bisect_left, insort
+import datetime
+import threading
+import time
+
+from models import db, Venue, Artist
+
+#----------------------------------------------------------------------------#
+# Autocomplete.
+#----------------------------------------------------------------------------#
+# In-process prefix index of venue and artist names. Lookups are a bisect
+# into a sorted array, so the search box doesn't have to reach Postgres.
+# Each worker process holds its own copy, loaded by create_app() (or the
+# first lookup) and kept current by the create/edit/delete handlers in
+# app.py. Rows added or renamed by other workers or by a bulk import are
+# read by their name_updated_at, which only renames and inserts set (not the
+# counter updates that bump updated_at), and applied in place; a row count
+# that disagrees with the index means deletes elsewhere, and a reload. Both
+# are checked at most every AUTOCOMPLETE_CHECK_INTERVAL seconds.
+
+# renames are read again for this long after the last one seen, so those of
+# transactions that were still open then (now() is their start) are not lost
+CHANGE_SLACK = datetime.timedelta(minutes=1)
+# at least this many changed rows, or this fraction of the index, and the
+# index is reloaded whole, cheaper than as many sorted inserts
+RELOAD_CHANGES = 1000
+RELOAD_FRACTION = 0.1
+
+
+class PrefixIndex:
+
+    def __init__(self, model):
+        self.model = model
+        self._keys = []
+        self._names = {}
+        self._lock = threading.Lock()
+        # held while the table is read, so one thread (re)loads at a time
+        self._load_lock = threading.Lock()
+        self.loaded = False
+        # the name_updated_at up to which changes are applied
+        self.changed_until = None
+        self.checked_at = None
+
+    @staticmethod
+    def _fold(name):
+        return ' '.join((name or '').split()).casefold()
+
+    def load(self, rows):
+        """Replace the index contents with (id, name) rows."""
+        names = {row_id: name for row_id, name in rows}
+        keys = sorted((self._fold(name), row_id) for row_id, name in names.items())
+        with self._lock:
+            self._names = names
+            self._keys = keys
+            self.loaded = True
+
+    def refresh(self, interval=0):
+        """Load the index, or apply the changes made since by other
+        processes, unless it was checked in the last interval seconds.
+        Until the first load completes, callers wait for it; after that,
+        they keep using the current contents while another thread checks."""
+        if self._checked_within(interval):
+            return
+        if not self._load_lock.acquire(blocking=not self.loaded):
+            return
+        try:
+            if self._checked_within(interval):
+                return
+            if not self.loaded or not self._apply_changes():
+                self._reload()
+            self.checked_at = time.monotonic()
+        finally:
+            self._load_lock.release()
+
+    def _reload(self):
+        model = self.model
+        self.changed_until = db.session.query(db.func.max(model.name_updated_at)).scalar()
+        self.load(db.session.query(model.id, model.name).yield_per(10000))
+
+    def _apply_changes(self):
+        """Apply the rows added or renamed since changed_until; False if
+        the index needs a reload instead."""
+        model = self.model
+        limit = max(RELOAD_CHANGES, int(len(self._names) * RELOAD_FRACTION))
+        query = db.session.query(model.id, model.name, model.name_updated_at)
+        if self.changed_until is not None:
+            query = query.filter(model.name_updated_at >= self.changed_until - CHANGE_SLACK)
+        rows = query.limit(limit).all()
+        if len(rows) == limit:
+            return False
+        for row_id, name, name_updated_at in rows:
+            if self._names.get(row_id, self) != name:
+                self.add(row_id, name)
+            self.changed_until = max(self.changed_until or name_updated_at, name_updated_at)
+        return db.session.query(db.func.count(model.id)).scalar() == len(self._names)
+
+    def _checked_within(self, interval):
+        return self.checked_at is not None and time.monotonic() - self.checked_at < interval
+
+    def add(self, row_id, name):
+        with self._lock:
+            if not self.loaded:
+                return
+            self._discard(row_id)
+            self._names[row_id] = name
+            insort(self._keys, (self._fold(name), row_id))
+
+    def remove(self, row_id):
+        with self._lock:
+            if self.loaded:
+                self._discard(row_id)
+
+    def _discard(self, row_id):
+        name = self._names.pop(row_id, None)
+        if name is None:
+            return
+        key = (self._fold(name), row_id)
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+
+    def search(self, prefix, limit=10):
+        """Up to limit (id, name) pairs whose name starts with prefix."""
+        prefix = self._fold(prefix)
+        results = []
+        with self._lock:
+            position = bisect_left(self._keys, (prefix,))
+            while len(results) < limit and position < len(self._keys):
+                key, row_id = self._keys[position]
+                if not key.startswith(prefix):
+                    break
+                results.append((row_id, self._names[row_id]))
+                position += 1
+        return results
+
+    def __len__(self):
+        return len(self._keys)
+
+
+indexes = {
+    'venue': PrefixIndex(Venue),
+    'artist': PrefixIndex(Artist),
+}
+
+
+def load_indexes():
+    """Load every index now, e.g. before forking workers."""
+    for index in indexes.values():
+        index.refresh()
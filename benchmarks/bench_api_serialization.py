@@ -0,0 +1,85 @@
+"""Payload size and serialization time of /api/v1 listings.
+
+Serializes synthetic show and venue rows the way api.stream_listing does,
+with orjson (when installed) and the stdlib json fallback, for the full
+row and for a ?fields= projection:
+
+    python benchmarks/bench_api_serialization.py [rows]
+"""
+import datetime
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api
+
+REPEAT = 5
+
+
+def stdlib_dumps(value):
+    return json.dumps(value, default=api._json_default, separators=(',', ':')).encode()
+
+
+def make_rows(count):
+    now = datetime.datetime.now()
+    shows = [{
+        'id': i,
+        'start_time': now + datetime.timedelta(minutes=i),
+        'venue_id': i % 5000,
+        'venue_name': 'The Musical Hop {0}'.format(i % 5000),
+        'artist_id': i % 20000,
+        'artist_name': 'Guns N Petals {0}'.format(i % 20000),
+        'artist_image_link': 'https://images.unsplash.com/photo-1549213783-8284d0336c4f?w=300&q=80',
+    } for i in range(count)]
+    venues = [{
+        'id': i,
+        'name': 'The Musical Hop {0}'.format(i),
+        'city': 'San Francisco',
+        'state': 'CA',
+        'address': '{0} Valencia St'.format(i),
+        'phone': '123-123-1234',
+        'genres': ['Jazz', 'Reggae', 'Swing', 'Classical', 'Folk'],
+        'image_link': 'https://images.unsplash.com/photo-1543900694-133f37abaaa5?w=400&q=60',
+        'facebook_link': 'https://www.facebook.com/TheMusicalHop',
+        'website_link': 'https://www.themusicalhop.com',
+        'seeking_talent': True,
+        'seeking_description': 'We are on the lookout for a local artist to play every two weeks.',
+        'upcoming_shows_count': 3,
+        'past_shows_count': 12,
+    } for i in range(count)]
+    return {'shows': shows, 'venues': venues}
+
+
+def body(rows, fields, dumps):
+    return b'{"data":[' + b','.join(
+        dumps({field: row[field] for field in fields}) for row in rows) + b']}'
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    datasets = make_rows(count)
+    serializers = [('json', stdlib_dumps)]
+    if api.orjson is not None:
+        serializers.append(('orjson', api.orjson.dumps))
+    cases = [
+        ('shows', list(api.SHOW_LISTING_FIELDS)),
+        ('shows', ['id', 'start_time']),
+        ('venues', list(api.VENUE_FIELDS)),
+        ('venues', list(api.LISTING_FIELDS)),
+        ('venues', ['id', 'name']),
+    ]
+    print('{0} rows per payload'.format(count))
+    for dataset, fields in cases:
+        rows = datasets[dataset]
+        for name, dumps in serializers:
+            size = len(body(rows, fields, dumps))
+            best = min(timeit.repeat(lambda: body(rows, fields, dumps), number=1, repeat=REPEAT))
+            print('{0:<7} {1:<3} fields {2:<7} {3:9.1f} KiB {4:8.1f} ms {5:6.2f} us/row'.format(
+                dataset, len(fields), name, size / 1024, best * 1e3, best / count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
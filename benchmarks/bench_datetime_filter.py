@@ -0,0 +1,54 @@
+"""Per-row cost of formatting show times for the listing templates.
+
+Compares the old path (strftime in the view, dateutil parse and babel
+format in the filter) with the current datetime filter on 10k shows:
+
+    python benchmarks/bench_datetime_filter.py
+"""
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import babel.dates
+import dateutil.parser
+
+from app import app, format_datetime
+
+ROWS = 10000
+REPEAT = 5
+
+
+def old_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+def old_path(start_times):
+    for start_time in start_times:
+        old_format_datetime(start_time.strftime("%m/%d/%Y, %H:%M:%S"), 'full')
+
+
+def new_path(start_times):
+    for start_time in start_times:
+        format_datetime(start_time, 'full')
+
+
+def main():
+    now = datetime.datetime.now()
+    start_times = [now + datetime.timedelta(minutes=17 * i) for i in range(ROWS)]
+    with app.app_context():
+        for name, path in (('before', old_path), ('after', new_path)):
+            best = min(timeit.repeat(lambda: path(start_times), number=1, repeat=REPEAT))
+            print('{0:<7} {1:8.2f} us/row  ({2:.3f} s for {3} rows)'.format(
+                name, best / ROWS * 1e6, best, ROWS))
+
+
+if __name__ == '__main__':
+    main()
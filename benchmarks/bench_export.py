@@ -0,0 +1,64 @@
+"""Throughput and peak memory of `flask fyyur export`.
+
+Exports a table of the configured database to a counting sink in each
+format, with and without gzip. For the 10M row figure, load a scratch
+database with e.g.
+
+    INSERT INTO "Show" (venue_id, artist_id, start_time, counted_as_past)
+    SELECT 1 + i % 1000, 1 + i % 5000, now() + i * interval '1 minute', false
+    FROM generate_series(1, 10000000) AS i;
+
+then run:
+
+    python benchmarks/bench_export.py [entity]
+"""
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+import export
+
+
+def run(entity, format, compress):
+    with app.app_context():
+        started = time.perf_counter()
+        columns, rows = export.export_rows(entity)
+        counted = CountingRows(rows)
+        chunks = export.encode(columns, counted, format, app.config['STREAM_BATCH_SIZE'])
+        if compress:
+            chunks = export.gzipped(chunks)
+        size = sum(len(chunk) for chunk in chunks)
+        return counted.count, size, time.perf_counter() - started
+
+
+class CountingRows:
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
+
+
+def main():
+    entity = sys.argv[1] if len(sys.argv) > 1 else 'shows'
+    for format in export.FORMATS:
+        for compress in (False, True):
+            count, size, seconds = run(entity, format, compress)
+            # ru_maxrss is the peak of the whole process so far, in KiB on linux
+            print('{0:<7} {1:<6} {2:<4} {3:10d} rows {4:9.1f} MiB {5:7.1f} s {6:9.0f} rows/s '
+                  'max rss {7:.0f} MiB'.format(
+                      entity, format, 'gzip' if compress else '', count, size / 2 ** 20,
+                      seconds, count / seconds if seconds else 0,
+                      resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Latency of genre filtered listings and genre facet counts.
+
+Runs the statements of the genre filtered /artists and /venues pages against
+the configured database, for every genre, each with the genre_mask filter
+and with the equivalent array containment filter (genres @> ARRAY[genre])
+for comparison; then the facet counts over the whole tables and over the
+matches of the search terms. Reports p50/p95/p99 per statement, and the p50
+per genre, as JSON. Seed the database first (see seed.py), e.g.
+
+    python benchmarks/seed.py 1m --shows 100000 --reset
+    python benchmarks/bench_genres.py --runs 20 --output genres.json
+"""
+import argparse
+import os
+import sys
+import time
+
+from sqlalchemy.dialects.postgresql import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from genres import GENRES, facets_select, genre_filter
+from models import db, Venue, Artist
+from pagination import keyset_select
+from queries import search_facets_select
+from routes import TERMS, dataset_size, report, summarize
+
+LISTINGS = {
+    'artists': (Artist, lambda: db.select(Artist.id, Artist.name), [Artist.name, Artist.id]),
+    'venues': (Venue, lambda: db.select(Venue.id, Venue.name, Venue.city, Venue.state,
+                                        Venue.upcoming_shows_count),
+               [Venue.city, Venue.state, Venue.name, Venue.id]),
+}
+FILTERS = {
+    'mask': lambda model, genre: genre_filter(model, [genre]),
+    'array': lambda model, genre: [model.genres.op('@>')(db.cast(array([genre]), model.genres.type))],
+}
+
+
+def timed(statement, runs):
+    latencies = []
+    for number in range(runs):
+        started = time.perf_counter()
+        db.session.execute(statement).all()
+        latencies.append(time.perf_counter() - started)
+    # every statement is a read; end the transaction between statements
+    db.session.rollback()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='Measured runs per statement and genre.')
+    parser.add_argument('--only', help='Comma separated statement names to run.')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args()
+    only = args.only and args.only.split(',')
+
+    venues, artists, shows, areas = dataset_size(app)
+    results = {}
+    with app.app_context():
+        page_size = app.config['PAGE_SIZE']
+        statements = {}
+        for listing, (model, columns, sort_key) in LISTINGS.items():
+            for filter_name, criteria in FILTERS.items():
+                statements['{0}_{1}'.format(listing, filter_name)] = {
+                    genre: keyset_select(columns().where(*criteria(model, genre)), sort_key, page_size)
+                    for genre in GENRES}
+        for name, model in (('artists', Artist), ('venues', Venue)):
+            statements['{0}_facets'.format(name)] = {'all': facets_select(model)}
+            statements['{0}_search_facets'.format(name)] = {
+                term: search_facets_select(model, term) for term in TERMS}
+
+        for name, variants in statements.items():
+            if only and name not in only:
+                continue
+            latencies, medians = [], {}
+            started = time.perf_counter()
+            for variant, statement in variants.items():
+                # one unmeasured run fills the caches
+                timed(statement, 1)
+                runs = timed(statement, args.runs)
+                latencies.extend(runs)
+                medians[variant] = round(sorted(runs)[len(runs) // 2] * 1e3, 2)
+            results[name] = dict(summarize(latencies, time.perf_counter() - started), p50_ms_by=medians)
+            print('{0:<24} p50 {p50_ms:>8} ms  p95 {p95_ms:>8} ms'.format(name, **results[name]),
+                  file=sys.stderr)
+    report('genres', {'runs': args.runs, 'venues': venues, 'artists': artists},
+           results, output=args.output, key='statements')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Throughput and latency of the served app under many concurrent clients.
+
+Each client keeps one HTTP/1.1 keep-alive connection open and requests
+random read routes (see routes.py), back to back, for the given number of
+seconds. The clients are spread over several processes so the load
+generator itself is not the bottleneck. Reports req/s and p50/p95/p99,
+overall and per route, as JSON. Seed the database (see seed.py) and
+compare e.g. the sync app with the async read path:
+
+    gunicorn -w 4 --threads 8 app:app
+    uvicorn --workers 4 asgi:application
+
+    python benchmarks/bench_load.py http://127.0.0.1:8000 --clients 500 \\
+        --processes 4 --seconds 30 --venues 100000 --artists 100000 --areas 1000 \\
+        --output after.json
+
+Only GET routes are requested: the search forms post without a CSRF token.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from routes import Filler, report, select, summarize
+
+
+async def request(reader, writer, host, path):
+    writer.write('GET {0} HTTP/1.1\r\nHost: {1}\r\n\r\n'.format(path, host).encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length, chunked = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+        elif name.lower() == 'transfer-encoding' and 'chunked' in value:
+            chunked = True
+    if not chunked:
+        await reader.readexactly(length)
+        return status
+    while True:
+        size = int((await reader.readline()).split(b';')[0], 16)
+        await reader.readexactly(size + 2)
+        if size == 0:
+            return status
+
+
+async def client(url, routes, filler, deadline, latencies, errors):
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    try:
+        while time.perf_counter() < deadline:
+            route = filler.random.choice(routes)
+            path, data = filler.fill(route)
+            started = time.perf_counter()
+            try:
+                status = await request(reader, writer, parts.netloc, path)
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                errors[route[0]] += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+                continue
+            if status >= 400:
+                errors[route[0]] += 1
+            latencies[route[0]].append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+async def run_clients(url, routes, clients, seconds, venues, artists, areas, seed):
+    latencies, errors = defaultdict(list), defaultdict(int)
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*[
+        client(url, routes, Filler(venues, artists, areas, '{0}-{1}'.format(seed, number)), deadline,
+               latencies, errors) for number in range(clients)])
+    return dict(latencies), dict(errors)
+
+
+def worker(options):
+    return asyncio.run(run_clients(*options))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('url', nargs='?', default='http://127.0.0.1:8000')
+    parser.add_argument('--clients', type=int, default=500, help='Connections, over all processes.')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(), help='Load generator processes.')
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--venues', type=int, default=1000, help='Venue ids are drawn from 1 to this.')
+    parser.add_argument('--artists', type=int, default=1000, help='Artist ids are drawn from 1 to this.')
+    parser.add_argument('--areas', type=int, default=100, help='Area ids are drawn from 1 to this.')
+    parser.add_argument('--only', help='Comma separated route names to request.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the ids and terms.')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args()
+
+    routes = [route for route in select(['read'], args.only and args.only.split(','))
+              if route[2] == 'GET']
+    processes = max(1, min(args.processes, args.clients))
+    shares = [args.clients // processes + (number < args.clients % processes)
+              for number in range(processes)]
+    started = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(worker, [(args.url, routes, share, args.seconds, args.venues,
+                                     args.artists, args.areas, '{0}-{1}'.format(args.seed, number))
+                                    for number, share in enumerate(shares)])
+    elapsed = time.perf_counter() - started
+
+    latencies, errors = defaultdict(list), defaultdict(int)
+    for process_latencies, process_errors in results:
+        for name, values in process_latencies.items():
+            latencies[name].extend(values)
+        for name, count in process_errors.items():
+            errors[name] += count
+    report('load', {'url': args.url, 'clients': args.clients, 'processes': processes,
+                    'seconds': args.seconds, 'venues': args.venues, 'artists': args.artists,
+                    'areas': args.areas, 'seed': args.seed},
+           {route[0]: summarize(latencies[route[0]], elapsed, errors[route[0]]) for route in routes},
+           overall=summarize([value for values in latencies.values() for value in values],
+                             elapsed, sum(errors.values())),
+           output=args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Latency of every route, in process, through the Flask test client.
+
+Runs each route in turn against the configured database, after a short
+warmup, and reports req/s and p50/p95/p99 per route as JSON. Seed the
+database first (see seed.py), then e.g.
+
+    python benchmarks/bench_routes.py --requests 200 --output before.json
+    python benchmarks/bench_routes.py --writes --only venue,venue_create
+
+The test client skips the HTTP server, so this measures the app and the
+database alone; bench_load.py measures the served app under concurrency.
+CSRF protection is turned off for the run so the form routes can post.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from routes import Filler, dataset_size, report, select, summarize
+
+
+def run(client, route, filler, requests, warmup, headers):
+    method = route[2]
+    latencies, errors = [], 0
+    for number in range(warmup + requests):
+        path, data = filler.fill(route)
+        started = time.perf_counter()
+        response = client.open(path, method=method, data=data, headers=headers)
+        response.get_data()
+        response.close()
+        elapsed = time.perf_counter() - started
+        if number < warmup:
+            continue
+        latencies.append(elapsed)
+        if response.status_code >= 400:
+            errors += 1
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100, help='Measured requests per route.')
+    parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per route first.')
+    parser.add_argument('--writes', action='store_true', help='Include the routes that change data.')
+    parser.add_argument('--exports', action='store_true', help='Include the full table exports.')
+    parser.add_argument('--only', help='Comma separated route names to run.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the ids and terms.')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args()
+
+    if args.exports and not app.config['EXPORT_TOKEN']:
+        parser.error('--exports needs FYYUR_EXPORT_TOKEN set')
+    groups = ['read'] + ['write'] * args.writes + ['export'] * args.exports
+    routes = select(groups, args.only and args.only.split(','))
+    venues, artists, shows, areas = dataset_size(app)
+    filler = Filler(venues, artists, areas, args.seed)
+    app.config['WTF_CSRF_ENABLED'] = False
+    headers = {}
+    if app.config['EXPORT_TOKEN']:
+        headers['Authorization'] = 'Bearer ' + app.config['EXPORT_TOKEN']
+
+    results = {}
+    with app.test_client() as client:
+        for route in routes:
+            started = time.perf_counter()
+            latencies, errors = run(client, route, filler, args.requests, args.warmup, headers)
+            results[route[0]] = summarize(latencies, sum(latencies), errors)
+            print('{0:<20} {1:>8.1f} ms p50 {2:>8.1f} ms p99  ({3:.0f} s)'.format(
+                route[0], results[route[0]]['p50_ms'], results[route[0]]['p99_ms'],
+                time.perf_counter() - started), file=sys.stderr)
+
+    report('routes', {'requests': args.requests, 'warmup': args.warmup, 'seed': args.seed,
+                      'venues': venues, 'artists': artists, 'shows': shows, 'areas': areas},
+           results, output=args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Import time and time to first response of a fresh app process.
+
+Starts a new interpreter per run, times `import app` and then the first
+request to each path through the test client, in three modes:
+
+    cold      no template bytecode cache, templates compile on first hit
+    bytecode  templates load from a bytecode cache filled beforehand
+    preload   create_app() compiles every template before the first
+              request, as the gunicorn --preload master does
+
+    python benchmarks/bench_startup.py [--runs 10] [--paths /,/venues/create]
+
+The default paths need no database; add e.g. /venues to include the first
+connection.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from routes import report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+if sys.argv[1] == 'preload':
+    app.create_app()
+ready = time.perf_counter()
+client = app.app.test_client()
+firsts = []
+for path in sys.argv[2:]:
+    before = time.perf_counter()
+    response = client.get(path)
+    response.get_data()
+    response.close()
+    firsts.append(time.perf_counter() - before)
+print(json.dumps({'import': imported - started, 'ready': ready - started, 'firsts': firsts}))
+'''
+
+MODES = ('cold', 'bytecode', 'preload')
+
+
+def run(mode, paths, cache_dir):
+    env = dict(os.environ, FYYUR_TEMPLATE_CACHE_DIR='' if mode == 'cold' else cache_dir)
+    result = subprocess.run([sys.executable, '-c', CHILD, mode] + paths, cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='Fresh processes per mode.')
+    parser.add_argument('--paths', default='/,/venues/create,/artists/create,/shows/create')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args()
+    paths = args.paths.split(',')
+
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # fill the bytecode cache, as `flask fyyur compile-templates` would
+        run('bytecode', paths, cache_dir)
+        for mode in MODES:
+            runs = [run(mode, paths, cache_dir) for number in range(args.runs)]
+            results[mode] = {
+                'import_ms': round(statistics.median(r['import'] for r in runs) * 1e3, 1),
+                'ready_ms': round(statistics.median(r['ready'] for r in runs) * 1e3, 1),
+                'first_response_ms': round(statistics.median(r['firsts'][0] for r in runs) * 1e3, 1),
+                'all_paths_ms': round(statistics.median(sum(r['firsts']) for r in runs) * 1e3, 1),
+                'to_last_response_ms': round(statistics.median(
+                    r['ready'] + sum(r['firsts']) for r in runs) * 1e3, 1),
+            }
+            print('{0:<9} import {import_ms:>6.1f} ms, first response {first_response_ms:>6.1f} ms, '
+                  'all paths {all_paths_ms:>6.1f} ms'.format(mode, **results[mode]), file=sys.stderr)
+    report('startup', {'runs': args.runs, 'paths': paths}, results, output=args.output, key='modes')
+
+
+if __name__ == '__main__':
+    main()
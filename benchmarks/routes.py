@@ -0,0 +1,174 @@
+"""The routes the benchmarks drive, and the JSON report they write.
+
+Shared by bench_routes.py (Flask test client) and bench_load.py (HTTP).
+Each route is (name, group, method, path, form); path and form may use
+{venue}, {artist}, {area}, {term}, {prefix}, {genre}, {start_time} and {n}, filled in per request
+from the seeded dataset (see seed.py). Groups:
+
+    read    pages and API reads, run by default
+    write   creates, edits and deletes (--writes), which change the data
+    export  full table exports (--exports), one request reads every row
+"""
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+from urllib.parse import quote
+
+# The create and edit views read every field of the form
+LINKS = {'image_link': '', 'facebook_link': '', 'website_link': '', 'seeking_description': ''}
+
+ROUTES = [
+    ('index', 'read', 'GET', '/', None),
+    ('venues', 'read', 'GET', '/venues', None),
+    ('venues_genre', 'read', 'GET', '/venues?genre={genre}', None),
+    ('venues_search', 'read', 'POST', '/venues/search', {'search_term': '{term}'}),
+    ('venues_search_genre', 'read', 'POST', '/venues/search', {'search_term': '{term}', 'genre': '{genre}'}),
+    ('venue', 'read', 'GET', '/venues/{venue}', None),
+    ('venue_edit_form', 'read', 'GET', '/venues/{venue}/edit', None),
+    ('venue_create_form', 'read', 'GET', '/venues/create', None),
+    ('artists', 'read', 'GET', '/artists', None),
+    ('artists_genre', 'read', 'GET', '/artists?genre={genre}', None),
+    ('artists_search', 'read', 'POST', '/artists/search', {'search_term': '{term}'}),
+    ('artists_search_genre', 'read', 'POST', '/artists/search', {'search_term': '{term}', 'genre': '{genre}'}),
+    ('artist', 'read', 'GET', '/artists/{artist}', None),
+    ('artist_edit_form', 'read', 'GET', '/artists/{artist}/edit', None),
+    ('artist_create_form', 'read', 'GET', '/artists/create', None),
+    ('areas', 'read', 'GET', '/areas', None),
+    ('area', 'read', 'GET', '/areas/{area}', None),
+    ('shows', 'read', 'GET', '/shows', None),
+    ('show_create_form', 'read', 'GET', '/shows/create', None),
+    ('autocomplete', 'read', 'GET', '/api/autocomplete?type=venue&q={prefix}', None),
+    ('api_venues', 'read', 'GET', '/api/v1/venues', None),
+    ('api_venue_facets', 'read', 'GET', '/api/v1/venues/facets', None),
+    ('api_venue', 'read', 'GET', '/api/v1/venues/{venue}', None),
+    ('api_artists', 'read', 'GET', '/api/v1/artists', None),
+    ('api_artists_genre', 'read', 'GET', '/api/v1/artists?genre={genre}', None),
+    ('api_artist_facets', 'read', 'GET', '/api/v1/artists/facets', None),
+    ('api_artist', 'read', 'GET', '/api/v1/artists/{artist}', None),
+    ('api_areas', 'read', 'GET', '/api/v1/areas', None),
+    ('api_shows', 'read', 'GET', '/api/v1/shows', None),
+    ('cache_stats', 'read', 'GET', '/cache/stats', None),
+    ('pool_stats', 'read', 'GET', '/db/pool/stats', None),
+    ('venue_create', 'write', 'POST', '/venues/create', {
+        'name': 'Bench Venue {n}', 'city': 'Austin', 'state': 'TX', 'address': '{n} Bench St',
+        'phone': '512-555-0100', 'genres': 'Jazz', 'seeking_talent': 'y', **LINKS}),
+    ('venue_edit', 'write', 'POST', '/venues/{venue}/edit', {
+        'name': 'Edited Venue {n}', 'city': 'Austin', 'state': 'TX', 'address': '{n} Bench St',
+        'phone': '512-555-0100', 'genres': 'Jazz', **LINKS}),
+    ('artist_create', 'write', 'POST', '/artists/create', {
+        'name': 'Bench Artist {n}', 'city': 'Austin', 'state': 'TX', 'phone': '512-555-0100',
+        'genres': 'Jazz', 'seeking_venue': 'y', **LINKS}),
+    ('artist_edit', 'write', 'POST', '/artists/{artist}/edit', {
+        'name': 'Edited Artist {n}', 'city': 'Austin', 'state': 'TX', 'phone': '512-555-0100',
+        'genres': 'Jazz', **LINKS}),
+    ('show_create', 'write', 'POST', '/shows/create', {
+        'venue_id': '{venue}', 'artist_id': '{artist}', 'start_time': '{start_time}'}),
+    # last, as the ids they delete are gone for the routes after them
+    ('venue_delete', 'write', 'DELETE', '/venues/{venue}', None),
+    ('artist_delete', 'write', 'DELETE', '/artists/{artist}', None),
+    ('export_venues', 'export', 'GET', '/export/venues.ndjson', None),
+    ('export_shows', 'export', 'GET', '/export/shows.csv', None),
+]
+
+# Search terms and autocomplete prefixes, drawn from the words seed.py uses
+TERMS = ['blue', 'hall', 'golden room', 'wolves', 'echo', 'trio', 'neon', 'club 12']
+PREFIXES = ['b', 'gol', 'vel', 'mid', 'elec', 'neon l']
+# Every genre, popular and rare alike
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk',
+          'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop',
+          'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul', 'Other']
+
+
+def select(groups, names=None):
+    return [route for route in ROUTES
+            if route[1] in groups and (not names or route[0] in names)]
+
+
+class Filler:
+    """Fills route templates with random ids below the dataset's sizes."""
+
+    def __init__(self, venues, artists, areas, seed=None):
+        self.venues = max(venues, 1)
+        self.artists = max(artists, 1)
+        self.areas = max(areas, 1)
+        self.random = random.Random(seed)
+        self.count = 0
+
+    def values(self):
+        self.count += 1
+        start_time = datetime.datetime.now() + datetime.timedelta(days=self.random.randint(1, 365))
+        return {
+            'venue': self.random.randint(1, self.venues),
+            'artist': self.random.randint(1, self.artists),
+            'area': self.random.randint(1, self.areas),
+            'term': self.random.choice(TERMS),
+            'prefix': self.random.choice(PREFIXES),
+            'genre': self.random.choice(GENRES),
+            'n': self.count,
+            'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    def fill(self, route):
+        """The path and form data of one request to route."""
+        name, group, method, path, form = route
+        values = self.values()
+        data = {key: value.format(**values) for key, value in form.items()} if form else None
+        return path.format(**{key: quote(str(value)) for key, value in values.items()}), data
+
+
+def summarize(latencies, seconds, errors=0):
+    """Request count, req/s and latency percentiles in ms."""
+    latencies = sorted(latencies)
+
+    def percentile(fraction):
+        if not latencies:
+            return None
+        return round(latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1e3, 2)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'req_per_s': round(len(latencies) / seconds, 1) if seconds else None,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(latencies[-1] * 1e3, 2) if latencies else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def report(benchmark, settings, routes, overall=None, output=None, key='routes'):
+    """Print or write the run as JSON; keyed by route so runs diff cleanly."""
+    data = {
+        'benchmark': benchmark,
+        'commit': git_commit(),
+        'time': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'settings': settings,
+        key: routes,
+    }
+    if overall is not None:
+        data['overall'] = overall
+    text = json.dumps(data, indent=2, sort_keys=True)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+def dataset_size(app):
+    """(venues, artists, shows, areas) in the database app is configured with."""
+    from models import db, Venue, Artist, Show, Area
+    with app.app_context():
+        return tuple(db.session.query(db.func.max(model.id)).scalar() or 0
+                     for model in (Venue, Artist, Show, Area))
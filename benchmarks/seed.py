@@ -0,0 +1,155 @@
+"""Fill the configured database with a synthetic catalog for benchmarking.
+
+Scale factor N gives N venues, N artists and 10 * N shows (at most 10M):
+
+    python benchmarks/seed.py 1k|10k|100k|1m [--shows COUNT] [--reset]
+
+Rows are generated by Postgres itself (generate_series), so even the
+largest scale loads in minutes. Cities and genres follow a long tail:
+a few big cities and popular genres account for most rows. Popular
+venues and artists get more shows. Shows span two years back to one year
+ahead. The show counters are computed at the end, the way
+`flask fyyur verify-counters --fix` would.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from forms import genres_list
+from models import db
+import areas
+import show_cards
+
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000, '1m': 1000000}
+MAX_SHOWS = 10000000
+BATCH_SIZE = 1000000
+
+# (city, state), biggest first
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'), ('Houston', 'TX'),
+    ('Phoenix', 'AZ'), ('Philadelphia', 'PA'), ('San Antonio', 'TX'), ('San Diego', 'CA'),
+    ('Dallas', 'TX'), ('San Jose', 'CA'), ('Austin', 'TX'), ('Jacksonville', 'FL'),
+    ('Columbus', 'OH'), ('Charlotte', 'NC'), ('San Francisco', 'CA'), ('Indianapolis', 'IN'),
+    ('Seattle', 'WA'), ('Denver', 'CO'), ('Washington', 'DC'), ('Boston', 'MA'),
+    ('Nashville', 'TN'), ('Detroit', 'MI'), ('Portland', 'OR'), ('Las Vegas', 'NV'),
+    ('Memphis', 'TN'), ('Louisville', 'KY'), ('Baltimore', 'MD'), ('Milwaukee', 'WI'),
+    ('Albuquerque', 'NM'), ('Atlanta', 'GA'), ('New Orleans', 'LA'), ('Minneapolis', 'MN'),
+]
+# most popular first
+GENRES = ['Rock n Roll', 'Pop', 'Hip-Hop', 'Jazz', 'Alternative', 'Electronic', 'R&B',
+          'Country', 'Blues', 'Folk', 'Soul', 'Punk', 'Heavy Metal', 'Reggae', 'Funk',
+          'Classical', 'Instrumental', 'Musical Theatre', 'Other']
+WORDS = ['Blue', 'Golden', 'Velvet', 'Electric', 'Midnight', 'Silver', 'Crimson', 'Wild',
+         'Lucky', 'Hidden', 'Neon', 'Rusty', 'Copper', 'Echo', 'Little', 'Grand']
+VENUE_NOUNS = ['Room', 'Hall', 'Lounge', 'Club', 'Tavern', 'Theater', 'Hop', 'Garden']
+ARTIST_NOUNS = ['Petals', 'Wolves', 'Collective', 'Trio', 'Kings', 'Sisters', 'Machine', 'Band']
+
+
+def sql_array(values):
+    return 'ARRAY[{0}]'.format(', '.join("'{0}'".format(value.replace("'", "''")) for value in values))
+
+
+def pick(array, length, skew):
+    """A random element of array, biased towards the front by skew."""
+    return '({0})[1 + floor({1} * power(random(), {2}))::int]'.format(array, length, skew)
+
+
+def genres_column():
+    # 1 to 3 distinct genres; the WHERE makes the subquery run per row
+    return ('ARRAY(SELECT DISTINCT {0} FROM generate_series(1, 1 + floor(random() * 3)::int) '
+            'WHERE i > 0)').format(pick(sql_array(GENRES), len(GENRES), 2))
+
+
+def insert_catalog(table, count, nouns, extra_columns, extra_values):
+    cities = sql_array(city for city, state in CITIES)
+    states = sql_array(state for city, state in CITIES)
+    db.session.execute(db.text('''
+        INSERT INTO "{table}" (name, city, state, phone, genres, image_link, {extra_columns})
+        SELECT {words} || ' ' || {nouns} || ' ' || i, ({cities})[c], ({states})[c],
+               '512-555-' || lpad((i % 10000)::text, 4, '0'), {genres},
+               'https://picsum.photos/seed/{table}' || i || '/300', {extra_values}
+        FROM (SELECT i, {city} AS c FROM generate_series(1, :count) AS i) AS rows
+    '''.format(table=table, extra_columns=extra_columns, extra_values=extra_values,
+               words=pick(sql_array(WORDS), len(WORDS), 1),
+               nouns=pick(sql_array(nouns), len(nouns), 1),
+               cities=cities, states=states, genres=genres_column(),
+               city='1 + floor({0} * power(random(), 2.5))::int'.format(len(CITIES)))),
+        {'count': count})
+    db.session.commit()
+
+
+def insert_shows(count, venues, artists):
+    done = 0
+    while done < count:
+        batch = min(BATCH_SIZE, count - done)
+        db.session.execute(db.text('''
+            INSERT INTO "Show" (venue_id, artist_id, start_time, counted_as_past)
+            SELECT 1 + floor(:venues * power(random(), 1.5))::int,
+                   1 + floor(:artists * power(random(), 1.5))::int,
+                   date_trunc('hour', now() - interval '730 days' + random() * interval '1095 days'),
+                   false
+            FROM generate_series(1, :batch) AS i
+        '''), {'venues': venues, 'artists': artists, 'batch': batch})
+        db.session.commit()
+        done += batch
+        print('  {0} / {1} shows'.format(done, count))
+
+
+def fix_counters():
+    db.session.execute(db.text('UPDATE "Show" SET counted_as_past = true WHERE start_time <= now()'))
+    for table, column in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        db.session.execute(db.text('''
+            UPDATE "{table}" SET upcoming_shows_count = counts.upcoming,
+                                 past_shows_count = counts.past
+            FROM (SELECT {column} AS id,
+                         count(*) FILTER (WHERE NOT counted_as_past) AS upcoming,
+                         count(*) FILTER (WHERE counted_as_past) AS past
+                  FROM "Show" GROUP BY {column}) AS counts
+            WHERE "{table}".id = counts.id
+        '''.format(table=table, column=column)))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('scale', choices=sorted(SCALES, key=SCALES.get))
+    parser.add_argument('--shows', type=int, help='Number of shows (default: 10 per venue).')
+    parser.add_argument('--reset', action='store_true', help='Empty the tables first.')
+    args = parser.parse_args()
+    count = SCALES[args.scale]
+    shows = min(args.shows if args.shows is not None else count * 10, MAX_SHOWS)
+    assert {value for value, label in genres_list} >= set(GENRES)
+
+    with app.app_context():
+        if args.reset:
+            db.session.execute(db.text(
+                'TRUNCATE "ShowCard", "Show", "Venue", "Artist", "Area" RESTART IDENTITY CASCADE'))
+            db.session.commit()
+        elif db.session.execute(db.text('SELECT count(*) FROM "Venue"')).scalar():
+            sys.exit('The database already has venues; pass --reset to replace them.')
+
+        started = time.perf_counter()
+        print('{0} venues'.format(count))
+        insert_catalog('Venue', count, VENUE_NOUNS, 'address, seeking_talent',
+                       "i || ' Main St', random() < 0.3")
+        print('{0} artists'.format(count))
+        insert_catalog('Artist', count, ARTIST_NOUNS, 'seeking_venue', 'random() < 0.3')
+        print('areas')
+        areas.backfill()
+        print('{0} shows'.format(shows))
+        insert_shows(shows, count, count)
+        print('counters')
+        fix_counters()
+        print('show cards')
+        show_cards.refresh_cards()
+        db.session.execute(db.text('ANALYZE "Area", "Venue", "Artist", "Show", "ShowCard"'))
+        db.session.commit()
+        print('done in {0:.0f} s'.format(time.perf_counter() - started))
+
+
+if __name__ == '__main__':
+    main()
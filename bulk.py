@@ -0,0 +1,252 @@
+import csv
+import datetime
+import json
+import os
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Venue, Artist, Show, ImportCheckpoint
+from forms import VenueForm, ArtistForm, ShowForm, validate_row
+import counters
+import areas
+import show_cards
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+# Loads partner catalogs from CSV or NDJSON. Rows are checked with the same
+# validators as the create forms, inserted with one executemany per chunk,
+# and every chunk is committed together with an ImportCheckpoint row, so an
+# interrupted import resumes after the last committed chunk. A record the
+# database refuses (a partner id that is taken, say) is rejected on its own
+# instead of aborting the import.
+
+TRUE_STRINGS = {'1', 'true', 't', 'yes', 'y', 'on'}
+
+VENUE_COLUMNS = ('name', 'city', 'state', 'address', 'phone', 'genres', 'image_link',
+                 'facebook_link', 'website_link', 'seeking_talent', 'seeking_description')
+ARTIST_COLUMNS = ('name', 'city', 'state', 'phone', 'genres', 'image_link',
+                  'facebook_link', 'website_link', 'seeking_venue', 'seeking_description')
+SHOW_COLUMNS = ('venue_id', 'artist_id', 'start_time')
+
+ENTITIES = {
+    'venues': (Venue, VenueForm, VENUE_COLUMNS),
+    'artists': (Artist, ArtistForm, ARTIST_COLUMNS),
+    'shows': (Show, ShowForm, SHOW_COLUMNS),
+}
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_records(path, format=None):
+    """Yield the records of a CSV or NDJSON file as dicts."""
+    format = format or ('csv' if path.endswith('.csv') else 'ndjson')
+    with open(path, newline='', encoding='utf-8') as source:
+        if format == 'csv':
+            yield from csv.DictReader(source)
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _coerce(column, value):
+    if isinstance(value, str):
+        value = value.strip()
+    if column == 'genres':
+        if isinstance(value, str):
+            value = [genre.strip() for genre in value.split(',') if genre.strip()]
+        return value or []
+    if column in ('seeking_talent', 'seeking_venue'):
+        if isinstance(value, str):
+            return value.lower() in TRUE_STRINGS
+        return bool(value)
+    if column in ('id', 'venue_id', 'artist_id'):
+        if value in (None, ''):
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise RowError({column: ['Not a valid integer.']})
+    if column == 'start_time':
+        if not value:
+            return None
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise RowError({column: ['Not a valid datetime value.']})
+    return value if value != '' else None
+
+
+def clean_record(entity, record):
+    """Coerce and validate one record, returning the row to insert."""
+    model, form_class, columns = ENTITIES[entity]
+    row = {column: _coerce(column, record.get(column)) for column in columns}
+    if record.get('id') not in (None, ''):
+        row['id'] = _coerce('id', record['id'])
+    errors = validate_row(form_class, row)
+    if entity == 'shows':
+        for column in ('venue_id', 'artist_id'):
+            if row[column] is None:
+                errors.setdefault(column, []).append('This field is required.')
+    if errors:
+        raise RowError(errors)
+    return row
+
+
+def _existing_ids(model, ids):
+    if not ids:
+        return set()
+    return {row_id for row_id, in db.session.query(model.id).filter(model.id.in_(ids))}
+
+
+def load_chunk(entity, chunk):
+    """Insert the valid records of chunk; returns (inserted, rejects)."""
+    model = ENTITIES[entity][0]
+    rows, rejects = [], []
+    for record_no, record in chunk:
+        try:
+            rows.append((record_no, record, clean_record(entity, record)))
+        except RowError as error:
+            rejects.append({'record': record_no, 'errors': error.args[0], 'row': record})
+
+    if entity == 'shows':
+        # resolve the foreign keys of the whole chunk with two queries
+        venue_ids = _existing_ids(Venue, {row['venue_id'] for _, _, row in rows})
+        artist_ids = _existing_ids(Artist, {row['artist_id'] for _, _, row in rows})
+        resolved = []
+        for record_no, record, row in rows:
+            errors = {}
+            if row['venue_id'] not in venue_ids:
+                errors['venue_id'] = ['Unknown venue.']
+            if row['artist_id'] not in artist_ids:
+                errors['artist_id'] = ['Unknown artist.']
+            if errors:
+                rejects.append({'record': record_no, 'errors': errors, 'row': record})
+            else:
+                resolved.append((record_no, record, row))
+        rows = resolved
+
+    rows = _new_ids(model, rows, rejects)
+    try:
+        with db.session.begin_nested():
+            inserted = _insert(entity, [row for _, _, row in rows])
+    except IntegrityError:
+        # find the rows the database refuses, one savepoint each
+        inserted = 0
+        for record_no, record, row in rows:
+            try:
+                with db.session.begin_nested():
+                    inserted += _insert(entity, [row])
+            except IntegrityError as error:
+                rejects.append({'record': record_no, 'errors': {'row': [str(error.orig).strip()]},
+                                'row': record})
+    return inserted, rejects
+
+
+def _new_ids(model, rows, rejects):
+    """The rows whose explicit id is neither taken nor repeated in the
+    chunk; the others go to rejects."""
+    taken = _existing_ids(model, {row['id'] for _, _, row in rows if 'id' in row})
+    fresh = []
+    for record_no, record, row in rows:
+        if 'id' in row and row['id'] in taken:
+            rejects.append({'record': record_no, 'errors': {'id': ['Id already taken.']}, 'row': record})
+        else:
+            if 'id' in row:
+                taken.add(row['id'])
+            fresh.append((record_no, record, row))
+    return fresh
+
+
+def _insert(entity, values):
+    """Insert values with their counters and cards; returns the count.
+
+    An executemany takes its columns from the first row, so the rows with
+    an explicit id and those without go in separate statements.
+    """
+    model = ENTITIES[entity][0]
+    groups = [[row for row in values if 'id' in row], [row for row in values if 'id' not in row]]
+    if entity == 'shows':
+        counters.shows_bulk_added(values)
+        ids = []
+        for group in filter(None, groups):
+            ids += db.session.execute(insert(model).returning(model.id), group).scalars().all()
+        if ids:
+            show_cards.cards_added(Show.id.in_(ids))
+    else:
+        areas.rows_bulk_added(model, values)
+        for group in filter(None, groups):
+            db.session.execute(insert(model), group)
+    return len(values)
+
+
+def import_file(entity, path, format=None, chunk_size=5000, rejects_path=None,
+                restart=False, echo=print):
+    """Import path into entity ('venues', 'artists' or 'shows').
+
+    Resumes after the last committed chunk of a previous run over the same
+    file unless restart is set. Rejected records are appended to
+    rejects_path as NDJSON with their errors.
+    """
+    model = ENTITIES[entity][0]
+    source = '{0}:{1}'.format(entity, os.path.abspath(path))
+    checkpoint = db.session.get(ImportCheckpoint, source)
+    if checkpoint is not None and restart:
+        db.session.delete(checkpoint)
+        db.session.commit()
+        checkpoint = None
+    if checkpoint is None:
+        checkpoint = ImportCheckpoint(source=source, records=0, inserted=0, rejected=0)
+        db.session.add(checkpoint)
+    elif checkpoint.records:
+        echo('Resuming {0} after record {1}.'.format(path, checkpoint.records))
+    resume_after = checkpoint.records
+
+    rejects_path = rejects_path or path + '.rejects.ndjson'
+    started = time.perf_counter()
+    processed = 0
+    with open(rejects_path, 'a' if resume_after else 'w', encoding='utf-8') as rejects_file:
+        def flush(chunk):
+            inserted, rejects = load_chunk(entity, chunk)
+            for reject in rejects:
+                rejects_file.write(json.dumps(reject, default=str) + '\n')
+            rejects_file.flush()
+            checkpoint.records = chunk[-1][0]
+            checkpoint.inserted += inserted
+            checkpoint.rejected += len(rejects)
+            db.session.commit()
+            elapsed = time.perf_counter() - started
+            echo('{0} records, {1} inserted, {2} rejected, {3:.0f} rows/s'.format(
+                checkpoint.records, checkpoint.inserted, checkpoint.rejected,
+                processed / elapsed if elapsed else 0))
+
+        chunk = []
+        for record_no, record in enumerate(read_records(path, format), start=1):
+            if record_no <= resume_after:
+                continue
+            chunk.append((record_no, record))
+            processed += 1
+            if len(chunk) == chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+
+    # rows imported with explicit ids must not collide with later inserts
+    db.session.execute(db.text(
+        "SELECT setval(pg_get_serial_sequence('\"{0}\"', 'id'), "
+        "GREATEST(coalesce(max(id), 0), 1)) FROM \"{0}\"".format(model.__tablename__)))
+    db.session.commit()
+    elapsed = time.perf_counter() - started
+    return {
+        'records': checkpoint.records,
+        'inserted': checkpoint.inserted,
+        'rejected': checkpoint.rejected,
+        'seconds': elapsed,
+        'rows_per_second': processed / elapsed if elapsed else 0,
+    }
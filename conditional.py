@@ -0,0 +1,49 @@
+from functools import wraps
+import hashlib
+
+from flask import g, make_response, request, session
+
+#----------------------------------------------------------------------------#
+# Conditional responses.
+#----------------------------------------------------------------------------#
+# A view's validator returns (token, last_modified) from one cheap query
+# over the version / updated_at columns of the rows the page shows. The
+# strong ETag is derived from the token and the request path, so a client
+# that already has the page gets a 304 without the view query or render.
+# The token is also left on g for the page cache (applied inside this
+# decorator), which keys its entries by it: a page body is only ever served
+# under the ETag of the state it was rendered from, even when a change
+# didn't invalidate its cache tags.
+
+
+def make_etag(full_path, token):
+    return hashlib.sha1('{0}|{1}'.format(full_path, token).encode()).hexdigest()
+
+
+def conditional(validator):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # pages rendered with pending flash messages are one-offs
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+            state = validator(*args, **kwargs)
+            if state is None:
+                return view(*args, **kwargs)
+            token, last_modified = state
+            g.validator_token = token
+            etag = make_etag(request.full_path, token)
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # let browsers and the CDN keep the page but always revalidate
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,133 @@
+from collections import Counter
+import datetime
+
+from sqlalchemy import bindparam, update
+
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Show counters.
+#----------------------------------------------------------------------------#
+# Venue and Artist carry upcoming_shows_count / past_shows_count so listing
+# and search pages don't need a COUNT over Show per row. Show.counted_as_past
+# records which of the two counters a show is currently part of; shows move
+# from upcoming to past when roll_over_shows() runs.
+
+ROLL_OVER_BATCH_SIZE = 5000
+
+
+def _apply_deltas(model, deltas):
+    """Add (upcoming, past) deltas to the counters of many rows at once."""
+    if not deltas:
+        return
+    table = model.__table__
+    stmt = update(table).where(table.c.id == bindparam('b_id')).values(
+        upcoming_shows_count=table.c.upcoming_shows_count + bindparam('b_upcoming'),
+        past_shows_count=table.c.past_shows_count + bindparam('b_past'))
+    db.session.execute(stmt, [
+        {'b_id': row_id, 'b_upcoming': upcoming, 'b_past': past}
+        for row_id, (upcoming, past) in deltas.items()
+    ])
+
+
+def show_added(show, now=None):
+    """Count a new show for its venue and artist. Call before commit."""
+    now = now or datetime.datetime.now()
+    show.counted_as_past = show.start_time <= now
+    delta = (0, 1) if show.counted_as_past else (1, 0)
+    _apply_deltas(Venue, {int(show.venue_id): delta})
+    _apply_deltas(Artist, {int(show.artist_id): delta})
+
+
+def shows_bulk_added(rows, now=None):
+    """Count many new show rows (dicts) at once, setting their counted_as_past."""
+    now = now or datetime.datetime.now()
+    venue_deltas, artist_deltas = {}, {}
+    for row in rows:
+        row['counted_as_past'] = row['start_time'] <= now
+        for deltas, key in ((venue_deltas, row['venue_id']), (artist_deltas, row['artist_id'])):
+            upcoming, past = deltas.get(key, (0, 0))
+            if row['counted_as_past']:
+                deltas[key] = (upcoming, past + 1)
+            else:
+                deltas[key] = (upcoming + 1, past)
+    _apply_deltas(Venue, venue_deltas)
+    _apply_deltas(Artist, artist_deltas)
+
+
+def shows_removed(*criteria):
+    """Uncount and delete the shows matching criteria. Call before commit."""
+    rows = db.session.query(
+        Show.venue_id, Show.artist_id, Show.counted_as_past).filter(*criteria).all()
+    venue_deltas, artist_deltas = {}, {}
+    for venue_id, artist_id, counted_as_past in rows:
+        for deltas, key in ((venue_deltas, venue_id), (artist_deltas, artist_id)):
+            upcoming, past = deltas.get(key, (0, 0))
+            if counted_as_past:
+                deltas[key] = (upcoming, past - 1)
+            else:
+                deltas[key] = (upcoming - 1, past)
+    _apply_deltas(Venue, venue_deltas)
+    _apply_deltas(Artist, artist_deltas)
+    db.session.query(Show).filter(*criteria).delete(synchronize_session=False)
+    return len(rows)
+
+
+def roll_over_shows(now=None, rolled_over=None):
+    """Move shows that have started from the upcoming to the past counters.
+
+    Runs in batches, committing after each one, and returns the number of
+    shows rolled over. rolled_over, if given, is called after every commit
+    with the ids of the venues and of the artists whose counters changed.
+    """
+    now = now or datetime.datetime.now()
+    rolled = 0
+    while True:
+        due = db.session.query(Show.id, Show.venue_id, Show.artist_id).filter(
+            Show.counted_as_past.is_(False), Show.start_time <= now
+        ).order_by(Show.id).limit(ROLL_OVER_BATCH_SIZE).with_for_update(
+            skip_locked=True).all()
+        if not due:
+            return rolled
+        venue_counts = Counter(row.venue_id for row in due)
+        artist_counts = Counter(row.artist_id for row in due)
+        _apply_deltas(Venue, {key: (-n, n) for key, n in venue_counts.items()})
+        _apply_deltas(Artist, {key: (-n, n) for key, n in artist_counts.items()})
+        db.session.query(Show).filter(Show.id.in_([row.id for row in due])).update(
+            {Show.counted_as_past: True}, synchronize_session=False)
+        db.session.commit()
+        if rolled_over is not None:
+            rolled_over(set(venue_counts), set(artist_counts))
+        rolled += len(due)
+
+
+def counter_drift(model, fix=False):
+    """Recompute the counters of model from Show and return the rows that drifted.
+
+    Each drifted row is (id, stored upcoming, stored past, actual upcoming,
+    actual past). With fix=True the stored counters are overwritten.
+    """
+    fk = Show.venue_id if model is Venue else Show.artist_id
+    actual_upcoming = db.func.count(Show.id).filter(Show.counted_as_past.is_(False))
+    actual_past = db.func.count(Show.id).filter(Show.counted_as_past.is_(True))
+    drift = db.session.query(
+        model.id, model.upcoming_shows_count, model.past_shows_count,
+        actual_upcoming, actual_past
+    ).outerjoin(Show, fk == model.id).group_by(model.id).having(db.or_(
+        model.upcoming_shows_count != actual_upcoming,
+        model.past_shows_count != actual_past
+    )).order_by(model.id).all()
+    if fix and drift:
+        _apply_deltas(model, {
+            row_id: (upcoming - stored_upcoming, past - stored_past)
+            for row_id, stored_upcoming, stored_past, upcoming, past in drift
+        })
+        db.session.commit()
+    return drift
+
+
+def pending_roll_over(now=None):
+    """Number of shows that have started but are still counted as upcoming."""
+    now = now or datetime.datetime.now()
+    return Show.query.filter(
+        Show.counted_as_past.is_(False), Show.start_time <= now).count()
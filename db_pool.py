@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import NullPool, QueuePool
+
+#----------------------------------------------------------------------------#
+# Connection pool metrics.
+#----------------------------------------------------------------------------#
+# The engine's pool class is swapped for a metered subclass that times every
+# checkout, including the wait for a free connection once the pool is full,
+# and counts connections opened and closed. Like the page cache stats the
+# numbers are per worker process.
+
+
+class PoolMetrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_timeouts = 0
+            self.checkout_wait_total = 0.0
+            self.checkout_wait_max = 0.0
+            self.connects = 0
+            self.disconnects = 0
+            self.invalidations = 0
+
+    def checked_out(self, waited):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait_total += waited
+            self.checkout_wait_max = max(self.checkout_wait_max, waited)
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+metrics = PoolMetrics()
+
+
+class MeteredPool:
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            metrics.count('checkout_timeouts')
+            raise
+        metrics.checked_out(time.perf_counter() - started)
+        return record
+
+
+class MeteredQueuePool(MeteredPool, QueuePool):
+    pass
+
+
+class MeteredNullPool(MeteredPool, NullPool):
+    pass
+
+
+METERED_POOLS = {QueuePool: MeteredQueuePool, NullPool: MeteredNullPool}
+
+for pool_class in (MeteredQueuePool, MeteredNullPool):
+    event.listen(pool_class, 'connect', lambda *args: metrics.count('connects'))
+    event.listen(pool_class, 'close', lambda *args: metrics.count('disconnects'))
+    event.listen(pool_class, 'close_detached', lambda *args: metrics.count('disconnects'))
+    event.listen(pool_class, 'invalidate', lambda *args: metrics.count('invalidations'))
+
+
+def init_app(app):
+    """Meter the pool of the engine db.init_app(app) will create; call first."""
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    pool_class = options.get('poolclass', QueuePool)
+    options['poolclass'] = METERED_POOLS.get(pool_class, pool_class)
+
+    timeout = app.config.get('DB_STATEMENT_TIMEOUT')
+    if app.config.get('DB_PGBOUNCER') and timeout:
+        # psycopg2 opens the transaction with the first statement, and the
+        # session gives the connection back when the transaction ends
+        def set_statement_timeout(dbapi_connection, connection_record, connection_proxy):
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = %s', (int(timeout),))
+        event.listen(options['poolclass'], 'checkout', set_statement_timeout)
+
+
+def dispose_after_fork(engines):
+    """Make forked children drop the pooled connections of engines they
+    inherited and start their metrics afresh.
+
+    close=False leaves the sockets to the parent, which still owns them.
+    """
+    def dispose():
+        for engine in engines:
+            engine.dispose(close=False)
+        # the lock may have been held by another thread of the parent
+        metrics._lock = threading.Lock()
+        metrics.reset()
+    os.register_at_fork(after_in_child=dispose)
+
+
+def stats(engine):
+    pool = engine.pool
+    occupancy = {}
+    if isinstance(pool, QueuePool):
+        occupancy = {
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow,
+        }
+    return {
+        'pid': os.getpid(),
+        'pool': type(pool).__name__,
+        **occupancy,
+        'checkouts': metrics.checkouts,
+        'checkout_timeouts': metrics.checkout_timeouts,
+        'checkout_wait_avg_ms': metrics.checkout_wait_total / metrics.checkouts * 1e3
+        if metrics.checkouts else 0,
+        'checkout_wait_max_ms': metrics.checkout_wait_max * 1e3,
+        'connects': metrics.connects,
+        'disconnects': metrics.disconnects,
+        'invalidations': metrics.invalidations,
+    }
@@ -0,0 +1,120 @@
+import csv
+import datetime
+import hmac
+import io
+import zlib
+
+from flask import Blueprint, Response, abort, current_app, request, stream_with_context
+
+from models import db, Venue, Artist, Show
+from api import dumps
+
+#----------------------------------------------------------------------------#
+# Catalog export.
+#----------------------------------------------------------------------------#
+# Full or incremental dumps of a table as NDJSON or CSV, for the flask
+# fyyur export command and the /export endpoint. Rows are read from a
+# server side cursor and encoded STREAM_BATCH_SIZE at a time, so memory
+# stays flat however large the table is.
+
+ENTITIES = {'venues': Venue, 'artists': Artist, 'shows': Show}
+FORMATS = ('ndjson', 'csv')
+MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+exports = Blueprint('export', __name__, url_prefix='/export')
+
+
+def export_rows(entity, since=None):
+    """(column names, row iterator) over entity, oldest id first.
+
+    With since, only rows created or updated after it are included; deleted
+    rows leave no trace in updated_at and need a full export to show up.
+    """
+    model = ENTITIES[entity]
+    columns = [column.name for column in model.__table__.columns]
+    query = db.session.query(*model.__table__.columns)
+    if since is not None:
+        query = query.filter(model.updated_at > since)
+    rows = query.order_by(model.id).yield_per(current_app.config['STREAM_BATCH_SIZE'])
+    return columns, rows
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return ','.join(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def encode(columns, rows, format, batch_size=1000):
+    """Yield the rows as NDJSON or CSV bytes, one chunk per batch."""
+    if format == 'ndjson':
+        for batch in _batches(rows, batch_size):
+            yield b''.join(dumps(dict(zip(columns, row))) + b'\n' for row in batch)
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in _batches(rows, batch_size):
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # header of an empty export
+        yield buffer.getvalue().encode()
+
+
+def gzipped(chunks, level=6):
+    """Compress a stream of byte chunks into one gzip stream on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def parse_since(value):
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        abort(400)
+
+
+def authorized():
+    token = current_app.config.get('EXPORT_TOKEN')
+    header = request.headers.get('Authorization', '')
+    if not token or not header.startswith('Bearer '):
+        return False
+    return hmac.compare_digest(header[len('Bearer '):].encode(), token.encode())
+
+
+@exports.route('/<entity>.<format>')
+def export_entity(entity, format):
+    if entity not in ENTITIES or format not in FORMATS:
+        abort(404)
+    if not authorized():
+        return Response('Unauthorized', 401, {'WWW-Authenticate': 'Bearer'})
+    columns, rows = export_rows(entity, parse_since(request.args.get('since')))
+    body = encode(columns, rows, format, current_app.config['STREAM_BATCH_SIZE'])
+    headers = {'Content-Disposition': 'attachment; filename={0}.{1}'.format(entity, format)}
+    if 'gzip' in request.accept_encodings:
+        body = gzipped(body)
+        headers['Content-Encoding'] = 'gzip'
+    headers['Vary'] = 'Accept-Encoding'
+    return Response(stream_with_context(body), mimetype=MIMETYPES[format], headers=headers)
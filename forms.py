@@ -1,7 +1,9 @@
 from datetime import datetime
+from functools import lru_cache
 from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL, Regexp, Optional
+from wtforms.fields.core import UnboundField
+from wtforms.validators import DataRequired, AnyOf, URL, Regexp, Optional, StopValidation, ValidationError
 
 genres_list = [
     ('Alternative', 'Alternative'),
@@ -188,3 +190,67 @@ class ArtistForm(FlaskForm):
     seeking_description = StringField(
         'seeking_description'
     )
+
+
+#----------------------------------------------------------------------------#
+# Row validation.
+#----------------------------------------------------------------------------#
+# Bulk imports check rows against the validators and choices declared on the
+# forms above, without the cost of building a form per row.
+
+
+class RowField:
+    """The parts of a wtforms field that the validators use."""
+
+    def __init__(self, data):
+        self.data = data
+        self.raw_data = [data] if data not in (None, '', []) else []
+        self.errors = []
+
+    @staticmethod
+    def gettext(string):
+        return string
+
+    @staticmethod
+    def ngettext(singular, plural, n):
+        return singular if n == 1 else plural
+
+
+@lru_cache(maxsize=None)
+def form_rules(form_class):
+    """{field name: (validators, allowed choices or None)} of form_class."""
+    rules = {}
+    for name in dir(form_class):
+        field = getattr(form_class, name)
+        if isinstance(field, UnboundField):
+            choices = field.kwargs.get('choices')
+            rules[name] = (tuple(field.kwargs.get('validators') or ()),
+                           frozenset(value for value, label in choices) if choices else None)
+    return rules
+
+
+def validate_row(form_class, row):
+    """Validate a dict of already coerced values the way form_class would.
+
+    Returns {field name: [error messages]} for the fields that failed.
+    """
+    errors = {}
+    for name, (validators, choices) in form_rules(form_class).items():
+        field = RowField(row.get(name))
+        try:
+            for validator in validators:
+                try:
+                    validator(None, field)
+                except ValidationError as error:
+                    field.errors.append(str(error))
+        except StopValidation as error:
+            if error.args and error.args[0]:
+                field.errors.append(str(error.args[0]))
+        else:
+            values = field.data if isinstance(field.data, list) else [field.data]
+            if choices is not None and field.data:
+                field.errors.extend('{0!r} is not a valid choice.'.format(value)
+                                    for value in values if value not in choices)
+        if field.errors:
+            errors[name] = field.errors
+    return errors
@@ -0,0 +1,69 @@
+from models import db
+from forms import genres_list
+
+#----------------------------------------------------------------------------#
+# Genre filters and facets.
+#----------------------------------------------------------------------------#
+# Venue.genre_mask and Artist.genre_mask hold one bit per entry of
+# genres_list, bit i for the i-th genre, computed by Postgres from the genres
+# array (the genre_mask() SQL function of the migration). Filters select the
+# rows having any of the chosen genres with one AND on the mask, and the
+# counts of every genre come from a single aggregate over the masks.
+#
+# Bits follow the order of genres_list: new genres go at the end, with a
+# migration redefining genre_mask().
+
+GENRES = [value for value, label in genres_list]
+GENRE_BITS = {genre: 1 << number for number, genre in enumerate(GENRES)}
+
+
+def genre_mask(genres):
+    mask = 0
+    for genre in genres:
+        mask |= GENRE_BITS.get(genre, 0)
+    return mask
+
+
+def selected_genres(values):
+    """The known genres among values, in genres_list order."""
+    values = set(values)
+    return [genre for genre in GENRES if genre in values]
+
+
+def unknown_genres(values):
+    return [value for value in values if value not in GENRE_BITS]
+
+
+def genre_filter(model, genres):
+    """Criteria for the rows of model with any of genres; none for no genres."""
+    if not genres:
+        return []
+    return [model.genre_mask.op('&')(genre_mask(genres)) != 0]
+
+
+def facets_select(model, *criteria, matches=None):
+    """Count the rows of model matching criteria per genre, in one pass.
+
+    The rows are counted per distinct mask first, a cheap hash aggregate
+    over the single column, and those few hundred counts are then summed
+    per genre bit. Given a list of genres as matches, a last column,
+    matches, counts the rows with any of them (all rows for none).
+    """
+    masks = db.select(model.genre_mask.label('mask'), db.func.count().label('rows')).where(
+        *criteria).group_by(model.genre_mask).subquery()
+    columns = [
+        db.func.coalesce(db.func.sum(masks.c.rows).filter(masks.c.mask.op('&')(bit) != 0), 0).label(genre)
+        for genre, bit in GENRE_BITS.items()
+    ]
+    if matches is not None:
+        total = db.func.sum(masks.c.rows)
+        if matches:
+            total = total.filter(masks.c.mask.op('&')(genre_mask(matches)) != 0)
+        columns.append(db.func.coalesce(total, 0).label('matches'))
+    return db.select(*columns)
+
+
+def facet_list(counts, selected=()):
+    """The facets of a facets_select() row, for templates."""
+    return [{'genre': genre, 'count': count, 'selected': genre in selected}
+            for genre, count in zip(GENRES, counts)]
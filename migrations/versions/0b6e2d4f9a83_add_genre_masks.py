@@ -0,0 +1,52 @@
+"""add genre masks
+
+Revision ID: 0b6e2d4f9a83
+Revises: f3b9d27c8e61
+Create Date: 2026-10-18 18:12:06.447193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6e2d4f9a83'
+down_revision = 'f3b9d27c8e61'
+branch_labels = None
+depends_on = None
+
+# forms.genres_list as of this revision; bit i is GENRES[i]. Adding a genre
+# means a migration that redefines genre_mask() with it appended and then
+# rewrites the genre_mask columns (UPDATE ... SET genres = genres).
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk',
+          'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop',
+          'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul', 'Other']
+
+
+def upgrade():
+    # genres outside the list have no bit; duplicates count once
+    op.execute('''
+        CREATE FUNCTION genre_mask(genres character varying[]) RETURNS integer
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT coalesce(bit_or(1 << (array_position(ARRAY[{0}]::character varying[], genre) - 1)), 0)
+            FROM unnest(genres) AS genre
+        $$'''.format(', '.join("'{0}'".format(genre) for genre in GENRES)))
+    # adding a stored generated column rewrites each table
+    for table in ('Venue', 'Artist'):
+        op.add_column(table, sa.Column('genre_mask', sa.Integer(),
+                                       sa.Computed('genre_mask(genres)', persisted=True),
+                                       nullable=False))
+        op.create_index('ix_{0}_genre_mask'.format(table), table, ['genre_mask'])
+    op.drop_index('ix_Artist_name_id', table_name='Artist')
+    op.create_index('ix_Artist_name_id', 'Artist', ['name', 'id'],
+                    postgresql_include=['genre_mask'])
+    op.execute('ANALYZE "Venue", "Artist"')
+
+
+def downgrade():
+    op.drop_index('ix_Artist_name_id', table_name='Artist')
+    op.create_index('ix_Artist_name_id', 'Artist', ['name', 'id'])
+    for table in ('Venue', 'Artist'):
+        op.drop_index('ix_{0}_genre_mask'.format(table), table_name=table)
+        op.drop_column(table, 'genre_mask')
+    op.execute('DROP FUNCTION genre_mask(character varying[])')
@@ -0,0 +1,45 @@
+"""add show counters
+
+Revision ID: 3a1d6c2e9b47
+Revises: b85a788fa0c8
+Create Date: 2026-10-18 09:12:04.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a1d6c2e9b47'
+down_revision = 'b85a788fa0c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Venue', 'Artist'):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+    op.add_column('Show', sa.Column('counted_as_past', sa.Boolean(),
+                                    server_default=sa.false(), nullable=False))
+
+    # backfill from the existing shows
+    op.execute('UPDATE "Show" SET counted_as_past = true WHERE start_time <= now()')
+    for table, fk in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        op.execute(
+            'UPDATE "{0}" SET '
+            'upcoming_shows_count = counts.upcoming, past_shows_count = counts.past '
+            'FROM (SELECT {1} AS id, '
+            'count(*) FILTER (WHERE NOT counted_as_past) AS upcoming, '
+            'count(*) FILTER (WHERE counted_as_past) AS past '
+            'FROM "Show" GROUP BY {1}) AS counts '
+            'WHERE "{0}".id = counts.id'.format(table, fk))
+
+
+def downgrade():
+    op.drop_column('Show', 'counted_as_past')
+    for table in ('Artist', 'Venue'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
@@ -0,0 +1,52 @@
+"""add name change times
+
+Revision ID: 4e8a1c7b2d90
+Revises: 6d2c8f1a7e45
+Create Date: 2026-10-18 21:14:05.318620
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e8a1c7b2d90'
+down_revision = '6d2c8f1a7e45'
+branch_labels = None
+depends_on = None
+
+tables = ('Venue', 'Artist')
+
+
+def upgrade():
+    # set by a trigger, so renames written with plain SQL are seen too
+    op.execute('''
+        CREATE FUNCTION touch_name_updated_at() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.name_updated_at := now();
+            RETURN NEW;
+        END
+        $$''')
+    for table in tables:
+        op.add_column(table, sa.Column('name_updated_at', sa.DateTime(timezone=True),
+                                       server_default=sa.func.now(), nullable=False))
+        op.execute('''
+            CREATE TRIGGER "{0}_name_updated_at" BEFORE UPDATE OF name ON "{0}"
+            FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+            EXECUTE FUNCTION touch_name_updated_at()'''.format(table))
+    with op.get_context().autocommit_block():
+        for table in tables:
+            op.create_index('ix_{0}_name_updated_at'.format(table), table, ['name_updated_at'],
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in reversed(tables):
+            op.drop_index('ix_{0}_name_updated_at'.format(table), table_name=table,
+                          postgresql_concurrently=True, if_exists=True)
+    for table in reversed(tables):
+        op.execute('DROP TRIGGER "{0}_name_updated_at" ON "{0}"'.format(table))
+        op.drop_column(table, 'name_updated_at')
+    op.execute('DROP FUNCTION touch_name_updated_at()')
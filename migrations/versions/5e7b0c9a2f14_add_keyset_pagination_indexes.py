@@ -0,0 +1,41 @@
+"""add keyset pagination indexes
+
+Revision ID: 5e7b0c9a2f14
+Revises: d41e9a3b6f58
+Create Date: 2026-10-18 11:26:38.902471
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e7b0c9a2f14'
+down_revision = 'd41e9a3b6f58'
+branch_labels = None
+depends_on = None
+
+indexes = [
+    ('ix_Venue_city_state_name_id', 'Venue', ['city', 'state', 'name', 'id']),
+    ('ix_Artist_name_id', 'Artist', ['name', 'id']),
+    ('ix_Show_start_time_id', 'Show', ['start_time', 'id']),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in indexes:
+            op.create_index(name, table, columns, postgresql_concurrently=True,
+                            if_not_exists=True)
+        # (start_time, id) serves every query the start_time index did
+        op.drop_index('ix_Show_start_time', table_name='Show',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_Show_start_time', 'Show', ['start_time'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        for name, table, columns in reversed(indexes):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True,
+                          if_exists=True)
@@ -0,0 +1,73 @@
+"""add areas
+
+Revision ID: 6d2c8f1a7e45
+Revises: 0b6e2d4f9a83
+Create Date: 2026-10-18 19:36:51.120548
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d2c8f1a7e45'
+down_revision = '0b6e2d4f9a83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('''
+        CREATE FUNCTION area_key(city character varying) RETURNS character varying
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT lower(btrim(regexp_replace(city, '[[:space:].,]+', ' ', 'g')))
+        $$''')
+    op.create_table('Area',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('city', sa.String(length=120), nullable=False),
+    sa.Column('state', sa.String(length=120), nullable=False),
+    sa.Column('key', sa.String(length=120), sa.Computed('area_key(city)', persisted=True),
+              nullable=False),
+    sa.Column('venue_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('artist_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'),
+              nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key', 'state', name='uq_Area_key_state')
+    )
+    for table in ('Venue', 'Artist'):
+        op.add_column(table, sa.Column('area_id', sa.Integer(), nullable=True))
+
+    # one area per distinct key, spelled as most of its rows are
+    op.execute('''
+        WITH spellings AS (
+            SELECT regexp_replace(btrim(city), '\\s+', ' ', 'g') AS city, state, count(*) AS n
+            FROM (SELECT city, state FROM "Venue" UNION ALL SELECT city, state FROM "Artist") AS catalog
+            WHERE city IS NOT NULL AND state IS NOT NULL
+            GROUP BY 1, 2)
+        INSERT INTO "Area" (city, state)
+        SELECT DISTINCT ON (area_key(city), state) city, state FROM spellings
+        ORDER BY area_key(city), state, n DESC, city''')
+    for table, count in (('Venue', 'venue_count'), ('Artist', 'artist_count')):
+        op.execute('''
+            UPDATE "{0}" AS placed SET area_id = area.id, city = area.city FROM "Area" AS area
+            WHERE area.key = area_key(placed.city) AND area.state = placed.state'''.format(table))
+        op.execute('''
+            UPDATE "Area" SET {1} = counts.n
+            FROM (SELECT area_id, count(*) AS n FROM "{0}" GROUP BY area_id) AS counts
+            WHERE "Area".id = counts.area_id'''.format(table, count))
+        # constraint and indexes after the backfill, which is faster than
+        # maintaining them
+        op.create_foreign_key('{0}_area_id_fkey'.format(table), table, 'Area', ['area_id'], ['id'])
+        op.create_index('ix_{0}_area_id_name_id'.format(table), table, ['area_id', 'name', 'id'])
+    op.execute('ANALYZE "Area", "Venue", "Artist"')
+
+
+def downgrade():
+    for table in ('Venue', 'Artist'):
+        op.drop_index('ix_{0}_area_id_name_id'.format(table), table_name=table)
+        op.drop_constraint('{0}_area_id_fkey'.format(table), table, type_='foreignkey')
+        op.drop_column(table, 'area_id')
+    op.drop_table('Area')
+    op.execute('DROP FUNCTION area_key(character varying)')
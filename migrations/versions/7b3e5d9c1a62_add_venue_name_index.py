@@ -0,0 +1,29 @@
+"""add venue name index
+
+Revision ID: 7b3e5d9c1a62
+Revises: 4e8a1c7b2d90
+Create Date: 2026-10-18 22:03:47.115209
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3e5d9c1a62'
+down_revision = '4e8a1c7b2d90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the order of /api/v1/venues, which the city first index can't serve
+    with op.get_context().autocommit_block():
+        op.create_index('ix_Venue_name_id', 'Venue', ['name', 'id'], postgresql_include=['genre_mask'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_Venue_name_id', table_name='Venue', postgresql_concurrently=True,
+                      if_exists=True)
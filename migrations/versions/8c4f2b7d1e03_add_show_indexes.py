@@ -0,0 +1,38 @@
+"""add show indexes
+
+Revision ID: 8c4f2b7d1e03
+Revises: 3a1d6c2e9b47
+Create Date: 2026-10-18 10:02:51.604217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4f2b7d1e03'
+down_revision = '3a1d6c2e9b47'
+branch_labels = None
+depends_on = None
+
+indexes = [
+    ('ix_Show_venue_id_start_time', ['venue_id', 'start_time']),
+    ('ix_Show_artist_id_start_time', ['artist_id', 'start_time']),
+    ('ix_Show_start_time', ['start_time']),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction, and doesn't
+    # block writes to a live Show table while it builds
+    with op.get_context().autocommit_block():
+        for name, columns in indexes:
+            op.create_index(name, 'Show', columns, postgresql_concurrently=True,
+                            if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, columns in reversed(indexes):
+            op.drop_index(name, table_name='Show', postgresql_concurrently=True,
+                          if_exists=True)
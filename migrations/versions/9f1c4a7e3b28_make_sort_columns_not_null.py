@@ -0,0 +1,43 @@
+"""make sort columns not null
+
+Revision ID: 9f1c4a7e3b28
+Revises: 7b3e5d9c1a62
+Create Date: 2026-10-18 22:41:09.562814
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f1c4a7e3b28'
+down_revision = '7b3e5d9c1a62'
+branch_labels = None
+depends_on = None
+
+# the keyset columns of the listings: a row comparison with a NULL is never
+# true, so rows with one would drop out of every page after the first
+columns = [
+    ('Venue', 'name'),
+    ('Venue', 'city'),
+    ('Venue', 'state'),
+    ('Artist', 'name'),
+]
+
+
+def upgrade():
+    for table, column in columns:
+        op.execute('UPDATE "{0}" SET {1} = \'\' WHERE {1} IS NULL'.format(table, column))
+    # a validated check lets SET NOT NULL skip its own scan, and validating
+    # takes a lock that lets reads and writes go on
+    for table, column in columns:
+        op.execute('ALTER TABLE "{0}" ADD CONSTRAINT "ck_{0}_{1}_not_null" CHECK ({1} IS NOT NULL) '
+                   'NOT VALID'.format(table, column))
+        op.execute('ALTER TABLE "{0}" VALIDATE CONSTRAINT "ck_{0}_{1}_not_null"'.format(table, column))
+        op.alter_column(table, column, nullable=False)
+        op.drop_constraint('ck_{0}_{1}_not_null'.format(table, column), table)
+
+
+def downgrade():
+    for table, column in reversed(columns):
+        op.alter_column(table, column, nullable=True)
@@ -0,0 +1,40 @@
+"""add row versions
+
+Revision ID: a9d3e61f7c25
+Revises: 5e7b0c9a2f14
+Create Date: 2026-10-18 13:08:44.271905
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3e61f7c25'
+down_revision = '5e7b0c9a2f14'
+branch_labels = None
+depends_on = None
+
+tables = ('Venue', 'Artist', 'Show')
+
+
+def upgrade():
+    for table in tables:
+        op.add_column(table, sa.Column('version', sa.Integer(),
+                                       server_default='1', nullable=False))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True),
+                                       server_default=sa.func.now(), nullable=False))
+    with op.get_context().autocommit_block():
+        for table in tables:
+            op.create_index('ix_{0}_updated_at'.format(table), table, ['updated_at'],
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in reversed(tables):
+            op.drop_index('ix_{0}_updated_at'.format(table), table_name=table,
+                          postgresql_concurrently=True, if_exists=True)
+    for table in reversed(tables):
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
@@ -0,0 +1,99 @@
+"""partition shows by month
+
+Revision ID: c7a4e19d3b52
+Revises: e2b8f4a06d91
+Create Date: 2026-10-18 16:20:37.802114
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a4e19d3b52'
+down_revision = 'e2b8f4a06d91'
+branch_labels = None
+depends_on = None
+
+indexes = [
+    ('ix_Show_venue_id_start_time', ['venue_id', 'start_time']),
+    ('ix_Show_artist_id_start_time', ['artist_id', 'start_time']),
+    ('ix_Show_start_time_id', ['start_time', 'id']),
+    ('ix_Show_updated_at', ['updated_at']),
+]
+columns = 'id, artist_id, venue_id, start_time, counted_as_past, version, updated_at'
+
+# monthly partitions are created for the shows of the last year and the
+# next month; older shows go to the archive partition straight away
+MONTHS_BACK = 12
+MONTHS_AHEAD = 1
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.datetime(index // 12, index % 12 + 1, 1)
+
+
+def create_show_table(primary_key, **kwargs):
+    op.create_table('Show',
+    sa.Column('id', sa.Integer(), server_default=sa.text('nextval(\'"Show_id_seq"\'::regclass)'),
+              nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('counted_as_past', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'),
+              nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ),
+    primary_key,
+    **kwargs
+    )
+
+
+def replace_show_table(create):
+    """Swap "Show" for the table create() makes, copying every row over.
+
+    The copy rewrites the whole table and holds an exclusive lock on it
+    until the migration commits.
+    """
+    op.rename_table('Show', 'Show_old')
+    # constraint and index names are schema wide, so free them first
+    for name, in op.get_bind().execute(sa.text(
+            "SELECT conname FROM pg_constraint WHERE conrelid = '\"Show_old\"'::regclass")):
+        op.drop_constraint(name, 'Show_old')
+    for name, table_columns in indexes:
+        op.execute('DROP INDEX IF EXISTS "{0}"'.format(name))
+    op.execute('DROP INDEX IF EXISTS "ix_Show_start_time"')
+    op.alter_column('Show_old', 'id', server_default=None)
+
+    create()
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY "Show".id')
+    op.execute('INSERT INTO "Show" ({0}) SELECT {0} FROM "Show_old"'.format(columns))
+    op.drop_table('Show_old')
+    for name, table_columns in indexes:
+        op.create_index(name, 'Show', table_columns)
+
+
+def upgrade():
+    def create():
+        create_show_table(sa.PrimaryKeyConstraint('id', 'start_time'),
+                          postgresql_partition_by='RANGE (start_time)')
+        now = datetime.datetime.now()
+        month = add_months(datetime.datetime(now.year, now.month, 1), -MONTHS_BACK)
+        op.execute('CREATE TABLE "Show_archive" PARTITION OF "Show" '
+                   "FOR VALUES FROM (MINVALUE) TO ('{0}')".format(month))
+        while month <= add_months(datetime.datetime(now.year, now.month, 1), MONTHS_AHEAD):
+            op.execute('CREATE TABLE "Show_p{0:%Y%m}" PARTITION OF "Show" '
+                       "FOR VALUES FROM ('{0}') TO ('{1}')".format(month, add_months(month, 1)))
+            month = add_months(month, 1)
+        op.execute('CREATE TABLE "Show_default" PARTITION OF "Show" DEFAULT')
+    replace_show_table(create)
+    op.execute('ANALYZE "Show"')
+
+
+def downgrade():
+    replace_show_table(lambda: create_show_table(sa.PrimaryKeyConstraint('id')))
@@ -0,0 +1,33 @@
+"""add name trigram indexes
+
+Revision ID: d41e9a3b6f58
+Revises: 8c4f2b7d1e03
+Create Date: 2026-10-18 10:41:17.330962
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41e9a3b6f58'
+down_revision = '8c4f2b7d1e03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        for table in ('Venue', 'Artist'):
+            op.create_index('ix_{0}_name_trgm'.format(table), table, ['name'],
+                            postgresql_using='gin',
+                            postgresql_ops={'name': 'gin_trgm_ops'},
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in ('Artist', 'Venue'):
+            op.drop_index('ix_{0}_name_trgm'.format(table), table_name=table,
+                          postgresql_concurrently=True, if_exists=True)
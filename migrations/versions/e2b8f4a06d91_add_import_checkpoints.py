@@ -0,0 +1,31 @@
+"""add import checkpoints
+
+Revision ID: e2b8f4a06d91
+Revises: a9d3e61f7c25
+Create Date: 2026-10-18 14:31:09.557310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b8f4a06d91'
+down_revision = 'a9d3e61f7c25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ImportCheckpoint',
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('records', sa.Integer(), nullable=False),
+    sa.Column('inserted', sa.Integer(), nullable=False),
+    sa.Column('rejected', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('source')
+    )
+
+
+def downgrade():
+    op.drop_table('ImportCheckpoint')
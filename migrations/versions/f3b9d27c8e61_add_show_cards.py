@@ -0,0 +1,46 @@
+"""add show cards
+
+Revision ID: f3b9d27c8e61
+Revises: c7a4e19d3b52
+Create Date: 2026-10-18 17:05:42.318906
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b9d27c8e61'
+down_revision = 'c7a4e19d3b52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ShowCard',
+    sa.Column('show_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('venue_name', sa.String(), nullable=True),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('artist_name', sa.String(), nullable=True),
+    sa.Column('artist_image_link', sa.String(length=500), nullable=True),
+    sa.PrimaryKeyConstraint('show_id')
+    )
+    op.execute('INSERT INTO "ShowCard" (show_id, start_time, venue_id, venue_name, '
+               'artist_id, artist_name, artist_image_link) '
+               'SELECT s.id, s.start_time, s.venue_id, v.name, s.artist_id, a.name, a.image_link '
+               'FROM "Show" s JOIN "Venue" v ON v.id = s.venue_id '
+               'JOIN "Artist" a ON a.id = s.artist_id ORDER BY s.start_time, s.id')
+    # indexes after the backfill, which is faster than maintaining them
+    op.create_index('ix_ShowCard_start_time_show_id', 'ShowCard', ['start_time', 'show_id'])
+    op.create_index('ix_ShowCard_venue_id', 'ShowCard', ['venue_id'])
+    op.create_index('ix_ShowCard_artist_id', 'ShowCard', ['artist_id'])
+    op.execute('ANALYZE "ShowCard"')
+
+
+def downgrade():
+    op.drop_index('ix_ShowCard_artist_id', table_name='ShowCard')
+    op.drop_index('ix_ShowCard_venue_id', table_name='ShowCard')
+    op.drop_index('ix_ShowCard_start_time_show_id', table_name='ShowCard')
+    op.drop_table('ShowCard')
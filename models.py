@@ -2,28 +2,91 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 import datetime
 
-db = SQLAlchemy()
+from replicas import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
 
 
+class Area(db.Model):
+    """A city of a state, which venues and artists are in; see areas.py."""
+    __tablename__ = 'Area'
+    __table_args__ = (
+        # looks areas up by spelling and lists them in city order
+        db.UniqueConstraint('key', 'state', name='uq_Area_key_state'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # the spelling shown, that of the first or most common row
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    # city in lower case with runs of spaces and punctuation collapsed,
+    # computed by the area_key() SQL function
+    key = db.Column(db.String(120), db.Computed('area_key(city)', persisted=True), nullable=False)
+    # denormalized counts, maintained by areas.py
+    venue_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    artist_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # bumped by every UPDATE issued through SQLAlchemy, see conditional.py
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1',
+                        onupdate=db.literal_column('version + 1'))
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                           server_default=db.func.now(), onupdate=db.func.now())
+
+    def __repr__(self):
+        return f'id: {self.id} city:{self.city} state:{self.state}'
+
+
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_Venue_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_Venue_city_state_name_id', 'city', 'state', 'name', 'id'),
+        # the order of /api/v1/venues, with genre_mask as on ix_Artist_name_id
+        db.Index('ix_Venue_name_id', 'name', 'id', postgresql_include=['genre_mask']),
+        db.Index('ix_Venue_updated_at', 'updated_at'),
+        db.Index('ix_Venue_name_updated_at', 'name_updated_at'),
+        # facet counts read the masks alone, from an index only scan
+        db.Index('ix_Venue_genre_mask', 'genre_mask'),
+        db.Index('ix_Venue_area_id_name_id', 'area_id', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
-    city = db.Column(db.String(120))
-    state = db.Column(db.String(120))
+    # not null, as keys of the listings' keyset pages
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    # set with city and state by areas.place()
+    area_id = db.Column(db.Integer, db.ForeignKey('Area.id'))
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
     genres = db.Column(db.ARRAY(db.String), nullable=False)
+    # one bit per entry of forms.genres_list, computed by Postgres from
+    # genres on every write; see genres.py
+    genre_mask = db.Column(db.Integer, db.Computed('genre_mask(genres)', persisted=True),
+                           nullable=False)
     facebook_link = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     website_link = db.Column(db.String)
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.String)
+    # denormalized show counters, maintained by counters.py
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    # bumped by every UPDATE issued through SQLAlchemy, see conditional.py
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1',
+                        onupdate=db.literal_column('version + 1'))
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                           server_default=db.func.now(), onupdate=db.func.now())
+    # set by a trigger when name changes, unlike updated_at, which counter
+    # updates bump too; autocomplete.py reads the renames since a time
+    name_updated_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                                server_default=db.func.now())
 
     shows = db.relationship('Show', backref='show_venue', lazy=True)
 
@@ -33,18 +96,49 @@ class Venue(db.Model):
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        # genre_mask is included so genre filtered pages stay index only scans
+        db.Index('ix_Artist_name_id', 'name', 'id', postgresql_include=['genre_mask']),
+        db.Index('ix_Artist_updated_at', 'updated_at'),
+        db.Index('ix_Artist_name_updated_at', 'name_updated_at'),
+        db.Index('ix_Artist_genre_mask', 'genre_mask'),
+        db.Index('ix_Artist_area_id_name_id', 'area_id', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
+    # not null, as the key of /artists' keyset pages
+    name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
+    # set with city and state by areas.place()
+    area_id = db.Column(db.Integer, db.ForeignKey('Area.id'))
     phone = db.Column(db.String(120))
     genres = db.Column(db.ARRAY(db.String), nullable=False)
+    # one bit per entry of forms.genres_list, computed by Postgres from
+    # genres on every write; see genres.py
+    genre_mask = db.Column(db.Integer, db.Computed('genre_mask(genres)', persisted=True),
+                           nullable=False)
     facebook_link = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     website_link = db.Column(db.String)
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String)
+    # denormalized show counters, maintained by counters.py
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    # bumped by every UPDATE issued through SQLAlchemy, see conditional.py
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1',
+                        onupdate=db.literal_column('version + 1'))
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                           server_default=db.func.now(), onupdate=db.func.now())
+    # set by a trigger when name changes, unlike updated_at, which counter
+    # updates bump too; autocomplete.py reads the renames since a time
+    name_updated_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                                server_default=db.func.now())
 
     shows = db.relationship('Show', backref='show_artist', lazy=True)
 
@@ -54,11 +148,67 @@ class Artist(db.Model):
 
 class Show(db.Model):
     __tablename__ = 'Show'
-    id = db.Column(db.Integer, primary_key=True)
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+        db.Index('ix_Show_updated_at', 'updated_at'),
+        # monthly partitions, see partitions.py
+        {'postgresql_partition_by': 'RANGE (start_time)'},
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     artist_id = db.Column(db.Integer, db.ForeignKey(
         'Artist.id'), nullable=False)
     venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
-    start_time = db.Column(db.DateTime(), nullable=False)
+    # part of the table's primary key, as Postgres requires of the
+    # partition key; rows are still identified by id alone
+    start_time = db.Column(db.DateTime(), primary_key=True)
+    # whether the show is counted in past_shows_count of its venue and artist
+    counted_as_past = db.Column(
+        db.Boolean, nullable=False, default=False, server_default=db.false())
+    # bumped by every UPDATE issued through SQLAlchemy, see conditional.py
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1',
+                        onupdate=db.literal_column('version + 1'))
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                           server_default=db.func.now(), onupdate=db.func.now())
+
+    __mapper_args__ = {'primary_key': [id]}
 
     def __repr__(self):
         return f'id: {self.id} venue_id:{self.venue_id} artist_id:{self.artist_id} start_time:{self.start_time}'
+
+
+class ShowCard(db.Model):
+    """A show as the /shows page lists it, maintained by show_cards.py."""
+    __tablename__ = 'ShowCard'
+    __table_args__ = (
+        db.Index('ix_ShowCard_start_time_show_id', 'start_time', 'show_id'),
+        db.Index('ix_ShowCard_venue_id', 'venue_id'),
+        db.Index('ix_ShowCard_artist_id', 'artist_id'),
+    )
+    # no foreign key: the primary key of the partitioned "Show" includes
+    # start_time
+    show_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    start_time = db.Column(db.DateTime(), nullable=False)
+    venue_id = db.Column(db.Integer, nullable=False)
+    venue_name = db.Column(db.String)
+    artist_id = db.Column(db.Integer, nullable=False)
+    artist_name = db.Column(db.String)
+    artist_image_link = db.Column(db.String(500))
+
+    def __repr__(self):
+        return f'show_id: {self.show_id} venue:{self.venue_name} artist:{self.artist_name}'
+
+
+class ImportCheckpoint(db.Model):
+    """Progress of a bulk import, committed with each chunk it covers."""
+    __tablename__ = 'ImportCheckpoint'
+    source = db.Column(db.String, primary_key=True)
+    records = db.Column(db.Integer, nullable=False, default=0)
+    inserted = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                           server_default=db.func.now(), onupdate=db.func.now())
+
+    def __repr__(self):
+        return f'source: {self.source} records:{self.records}'
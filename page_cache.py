@@ -0,0 +1,214 @@
+from collections import OrderedDict
+from functools import wraps
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+
+from flask import g, make_response, request, session
+
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+# Rendered GET responses keyed by path and query string. Every cached page
+# names the tags it depends on (e.g. 'venue:3'); the current generation of
+# each tag is part of the key, so invalidating a tag just gives it a new
+# generation and the stale entries age out of the backend on their own.
+# Under @conditional, the validator token of the request is part of the key
+# too, so a page whose rows changed is rendered again whatever the tags say.
+
+
+class MemoryBackend:
+    """Per-process LRU with a TTL on every entry."""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl if ttl else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FileSystemBackend:
+    """Entries stored as files in a directory shared by all workers.
+
+    Reads refresh the file's mtime, so pruning the oldest mtimes once the
+    directory grows past max_entries approximates LRU across processes.
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, directory, max_entries=10000):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._sets = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as entry:
+                expires_at, value = pickle.load(entry)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires_at is not None and expires_at < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value, ttl=None):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        with os.fdopen(fd, 'wb') as entry:
+            pickle.dump((time.time() + ttl if ttl else None, value), entry,
+                        pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+        self._sets += 1
+        if self._sets % self.PRUNE_EVERY == 0:
+            self._prune()
+
+    def _prune(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith('.tmp'):
+                continue
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                pass
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for mtime, path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except OSError:
+                pass
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if not entry.name.startswith('.tmp'):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def __len__(self):
+        return sum(1 for entry in os.scandir(self.directory) if not entry.name.startswith('.tmp'))
+
+
+class PageCache:
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = None
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('PAGE_CACHE_BACKEND')
+        max_entries = app.config.get('PAGE_CACHE_MAX_ENTRIES', 1000)
+        if backend == 'memory':
+            self.backend = MemoryBackend(max_entries)
+        elif backend == 'filesystem':
+            self.backend = FileSystemBackend(app.config['PAGE_CACHE_DIR'], max_entries)
+        elif backend:
+            raise ValueError('Unknown PAGE_CACHE_BACKEND {0!r}'.format(backend))
+        self.ttl = app.config.get('PAGE_CACHE_TTL')
+
+    def _generation(self, tag):
+        generation = self.backend.get('gen:' + tag)
+        if generation is None:
+            # a fresh token, so entries written under a lost generation
+            # can never be served again
+            generation = uuid.uuid4().hex
+            self.backend.set('gen:' + tag, generation)
+        return generation
+
+    def invalidate(self, *tags):
+        if self.backend is None:
+            return
+        for tag in tags:
+            self.backend.set('gen:' + tag, uuid.uuid4().hex)
+
+    def clear(self):
+        """Drop every page, e.g. after a bulk change to the catalog."""
+        if self.backend is not None:
+            self.backend.clear()
+
+    def cached(self, tags):
+        """Cache a GET view; tags maps the view arguments to the tags the
+        rendered page depends on."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # pages rendered with pending flash messages are one-offs
+                if self.backend is None or request.method != 'GET' or session.get('_flashes'):
+                    return view(*args, **kwargs)
+                key = 'page:{0}|{1}|{2}'.format(request.full_path, g.get('validator_token', ''), '|'.join(
+                    self._generation(tag) for tag in tags(*args, **kwargs)))
+                cached = self.backend.get(key)
+                if cached is not None:
+                    self.hits += 1
+                    body, status, headers = cached
+                    return body, status, headers
+                self.misses += 1
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    self.backend.set(key, (response.get_data(), 200, {
+                        'Content-Type': response.content_type}), self.ttl)
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self):
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'pid': os.getpid(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.backend.evictions if self.backend else 0,
+            'entries': len(self.backend) if self.backend else 0,
+        }
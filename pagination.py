@@ -0,0 +1,111 @@
+import base64
+import datetime
+import json
+
+from sqlalchemy import tuple_
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#----------------------------------------------------------------------------#
+# Pages are addressed by the sort key of their first/last row instead of an
+# OFFSET, so every page is a single index range scan no matter how deep it
+# is. Cursors are the url-safe base64 of that key; one that doesn't hold a
+# value of the right type for every sort column is treated as missing.
+
+
+class Page:
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return datetime.datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(key):
+    raw = json.dumps([_encode_value(value) for value in key], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _fits(value, column):
+    if value is None:
+        return True
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return True
+    if isinstance(value, bool) and python_type is not bool:
+        return False
+    if isinstance(value, str) and '\x00' in value:
+        # which psycopg2 refuses to send
+        return False
+    return isinstance(value, python_type)
+
+
+def decode_cursor(cursor, columns):
+    """The sort key stored in cursor, or None if it is missing, malformed or
+    not a value of each of columns' types."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key = [_decode_value(value) for value in json.loads(raw)]
+    except (ValueError, TypeError, KeyError):
+        return None
+    if len(key) != len(columns) or not all(map(_fits, key, columns)):
+        return None
+    return key
+
+
+def keyset_select(query, columns, per_page, after=None, before=None):
+    """Limit query (a Query or a select()) to the rows of the page that
+    follows the decoded after key, or precedes the before key."""
+    sort_key = tuple_(*columns)
+    if before is not None:
+        return query.filter(sort_key < tuple_(*before)).order_by(
+            *[column.desc() for column in columns]).limit(per_page + 1)
+    if after is not None:
+        query = query.filter(sort_key > tuple_(*after))
+    return query.order_by(*columns).limit(per_page + 1)
+
+
+def keyset_result(rows, key, per_page, after=None, before=None):
+    """The Page for the rows fetched with keyset_select."""
+    if before is not None:
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        return Page(rows,
+                    next_cursor=encode_cursor(key(rows[-1])) if rows else encode_cursor(before),
+                    prev_cursor=encode_cursor(key(rows[0])) if has_more else None)
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    prev_cursor = None
+    if after is not None:
+        prev_cursor = encode_cursor(key(rows[0])) if rows else encode_cursor(after)
+    return Page(rows,
+                next_cursor=encode_cursor(key(rows[-1])) if has_more else None,
+                prev_cursor=prev_cursor)
+
+
+def keyset_page(query, columns, key, per_page, after=None, before=None):
+    """Return the Page of query that follows the after cursor, or precedes
+    the before cursor, ordered ascending by columns.
+
+    columns must make the ordering unique (end with the primary key) and key
+    maps a result row to the values of columns.
+    """
+    after, before = decode_cursor(after, columns), decode_cursor(before, columns)
+    rows = keyset_select(query, columns, per_page, after, before).all()
+    return keyset_result(rows, key, per_page, after, before)
@@ -0,0 +1,160 @@
+import datetime
+import re
+
+from models import db
+
+#----------------------------------------------------------------------------#
+# Show partitions.
+#----------------------------------------------------------------------------#
+# "Show" is range partitioned on start_time: one partition per month from
+# the archive cutoff to SHOW_PARTITION_MONTHS_AHEAD months ahead,
+# "Show_archive" for everything older and "Show_default" for shows further
+# ahead. Queries for upcoming shows (start_time > now) are pruned to the
+# current month, the next ones and the default partition; the past ones
+# read the archive like any other partition.
+#
+# create_partitions() (flask fyyur create-partitions, run daily) adds the
+# coming months, moving their rows out of the default partition, and
+# archive_partitions() (flask fyyur archive-shows) folds old months into
+# the archive, rewritten in (venue_id, start_time) order.
+
+PARENT = 'Show'
+ARCHIVE = 'Show_archive'
+ARCHIVE_REWRITE = 'Show_archive_new'
+DEFAULT = 'Show_default'
+MONTH_NAME = 'Show_p{0:%Y%m}'
+MONTH_PATTERN = re.compile(r'^Show_p(\d{4})(\d{2})$')
+UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def month_start(value):
+    return datetime.datetime(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.datetime(index // 12, index % 12 + 1, 1)
+
+
+def partitions():
+    """({month start: partition name}, archive upper bound or None)."""
+    rows = db.session.execute(db.text(
+        'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i '
+        'JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = CAST(:parent AS regclass)'),
+        {'parent': '"{0}"'.format(PARENT)}).all()
+    months, archived_until = {}, None
+    for name, bound in rows:
+        match = MONTH_PATTERN.match(name)
+        if match:
+            months[datetime.datetime(int(match.group(1)), int(match.group(2)), 1)] = name
+        elif name == ARCHIVE:
+            archived_until = datetime.datetime.fromisoformat(UPPER_BOUND.search(bound).group(1))
+    return months, archived_until
+
+
+def _attach(name, start, end):
+    # rows of the range may be waiting in the default partition, which
+    # would make a plain CREATE TABLE ... PARTITION OF fail
+    db.session.execute(db.text(
+        'CREATE TABLE "{0}" (LIKE "{1}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'.format(name, PARENT)))
+    db.session.execute(db.text(
+        'WITH moved AS (DELETE FROM "{0}" WHERE start_time >= :start AND start_time < :end '
+        'RETURNING *) INSERT INTO "{1}" SELECT * FROM moved'.format(DEFAULT, name)),
+        {'start': start, 'end': end})
+    db.session.execute(db.text(
+        'ALTER TABLE "{0}" ATTACH PARTITION "{1}" FOR VALUES FROM (:start) TO (:end)'.format(
+            PARENT, name)), {'start': start, 'end': end})
+
+
+def create_partitions(months_ahead, now=None):
+    """Create the monthly partitions missing up to months_ahead months past
+    the current one, and return their names.
+
+    Months skipped since the last run are filled in too, so the monthly
+    partitions stay contiguous from the archive cutoff.
+    """
+    months, archived_until = partitions()
+    current = month_start(now or datetime.datetime.now())
+    last = add_months(current, months_ahead)
+    # with neither monthly partitions nor an archive, from the current month
+    month = add_months(max(months), 1) if months else archived_until or current
+    created = []
+    while month <= last:
+        name = MONTH_NAME.format(month)
+        _attach(name, month, add_months(month, 1))
+        created.append(name)
+        month = add_months(month, 1)
+    db.session.commit()
+    return created
+
+
+def _table_list(names):
+    return ', '.join('"{0}"'.format(name) for name in names)
+
+
+def archive_partitions(before, now=None):
+    """Fold the monthly partitions ending by before into the archive and
+    return how many shows moved.
+
+    The archive and those months are copied, in (venue_id, start_time)
+    order, into a new table while they only accept reads. Before "Show" is
+    locked, the new table gets the indexes and validated foreign keys of
+    "Show", plus a validated CHECK of its new upper bound, so attaching it
+    needs no scan of its rows. "Show" is then locked only to swap the
+    tables: detaching the old ones, attaching the new one (which reads
+    just the default partition, to check it holds none of the range) and
+    dropping the old ones. Everything is one transaction, so readers never
+    miss rows.
+    """
+    before = month_start(before)
+    if before > month_start(now or datetime.datetime.now()):
+        raise ValueError('only months that have ended can be archived')
+    months, archived_until = partitions()
+    folded = sorted(month for month in months if add_months(month, 1) <= before)
+    if not folded:
+        return 0
+    end = add_months(folded[-1], 1)
+    sources = ([ARCHIVE] if archived_until else []) + [months[month] for month in folded]
+
+    # writes to the shows being moved wait for the swap; reads go on
+    db.session.execute(db.text('LOCK TABLE {0} IN SHARE MODE'.format(_table_list(sources))))
+    db.session.execute(db.text(
+        'CREATE TABLE "{0}" (LIKE "{1}" INCLUDING ALL)'.format(ARCHIVE_REWRITE, PARENT)))
+    moved = sum(db.session.execute(db.text('SELECT count(*) FROM "{0}"'.format(months[month]))).scalar()
+                for month in folded)
+    db.session.execute(db.text('INSERT INTO "{0}" SELECT * FROM ({1}) AS shows ORDER BY venue_id, start_time'.format(
+        ARCHIVE_REWRITE, ' UNION ALL '.join('SELECT * FROM "{0}"'.format(name) for name in sources))))
+    db.session.execute(db.text(
+        'ALTER TABLE "{0}" ADD CONSTRAINT "{1}_bound" CHECK (start_time < :end)'.format(
+            ARCHIVE_REWRITE, ARCHIVE)),
+        {'end': end})
+    foreign_keys = db.session.execute(db.text(
+        'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+        "WHERE conrelid = CAST(:parent AS regclass) AND contype = 'f'"),
+        {'parent': '"{0}"'.format(PARENT)}).all()
+    for name, definition in foreign_keys:
+        # NOT VALID then VALIDATE: the check doesn't block writes to the
+        # referenced tables
+        db.session.execute(db.text('ALTER TABLE "{0}" ADD CONSTRAINT "{1}" {2} NOT VALID'.format(
+            ARCHIVE_REWRITE, name, definition)))
+        db.session.execute(db.text('ALTER TABLE "{0}" VALIDATE CONSTRAINT "{1}"'.format(
+            ARCHIVE_REWRITE, name)))
+
+    for name in sources:
+        db.session.execute(db.text('ALTER TABLE "{0}" DETACH PARTITION "{1}"'.format(PARENT, name)))
+    db.session.execute(db.text(
+        'ALTER TABLE "{0}" ATTACH PARTITION "{1}" FOR VALUES FROM (MINVALUE) TO (:end)'.format(
+            PARENT, ARCHIVE_REWRITE)), {'end': end})
+    db.session.execute(db.text('DROP TABLE {0}'.format(_table_list(sources))))
+    db.session.execute(db.text('ALTER TABLE "{0}" RENAME TO "{1}"'.format(ARCHIVE_REWRITE, ARCHIVE)))
+    # index names are schema wide; give the new ones the archive's names
+    indexes = db.session.execute(db.text(
+        'SELECT relname FROM pg_class WHERE oid IN (SELECT indexrelid FROM pg_index '
+        'WHERE indrelid = CAST(:archive AS regclass))'), {'archive': '"{0}"'.format(ARCHIVE)}).scalars().all()
+    for name in indexes:
+        db.session.execute(db.text('ALTER INDEX "{0}" RENAME TO "{1}"'.format(
+            name, ARCHIVE + name[len(ARCHIVE_REWRITE):])))
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE "{0}"'.format(ARCHIVE)))
+    db.session.commit()
+    return moved
@@ -0,0 +1,105 @@
+import datetime
+
+from flask import current_app
+from sqlalchemy import select, union_all
+
+from models import db, Area, Venue, Artist, Show
+from genres import facets_select, genre_filter
+
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+# Read queries shared by the html pages in app.py, the json api in api.py
+# and the async read path in asgi.py, which runs the same statements.
+
+
+def search_criteria(model, search_term, city=None, state=None):
+    """Criteria of the venues or artists whose name contains search_term.
+
+    The substring match is served by the pg_trgm GIN index on name.
+    """
+    pattern = '%{0}%'.format(search_term.replace('\\', '\\\\').replace(
+        '%', '\\%').replace('_', '\\_'))
+    criteria = [model.name.ilike(pattern, escape='\\')]
+    if city:
+        # by area, so every spelling of the city matches
+        criteria.append(model.area_id.in_(
+            select(Area.id).where(Area.key == db.func.area_key(city))))
+    if state:
+        criteria.append(model.state == state)
+    return criteria
+
+
+def search_select(model, search_term, city=None, state=None, limit=50, genres=()):
+    """Venues or artists whose name contains search_term and that have any
+    of genres, best matches first: by trigram similarity to the term."""
+    query = select(model.id, model.name, model.upcoming_shows_count).where(
+        *search_criteria(model, search_term, city, state), *genre_filter(model, genres))
+    return query.order_by(db.func.similarity(model.name, search_term).desc(), model.name, model.id).limit(limit)
+
+
+def search_facets_select(model, search_term, city=None, state=None, genres=()):
+    """Genre counts of all the matches of search_term, whatever genres are
+    selected, so the counts show what selecting another genre adds, and the
+    number of matches with any of genres, of which search_select returns
+    the best."""
+    return facets_select(model, *search_criteria(model, search_term, city, state), matches=genres)
+
+
+def in_window(upcoming, now):
+    """Upcoming (start_time > now) or past shows, flagged by an upcoming
+    column. Past and upcoming are separate branches of one UNION ALL, so
+    the upcoming branch is pruned to the partitions from now on (see
+    partitions.py)."""
+    flag = (db.true() if upcoming else db.false()).label('upcoming')
+    return flag, Show.start_time > now if upcoming else Show.start_time <= now
+
+
+def venue_shows_select(venue_id, now):
+    """The venue's past then upcoming shows with the artist columns its page
+    needs, by start_time."""
+    def branch(upcoming):
+        flag, window = in_window(upcoming, now)
+        return select(
+            Show.artist_id, Artist.name.label('artist_name'),
+            Artist.image_link.label('artist_image_link'), Show.start_time, flag
+        ).join(Artist, Show.artist_id == Artist.id).where(Show.venue_id == venue_id, window)
+    return union_all(branch(False), branch(True)).order_by('start_time')
+
+
+def artist_shows_select(artist_id, now):
+    """The artist's past then upcoming shows with the venue columns its page
+    needs, by start_time."""
+    def branch(upcoming):
+        flag, window = in_window(upcoming, now)
+        return select(
+            Show.venue_id, Venue.name.label('venue_name'),
+            Venue.image_link.label('venue_image_link'), Show.start_time, flag
+        ).join(Venue, Show.venue_id == Venue.id).where(Show.artist_id == artist_id, window)
+    return union_all(branch(False), branch(True)).order_by('start_time')
+
+
+def split_shows(rows):
+    """(past, upcoming) show dicts of the rows of a *_shows_select."""
+    past, upcoming = [], []
+    for row in rows:
+        show = row._asdict()
+        (upcoming if show.pop('upcoming') else past).append(show)
+    return past, upcoming
+
+
+def search_by_name(model, search_term, city=None, state=None, genres=()):
+    return db.session.execute(search_select(
+        model, search_term, city, state, current_app.config['SEARCH_RESULTS_LIMIT'], genres)).all()
+
+
+def venue_shows(venue_id, now=None):
+    """(past, upcoming) shows of the venue, in one statement."""
+    now = now or datetime.datetime.now()
+    return split_shows(db.session.execute(venue_shows_select(venue_id, now)))
+
+
+def artist_shows(artist_id, now=None):
+    """(past, upcoming) shows of the artist, in one statement."""
+    now = now or datetime.datetime.now()
+    return split_shows(db.session.execute(artist_shows_select(artist_id, now)))
@@ -0,0 +1,116 @@
+import itertools
+import threading
+import time
+
+import sqlalchemy as sa
+from flask import current_app, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+
+#----------------------------------------------------------------------------#
+# Read replicas.
+#----------------------------------------------------------------------------#
+# GET and HEAD requests read from the replicas in SQLALCHEMY_REPLICA_URIS,
+# round-robin over the ones that pass their health check. Everything else
+# uses the primary: writes, SELECT ... FOR UPDATE, other request methods,
+# CLI commands, the rest of a request once it has written, and the next
+# REPLICA_STICKY_SECONDS of requests from a browser that just wrote, so
+# users read their own writes while the replicas catch up.
+
+
+class Replica:
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.healthy = True
+        self.checked_at = time.monotonic()
+
+    def check(self, interval):
+        """Probe the replica when its last check is older than interval."""
+        if time.monotonic() - self.checked_at < interval:
+            return self.healthy
+        try:
+            with self.engine.connect() as connection:
+                connection.exec_driver_sql('SELECT 1')
+            self.healthy = True
+        except sa.exc.DBAPIError:
+            self.healthy = False
+        self.checked_at = time.monotonic()
+        return self.healthy
+
+    def failed(self):
+        self.healthy = False
+        self.checked_at = time.monotonic()
+
+
+class ReplicaSet:
+
+    def __init__(self, app=None):
+        self.replicas = []
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        for uri in app.config.get('SQLALCHEMY_REPLICA_URIS', ()):
+            replica = Replica(sa.create_engine(uri, **options))
+            sa.event.listen(replica.engine, 'handle_error', self._on_error(replica))
+            self.replicas.append(replica)
+        self.check_interval = app.config.get('REPLICA_CHECK_INTERVAL', 10)
+        app.extensions['replicas'] = self
+
+    @staticmethod
+    def _on_error(replica):
+        def handle_error(context):
+            if context.is_disconnect:
+                replica.failed()
+        return handle_error
+
+    def choose(self):
+        """Next healthy replica engine in round-robin order, or None."""
+        healthy = [replica for replica in self.replicas if replica.check(self.check_interval)]
+        if not healthy:
+            return None
+        with self._lock:
+            turn = next(self._turn)
+        return healthy[turn % len(healthy)].engine
+
+    def stats(self):
+        return [{'url': replica.engine.url.render_as_string(hide_password=True),
+                 'healthy': replica.healthy} for replica in self.replicas]
+
+
+def _writes(clause):
+    if isinstance(clause, sa.sql.dml.UpdateBase):
+        return True
+    return getattr(clause, '_for_update_arg', None) is not None
+
+
+def read_from_primary():
+    """Send this browser's reads to the primary for a while after a write."""
+    session['read_primary_until'] = time.time() + current_app.config.get(
+        'REPLICA_STICKY_SECONDS', 5)
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of GET requests to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or self.info.get('primary'):
+            return primary
+        if self._flushing or _writes(clause):
+            # this request reads its own writes from now on
+            self.info['primary'] = True
+            if has_request_context():
+                read_from_primary()
+            return primary
+        if not has_request_context() or request.method not in ('GET', 'HEAD') \
+                or session.get('read_primary_until', 0) > time.time():
+            return primary
+        if 'replica' not in self.info:
+            # one replica for the whole request, so its reads are consistent
+            replicas = current_app.extensions.get('replicas')
+            self.info['replica'] = replicas.choose() if replicas else None
+        return self.info['replica'] or primary
@@ -0,0 +1,92 @@
+from sqlalchemy import insert
+
+from models import db, Venue, Artist, Show, ShowCard
+
+#----------------------------------------------------------------------------#
+# Show cards.
+#----------------------------------------------------------------------------#
+# ShowCard holds each show with the venue name, artist name and artist image
+# the /shows tiles display, so the page reads one table in (start_time,
+# show_id) order instead of joining Show, Venue and Artist per request.
+# The handlers that add or delete shows and edit venues or artists update
+# the cards in the same transaction; card_drift() (flask fyyur
+# verify-show-cards) compares them with the base tables.
+
+CARD_COLUMNS = ['show_id', 'start_time', 'venue_id', 'venue_name', 'artist_id',
+                'artist_name', 'artist_image_link']
+
+
+def expected_cards(*criteria):
+    """The cards of the shows matching criteria, computed from the base tables."""
+    return db.select(
+        Show.id.label('show_id'), Show.start_time, Show.venue_id,
+        Venue.name.label('venue_name'), Show.artist_id,
+        Artist.name.label('artist_name'), Artist.image_link.label('artist_image_link')
+    ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id).where(*criteria)
+
+
+def cards_added(*criteria):
+    """Add the cards of the new shows matching criteria. Call after flush."""
+    db.session.execute(insert(ShowCard).from_select(CARD_COLUMNS, expected_cards(*criteria)))
+
+
+def card_added(show):
+    cards_added(Show.id == show.id, Show.start_time == show.start_time)
+
+
+def cards_removed(*criteria):
+    """Delete the cards matching criteria (on ShowCard). Call before commit."""
+    db.session.query(ShowCard).filter(*criteria).delete(synchronize_session=False)
+
+
+def venue_changed(venue):
+    """Copy the name of venue to its cards."""
+    db.session.query(ShowCard).filter(
+        ShowCard.venue_id == venue.id, ShowCard.venue_name.is_distinct_from(venue.name)
+    ).update({ShowCard.venue_name: venue.name}, synchronize_session=False)
+
+
+def artist_changed(artist):
+    """Copy the name and image of artist to its cards."""
+    db.session.query(ShowCard).filter(
+        ShowCard.artist_id == artist.id, db.or_(
+            ShowCard.artist_name.is_distinct_from(artist.name),
+            ShowCard.artist_image_link.is_distinct_from(artist.image_link))
+    ).update({ShowCard.artist_name: artist.name,
+              ShowCard.artist_image_link: artist.image_link}, synchronize_session=False)
+
+
+def card_drift(limit=None):
+    """Compare the cards with the base tables and return the shows that drifted.
+
+    Each drifted row is (show_id, problem), problem being 'missing' (a show
+    without a card), 'orphaned' (a card without a show) or 'stale' (a card
+    whose fields differ). refresh_cards() fixes them.
+    """
+    expected = expected_cards().subquery()
+    card = ShowCard.__table__
+    problem = db.case(
+        (card.c.show_id.is_(None), 'missing'),
+        (expected.c.show_id.is_(None), 'orphaned'),
+        else_='stale')
+    drift = db.session.execute(db.select(
+        db.func.coalesce(card.c.show_id, expected.c.show_id), problem
+    ).select_from(card.join(expected, card.c.show_id == expected.c.show_id, full=True)).where(
+        db.or_(*[card.c[name].is_distinct_from(expected.c[name]) for name in CARD_COLUMNS])
+    ).order_by(db.func.coalesce(card.c.show_id, expected.c.show_id)).limit(limit)).all()
+    return drift
+
+
+def refresh_cards():
+    """Delete the cards that differ from the base tables and insert the
+    missing ones, with two set based statements; returns (deleted, inserted)."""
+    expected = expected_cards().subquery()
+    card = ShowCard.__table__
+    deleted = db.session.execute(card.delete().where(~db.exists().where(
+        expected.c.show_id == card.c.show_id, *[
+            expected.c[name].is_not_distinct_from(card.c[name]) for name in CARD_COLUMNS[1:]]))).rowcount
+    inserted = db.session.execute(insert(ShowCard).from_select(
+        CARD_COLUMNS, db.select(expected).where(~db.exists().where(
+            card.c.show_id == expected.c.show_id)))).rowcount
+    db.session.commit()
+    return deleted, inserted
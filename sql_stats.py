@@ -0,0 +1,140 @@
+from collections import Counter
+from contextlib import contextmanager
+import re
+import threading
+import time
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# Per-request SQL statistics.
+#----------------------------------------------------------------------------#
+# Engine events count the statements of each request and time them. The
+# totals go out as a Server-Timing header and a debug log line. Statements
+# are also grouped by shape (the SQL with its parameters collapsed), and a
+# shape that repeats more than SQL_REPEAT_LIMIT times in one request,
+# usually a query inside a loop, is logged or, with
+# SQL_REPEAT_ACTION = 'raise', fails the request.
+
+PARAMETER = re.compile(r'%\(\w+\)s|\$\d+|%s')
+PARAMETER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+
+
+class RepeatedStatementError(RuntimeError):
+    pass
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(statement):
+    """The shape of statement: its SQL with parameters and IN lists collapsed."""
+    return PARAMETER_LIST.sub('?', PARAMETER.sub('?', ' '.join(statement.split())))
+
+
+class RequestStats:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, seconds):
+        self.statements += 1
+        self.seconds += seconds
+        self.shapes[fingerprint(statement)] += 1
+
+    def repeated(self, limit):
+        """(shape, count) of the shapes run more than limit times."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > limit]
+
+
+_budgets = threading.local()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # on the execution context, which is dropped with a statement that
+    # raises, unlike conn.info which lives as long as the connection
+    context.sql_stats_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'sql_stats_started', None)
+    stats = g.get('sql_stats') if has_app_context() else None
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+class SQLStats:
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('SQL_STATS', True):
+            return
+        # class level, so the replica and async engines are counted too
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    @staticmethod
+    def _start():
+        g.sql_stats = RequestStats()
+
+    @staticmethod
+    def _finish(response):
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        response.headers.add('Server-Timing', 'db;dur={0:.1f};desc="{1} statements"'.format(
+            stats.seconds * 1e3, stats.statements))
+        response.headers.add('Server-Timing', 'app;dur={0:.1f}'.format(elapsed * 1e3))
+        current_app.logger.debug('%s %s: %d statements, %.1f ms in the database, %.1f ms total',
+                                 request.method, request.full_path, stats.statements,
+                                 stats.seconds * 1e3, elapsed * 1e3)
+        for budget in getattr(_budgets, 'active', ()):
+            budget.append((request.method, request.full_path, stats))
+
+        limit = current_app.config.get('SQL_REPEAT_LIMIT')
+        repeated = stats.repeated(limit) if limit else []
+        if repeated:
+            message = '{0} {1} ran the same statement {2} times: {3}'.format(
+                request.method, request.full_path, repeated[0][1], repeated[0][0])
+            if current_app.config.get('SQL_REPEAT_ACTION') == 'raise':
+                raise RepeatedStatementError(message)
+            current_app.logger.warning(message)
+        return response
+
+
+@contextmanager
+def query_budget(statements, repeats=None):
+    """Fail if a request served inside the block ran more than statements
+    statements, or one statement shape more than repeats times.
+
+        with query_budget(2):
+            client.get('/venues/1')
+    """
+    requests = []
+    active = _budgets.__dict__.setdefault('active', [])
+    active.append(requests)
+    try:
+        yield requests
+    finally:
+        active.remove(requests)
+    for method, path, stats in requests:
+        if stats.statements > statements:
+            raise QueryBudgetExceeded('{0} {1} ran {2} statements, the budget is {3}'.format(
+                method, path, stats.statements, statements))
+        over = stats.repeated(repeats) if repeats is not None else []
+        if over:
+            raise QueryBudgetExceeded('{0} {1} ran the same statement {2} times, the budget is {3}: {4}'.format(
+                method, path, over[0][1], repeats, over[0][0]))
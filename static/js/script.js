@@ -2,3 +2,32 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+document.addEventListener('DOMContentLoaded', function () {
+  var inputs = document.querySelectorAll('input[data-autocomplete]');
+  Array.prototype.forEach.call(inputs, function (input) {
+    var datalist = document.getElementById(input.getAttribute('list'));
+    var latest = 0;
+    input.addEventListener('input', function () {
+      var q = input.value.trim();
+      var request = ++latest;
+      if (!q) {
+        datalist.innerHTML = '';
+        return;
+      }
+      fetch('/api/autocomplete?type=' + input.dataset.autocomplete + '&q=' + encodeURIComponent(q))
+        .then(function (response) { return response.json(); })
+        .then(function (body) {
+          if (request !== latest) {
+            return;
+          }
+          datalist.innerHTML = '';
+          body.data.forEach(function (item) {
+            var option = document.createElement('option');
+            option.value = item.name;
+            datalist.appendChild(option);
+          });
+        });
+    });
+  });
+});
@@ -0,0 +1,127 @@
+import datetime
+import os
+
+import pytest
+
+#----------------------------------------------------------------------------#
+# Test database.
+#----------------------------------------------------------------------------#
+# The tests run the app against the Postgres database named by
+# FYYUR_TEST_DATABASE_URL, and are skipped when it is unset. The database is
+# wiped: its public schema is dropped and rebuilt by the migrations once per
+# run, and every test starts from empty tables.
+
+TEST_DATABASE_URL = os.environ.get('FYYUR_TEST_DATABASE_URL')
+if TEST_DATABASE_URL:
+    os.environ['FYYUR_DATABASE_URL'] = TEST_DATABASE_URL
+
+from app import app as fyyur_app, listing_facets
+from models import db, Venue, Artist, Show
+import areas
+import counters
+import show_cards
+import sql_stats
+
+TABLES = ['Show', 'ShowCard', 'Venue', 'Artist', 'Area', 'ImportCheckpoint']
+
+
+def migrate_database(app):
+    from flask_migrate import Migrate, stamp, upgrade
+    if 'migrate' not in app.extensions:
+        Migrate(app, db)
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('DROP SCHEMA public CASCADE')
+            connection.exec_driver_sql('CREATE SCHEMA public')
+        db.engine.dispose()
+        # the first two revisions both create the tables
+        stamp(revision='2f3c8058f0d1')
+        upgrade()
+
+
+@pytest.fixture(scope='session')
+def app():
+    if not TEST_DATABASE_URL:
+        pytest.skip('FYYUR_TEST_DATABASE_URL is not set')
+    fyyur_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    migrate_database(fyyur_app)
+    return fyyur_app
+
+
+def empty_tables(app):
+    with app.app_context():
+        db.session.execute(db.text('TRUNCATE {0} RESTART IDENTITY CASCADE'.format(
+            ', '.join('"{0}"'.format(table) for table in TABLES))))
+        db.session.commit()
+    listing_facets.clear()
+
+
+@pytest.fixture
+def database(app):
+    """Empty tables. Requests of the test client push an app context, and so
+    a session, of their own, so no context is kept open here."""
+    empty_tables(app)
+    return db
+
+
+@pytest.fixture
+def client(app, database):
+    return app.test_client()
+
+
+@pytest.fixture
+def query_budget(client):
+    """Make query_budget(path, statements, repeats=None, method='GET', ...):
+    request path and fail the test if it ran more than statements SQL
+    statements, or one statement shape more than repeats times. Returns
+    the response, with the request's RequestStats as response.sql_stats.
+
+        query_budget('/venues/1', 2)
+    """
+    def request(path, statements, repeats=None, method='GET', **kwargs):
+        with sql_stats.query_budget(statements, repeats) as requests:
+            response = client.open(path, method=method, **kwargs)
+        assert requests, '{0} {1} was not counted'.format(method, path)
+        response.sql_stats = requests[-1][2]
+        return response
+    return request
+
+
+@pytest.fixture
+def catalog(app, database):
+    """Make catalog(cities, venues_per_city, artists, shows_per_venue): a
+    catalog with half of every venue's shows past and half upcoming, its
+    counters, areas and show cards in place. Returns all the venues, artists
+    and shows, detached, by id."""
+    def make(cities=(('New York', 'NY'), ('San Francisco', 'CA')), venues_per_city=2,
+             artists=3, shows_per_venue=2):
+        with app.app_context():
+            return create(cities, venues_per_city, artists, shows_per_venue)
+
+    def create(cities, venues_per_city, artists, shows_per_venue):
+        venues = [Venue(name='Venue {0} {1}'.format(city, number), city=city, state=state,
+                        address='1 Main St', genres=['Jazz'], image_link='https://example.com/v.png')
+                  for city, state in cities for number in range(venues_per_city)]
+        performers = [Artist(name='Artist {0}'.format(number), city=cities[0][0], state=cities[0][1],
+                             genres=['Rock n Roll'], image_link='https://example.com/a.png')
+                      for number in range(artists)]
+        db.session.add_all(venues + performers)
+        db.session.flush()
+        now = datetime.datetime.now()
+        shows = []
+        for venue_number, venue in enumerate(venues):
+            for number in range(shows_per_venue):
+                start_time = now + datetime.timedelta(days=30 * (1 if number % 2 else -1) * (number + 1))
+                shows.append(Show(venue_id=venue.id,
+                                  artist_id=performers[(venue_number + number) % artists].id,
+                                  start_time=start_time, counted_as_past=start_time <= now))
+        db.session.add_all(shows)
+        db.session.commit()
+        for model in (Venue, Artist):
+            counters.counter_drift(model, fix=True)
+        areas.backfill()
+        show_cards.refresh_cards()
+        rows = [model.query.order_by(model.id).all() for model in (Venue, Artist, Show)]
+        db.session.expunge_all()
+        return rows
+    return make
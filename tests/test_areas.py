@@ -0,0 +1,51 @@
+import re
+
+import pytest
+
+from models import Area
+
+
+def area_page(client, path):
+    """(venue names, artist names, {(list, rel): href}) of an area page."""
+    page = client.get(path).get_data(as_text=True)
+    sections = page.split('<section>')[1:]
+    names = [re.findall(r'<h5>(.*?)</h5>', section) for section in sections]
+    links = {}
+    for name, section in zip(('venues', 'artists'), sections):
+        for rel, href in re.findall(r'<li class="(previous|next)"><a href="(.*?)"', section):
+            links[name, rel] = href.replace('&amp;', '&')
+    return names[0], names[1], links
+
+
+@pytest.fixture
+def new_york(app, catalog, monkeypatch):
+    catalog(venues_per_city=5, artists=5)
+    monkeypatch.setitem(app.config, 'PAGE_SIZE', 2)
+    with app.app_context():
+        return '/areas/{0}'.format(Area.query.filter_by(city='New York').one().id)
+
+
+def test_area_lists_page_independently(client, new_york):
+    venues, artists, links = area_page(client, new_york)
+    assert venues == ['Venue New York 0', 'Venue New York 1']
+    assert artists == ['Artist 0', 'Artist 1']
+    assert set(links) == {('venues', 'next'), ('artists', 'next')}
+
+    seen = venues
+    while ('venues', 'next') in links:
+        venues, page_artists, links = area_page(client, links['venues', 'next'])
+        seen += venues
+        # the artists stay on their first page
+        assert page_artists == artists
+    assert seen == ['Venue New York {0}'.format(number) for number in range(5)]
+
+    venues, artists, links = area_page(client, links['venues', 'previous'])
+    assert venues == ['Venue New York 2', 'Venue New York 3']
+    venues, artists, links = area_page(client, links['artists', 'next'])
+    assert venues == ['Venue New York 2', 'Venue New York 3']
+    assert artists == ['Artist 2', 'Artist 3']
+
+
+def test_area_page_statement_count(query_budget, new_york):
+    # the area, a page of venues and one of artists
+    assert query_budget(new_york, 3).status_code == 200
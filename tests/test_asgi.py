@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+import asgi
+from pagination import encode_cursor
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    """Log ('start'|'end', statement) around every query of the async views,
+    on an engine of the test's own event loop."""
+    events = []
+    monkeypatch.setattr(asgi, '_engine', None)
+    for name in ('fetch_one', 'fetch_all'):
+        def logged(statement, fetch=getattr(asgi, name)):
+            async def run():
+                events.append(('start', statement))
+                result = await fetch(statement)
+                events.append(('end', statement))
+                return result
+            return run()
+        monkeypatch.setattr(asgi, name, logged)
+    return events
+
+
+def run_view(app, path, view, headers=None, **kwargs):
+    async def run():
+        try:
+            with app.test_request_context(path, headers=headers):
+                return app.make_response(await view(**kwargs))
+        finally:
+            if asgi._engine is not None:
+                await asgi._engine.dispose()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('path, view, kwargs', [
+    ('/venues', asgi.venues, {}),
+    ('/artists', asgi.artists, {}),
+    ('/shows', asgi.shows, {}),
+    ('/venues/1', asgi.show_venue, {'venue_id': 1}),
+    ('/artists/1', asgi.show_artist, {'artist_id': 1}),
+])
+def test_etag_state_is_read_before_the_page(app, catalog, statements, path, view, kwargs):
+    catalog()
+    response = run_view(app, path, view, **kwargs)
+    assert response.status_code == 200 and response.headers['ETag']
+    # the state query ran to completion before any other started
+    (first, state), (second, ended) = statements[:2]
+    assert (first, second) == ('start', 'end') and ended is state
+    assert len(statements) > 2
+
+
+def test_not_modified_reads_only_the_state(app, catalog, statements):
+    catalog()
+    etag = run_view(app, '/venues', asgi.venues).headers['ETag']
+    del statements[:]
+    response = run_view(app, '/venues', asgi.venues, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert len(statements) == 2
+
+
+def test_facets_are_counted_once_per_listing_state(app, catalog, statements):
+    catalog()
+    run_view(app, '/artists', asgi.artists)
+    counted = len(statements)
+    del statements[:]
+    response = run_view(app, '/artists?after=' + encode_cursor(['Artist 0', 1]), asgi.artists)
+    assert response.status_code == 200
+    assert len(statements) == counted - 2
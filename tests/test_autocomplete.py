@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from models import db, Venue
+import autocomplete
+import app as app_module
+
+
+@pytest.fixture
+def indexes(monkeypatch):
+    """Fresh, unloaded indexes, like those of a new worker."""
+    for kind, index in autocomplete.indexes.items():
+        monkeypatch.setitem(autocomplete.indexes, kind, autocomplete.PrefixIndex(index.model))
+    return autocomplete.indexes
+
+
+def suggestions(client, prefix, kind='venue'):
+    response = client.get('/api/autocomplete', query_string={'type': kind, 'q': prefix})
+    return [match['name'] for match in response.get_json()['data']]
+
+
+def test_create_app_loads_the_indexes(app, catalog, indexes):
+    catalog()
+    app_module.create_app()
+    assert indexes['venue'].loaded and len(indexes['venue']) == 4
+    assert indexes['artist'].loaded and len(indexes['artist']) == 3
+
+
+def test_concurrent_first_lookups_load_once(app, client, catalog, indexes, monkeypatch):
+    catalog()
+    loads = []
+    load = autocomplete.PrefixIndex.load
+    monkeypatch.setattr(autocomplete.PrefixIndex, 'load',
+                        lambda self, rows: loads.append(self.model) or load(self, rows))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(suggestions(app.test_client(), 'venue new')))
+               for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loads == [Venue]
+    assert results == [['Venue New York 0', 'Venue New York 1']] * 8
+
+
+def test_changes_from_other_processes_show_up_after_the_interval(app, client, catalog, indexes,
+                                                                  monkeypatch):
+    catalog()
+    monkeypatch.setitem(app.config, 'AUTOCOMPLETE_CHECK_INTERVAL', 3600)
+    assert suggestions(client, 'imported') == []
+    # written behind the index's back, as by a bulk import
+    with app.app_context():
+        db.session.add(Venue(name='Imported Hall', city='New York', state='NY', genres=['Jazz']))
+        db.session.commit()
+    assert suggestions(client, 'imported') == []
+    monkeypatch.setitem(app.config, 'AUTOCOMPLETE_CHECK_INTERVAL', 0)
+    assert suggestions(client, 'imported') == ['Imported Hall']
+    # and a check that finds no change doesn't reload
+    monkeypatch.setattr(autocomplete.PrefixIndex, 'load', lambda self, rows: pytest.fail('reloaded'))
+    assert suggestions(client, 'imported') == ['Imported Hall']
+
+
+@pytest.fixture
+def checked_every_request(app, client, catalog, indexes, monkeypatch):
+    """A loaded venue index, checked on every lookup, that fails the test
+    if it is reloaded whole."""
+    catalog()
+    monkeypatch.setitem(app.config, 'AUTOCOMPLETE_CHECK_INTERVAL', 0)
+    assert suggestions(client, 'venue') == ['Venue New York 0', 'Venue New York 1',
+                                            'Venue San Francisco 0', 'Venue San Francisco 1']
+    monkeypatch.setattr(autocomplete.PrefixIndex, 'load', lambda self, rows: pytest.fail('reloaded'))
+
+
+def test_counter_updates_do_not_reload(app, client, checked_every_request):
+    client.post('/shows/create', data={'venue_id': 1, 'artist_id': 1, 'start_time': '2031-01-01 20:00:00'})
+    result = app.test_cli_runner().invoke(args=['fyyur', 'roll-over-shows'])
+    assert result.exit_code == 0
+    assert suggestions(client, 'venue new') == ['Venue New York 0', 'Venue New York 1']
+
+
+def test_renames_elsewhere_are_applied_in_place(app, client, checked_every_request):
+    with app.app_context():
+        db.session.execute(db.text('UPDATE "Venue" SET name = \'Renamed Hall\' WHERE id = 1'))
+        db.session.commit()
+    assert suggestions(client, 'venue new') == ['Venue New York 1']
+    assert suggestions(client, 'renamed') == ['Renamed Hall']
+
+
+def test_deletes_elsewhere_reload(app, client, catalog, indexes, monkeypatch):
+    catalog(shows_per_venue=0)
+    monkeypatch.setitem(app.config, 'AUTOCOMPLETE_CHECK_INTERVAL', 0)
+    assert len(suggestions(client, 'venue')) == 4
+    with app.app_context():
+        db.session.execute(db.text('DELETE FROM "Venue" WHERE id = 4'))
+        db.session.commit()
+    assert suggestions(client, 'venue') == ['Venue New York 0', 'Venue New York 1', 'Venue San Francisco 0']
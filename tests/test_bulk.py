@@ -0,0 +1,55 @@
+import json
+
+from models import db, Venue
+import bulk
+
+
+def venue_record(name, **fields):
+    return dict({'name': name, 'city': 'New York', 'state': 'NY', 'address': '1 Main St',
+                 'genres': 'Jazz'}, **fields)
+
+
+def import_venues(app, tmp_path, records, **kwargs):
+    path = tmp_path / 'venues.ndjson'
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+    with app.app_context():
+        result = bulk.import_file('venues', str(path), echo=lambda message: None, **kwargs)
+        names = dict(db.session.query(Venue.id, Venue.name).all())
+    rejects = [json.loads(line) for line in (tmp_path / 'venues.ndjson.rejects.ndjson').open()]
+    return result, names, rejects
+
+
+def test_chunk_mixing_partner_ids_and_new_rows(app, tmp_path, database):
+    result, names, rejects = import_venues(app, tmp_path, [
+        venue_record('New'), venue_record('Partner 10', id=10), venue_record('Newer'),
+        venue_record('Partner 12', id='12')])
+    assert result['inserted'] == 4 and not rejects
+    assert names[10] == 'Partner 10' and names[12] == 'Partner 12'
+    assert sorted(names.values()) == ['New', 'Newer', 'Partner 10', 'Partner 12']
+
+
+def test_taken_ids_are_rejected(app, tmp_path, catalog):
+    catalog()
+    result, names, rejects = import_venues(app, tmp_path, [
+        venue_record('Taken', id=1), venue_record('Partner 10', id=10),
+        venue_record('Repeated', id=10), venue_record('New')])
+    assert result['inserted'] == 2 and result['rejected'] == 2
+    assert [(reject['record'], reject['errors']) for reject in rejects] == [
+        (1, {'id': ['Id already taken.']}), (3, {'id': ['Id already taken.']})]
+    assert names[1] == 'Venue New York 0' and names[10] == 'Partner 10'
+
+
+def test_rows_the_database_refuses_are_rejected(app, tmp_path, catalog, monkeypatch):
+    catalog()
+    # as if venue 1 were taken between the check and the insert
+    monkeypatch.setattr(bulk, '_new_ids', lambda model, rows, rejects: rows)
+    result, names, rejects = import_venues(app, tmp_path, [
+        venue_record('First'), venue_record('Taken', id=1), venue_record('Last')])
+    assert result['inserted'] == 2
+    assert [reject['record'] for reject in rejects] == [2]
+    assert 'duplicate key' in rejects[0]['errors']['row'][0]
+    assert {'First', 'Last'} < set(names.values()) and names[1] == 'Venue New York 0'
+    with app.app_context():
+        # the area counts only the rows that went in
+        assert db.session.execute(db.text(
+            'SELECT venue_count FROM "Area" WHERE city = \'New York\'')).scalar() == 4
@@ -0,0 +1,54 @@
+import datetime
+
+import pytest
+from flask import template_rendered
+
+# the row (which also gives the ETag) and its past and upcoming shows
+DETAIL_STATEMENTS = 2
+
+
+def rendered_page(app, client, path, name):
+    rendered = []
+    with template_rendered.connected_to(lambda sender, template, context: rendered.append(context), app):
+        assert client.get(path).status_code == 200
+    return rendered[0][name]
+
+
+def test_venue_page_statement_count(query_budget, catalog):
+    venues, artists, shows = catalog(shows_per_venue=4)
+    response = query_budget('/venues/{0}'.format(venues[0].id), DETAIL_STATEMENTS, repeats=1)
+    assert response.status_code == 200
+
+
+def test_artist_page_statement_count(query_budget, catalog):
+    venues, artists, shows = catalog(shows_per_venue=4)
+    response = query_budget('/artists/{0}'.format(artists[0].id), DETAIL_STATEMENTS, repeats=1)
+    assert response.status_code == 200
+
+
+def test_venue_page_splits_past_and_upcoming_shows(app, client, catalog):
+    venues, artists, shows = catalog(shows_per_venue=4)
+    venue = rendered_page(app, client, '/venues/{0}'.format(venues[0].id), 'venue')
+    assert venue['past_shows_count'] == 2 and venue['upcoming_shows_count'] == 2
+    assert [show['start_time'] for show in venue['past_shows'] + venue['upcoming_shows']] == sorted(
+        show.start_time for show in shows if show.venue_id == venues[0].id)
+    assert set(venue['upcoming_shows'][0]) == {'artist_id', 'artist_name', 'artist_image_link', 'start_time'}
+
+
+def test_artist_page_splits_past_and_upcoming_shows(app, client, catalog):
+    venues, artists, shows = catalog(shows_per_venue=4)
+    artist = rendered_page(app, client, '/artists/{0}'.format(artists[0].id), 'artist')
+    own = sorted(show.start_time for show in shows if show.artist_id == artists[0].id)
+    assert [show['start_time'] for show in artist['past_shows'] + artist['upcoming_shows']] == own
+    now = datetime.datetime.now()
+    assert all(show['start_time'] <= now for show in artist['past_shows'])
+    assert all(show['start_time'] > now for show in artist['upcoming_shows'])
+    assert set(artist['past_shows'][0]) == {'venue_id', 'venue_name', 'venue_image_link', 'start_time'}
+
+
+@pytest.mark.parametrize('path', ['/venues/1', '/artists/1'])
+def test_delete_answers(client, catalog, path):
+    catalog()
+    assert client.delete(path).status_code == 302
+    assert client.get(path).status_code == 404
+    assert client.delete(path).status_code == 404
@@ -0,0 +1,122 @@
+import datetime
+
+from flask import template_rendered
+import pytest
+
+import app as app_module
+from models import db
+from page_cache import MemoryBackend
+
+
+@pytest.fixture
+def page_cache(monkeypatch):
+    monkeypatch.setattr(app_module.page_cache, 'backend', MemoryBackend())
+
+
+def rendered_venues(app, client):
+    """The venues of the /venues page by name, or None when it came from
+    the cache."""
+    rendered = []
+    with template_rendered.connected_to(lambda sender, template, context: rendered.append(context), app):
+        assert client.get('/venues').status_code == 200
+    if not rendered:
+        return None
+    return {venue['name']: venue['num_upcoming_shows']
+            for area in rendered[0]['areas'] for venue in area['venues']}
+
+
+def test_venues_page_is_cached(app, client, catalog, page_cache):
+    catalog()
+    assert rendered_venues(app, client) is not None
+    assert rendered_venues(app, client) is None
+
+
+def test_new_show_refreshes_the_venues_page(app, client, catalog, page_cache):
+    venues, artists, shows = catalog()
+    before = rendered_venues(app, client)
+    start_time = datetime.datetime.now() + datetime.timedelta(days=7)
+    client.post('/shows/create', data={'venue_id': venues[0].id, 'artist_id': artists[0].id,
+                                       'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S')})
+    after = rendered_venues(app, client)
+    assert after is not None
+    assert after[venues[0].name] == before[venues[0].name] + 1
+
+
+def test_rows_changed_behind_the_cache_are_rendered_again(app, client, catalog, page_cache):
+    venues, artists, shows = catalog()
+    path = '/venues/{0}'.format(venues[0].id)
+    before = client.get(path)
+    assert '1 Upcoming Show' in before.get_data(as_text=True)
+    # an upcoming show of the venue starts
+    with app.app_context():
+        db.session.execute(db.text(
+            'UPDATE "Show" SET start_time = now() - interval \'1 hour\' '
+            'WHERE venue_id = :venue_id AND NOT counted_as_past'), {'venue_id': venues[0].id})
+        db.session.commit()
+    # roll-over-shows moves it to the past, and the page must follow
+    # whether or not the cache tags were invalidated
+    result = app.test_cli_runner().invoke(args=['fyyur', 'roll-over-shows'])
+    assert '1 shows rolled over' in result.output
+    response = client.get(path, headers={'If-None-Match': before.headers['ETag']})
+    assert response.status_code == 200
+    assert '0 Upcoming Shows' in response.get_data(as_text=True)
+    assert response.headers['ETag'] != before.headers['ETag']
+
+
+def generations(tags):
+    return {tag: app_module.page_cache.backend.get('gen:' + tag) for tag in tags}
+
+
+def cache_some_pages(client, venues):
+    for path in ('/venues', '/artists', '/shows', '/venues/{0}'.format(venues[0].id)):
+        assert client.get(path).status_code == 200
+
+
+def test_roll_over_invalidates_the_rolled_rows(app, client, catalog, page_cache):
+    venues, artists, shows = catalog()
+    cache_some_pages(client, venues)
+    with app.app_context():
+        db.session.execute(db.text(
+            'UPDATE "Show" SET start_time = now() - interval \'1 hour\' '
+            'WHERE venue_id = :venue_id AND NOT counted_as_past'), {'venue_id': venues[0].id})
+        db.session.commit()
+    tags = ['venues', 'venue:{0}'.format(venues[0].id), 'venue:{0}'.format(venues[1].id)]
+    before = generations(tags)
+    app.test_cli_runner().invoke(args=['fyyur', 'roll-over-shows'])
+    after = generations(tags)
+    assert after['venues'] != before['venues']
+    assert after[tags[1]] != before[tags[1]]
+    # the venues without shows that started keep their pages
+    assert after[tags[2]] == before[tags[2]]
+
+
+@pytest.mark.parametrize('args, tag', [
+    (['verify-counters', '--fix'], 'venues'),
+    (['verify-areas', '--fix'], 'areas'),
+    (['verify-show-cards', '--fix'], 'shows'),
+])
+def test_fixes_invalidate_the_pages_they_change(app, client, catalog, page_cache, args, tag):
+    venues, artists, shows = catalog()
+    cache_some_pages(client, venues)
+    assert client.get('/areas').status_code == 200
+    with app.app_context():
+        # drift every counter, count and card
+        db.session.execute(db.text('UPDATE "Venue" SET upcoming_shows_count = 99'))
+        db.session.execute(db.text('UPDATE "Area" SET venue_count = 99'))
+        db.session.execute(db.text('DELETE FROM "ShowCard"'))
+        db.session.commit()
+    before = generations([tag])
+    result = app.test_cli_runner().invoke(args=['fyyur'] + args)
+    assert result.exit_code == 0, result.output
+    assert generations([tag]) != before
+
+
+def test_import_drops_every_cached_page(app, client, catalog, page_cache, tmp_path):
+    venues, artists, shows = catalog()
+    cache_some_pages(client, venues)
+    assert len(app_module.page_cache.backend)
+    path = tmp_path / 'venues.ndjson'
+    path.write_text('{"name": "Imported", "city": "New York", "state": "NY", "address": "1 Main St", "genres": "Jazz"}\n')
+    result = app.test_cli_runner().invoke(args=['fyyur', 'import', 'venues', str(path)])
+    assert '1 inserted' in result.output
+    assert len(app_module.page_cache.backend) == 0
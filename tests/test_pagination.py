@@ -0,0 +1,88 @@
+import base64
+import datetime
+import json
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Venue, ShowCard
+from pagination import decode_cursor, encode_cursor
+
+VENUE_COLUMNS = [Venue.name, Venue.id]
+
+
+def raw_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def test_decode_cursor_round_trips():
+    key = [datetime.datetime(2030, 1, 2, 20, 30), 7]
+    assert decode_cursor(encode_cursor(key), [ShowCard.start_time, ShowCard.show_id]) == key
+    assert decode_cursor(encode_cursor(['Venue', 3]), VENUE_COLUMNS) == ['Venue', 3]
+
+
+@pytest.mark.parametrize('cursor', [
+    raw_cursor(['Venue']),
+    raw_cursor(['Venue', 3, 4]),
+    raw_cursor([3, 'Venue']),
+    raw_cursor(['Venue', True]),
+    raw_cursor(['Venue', 2.5]),
+    raw_cursor(['Ven\x00ue', 3]),
+    raw_cursor({'name': 'Venue', 'id': 3}),
+    raw_cursor('Venue'),
+    raw_cursor([{'dt': '2030-01-02'}, 3]),
+    'not base64!',
+])
+def test_decode_cursor_rejects_keys_not_fitting_the_columns(cursor):
+    assert decode_cursor(cursor, VENUE_COLUMNS) is None
+
+
+def test_pages_ignore_invalid_cursors(client, catalog):
+    catalog()
+    first = client.get('/artists').get_data(as_text=True)
+    for cursor in (raw_cursor(['Artist 1']), raw_cursor([1, 'Artist 1'])):
+        response = client.get('/artists', query_string={'after': cursor})
+        assert response.status_code == 200
+        assert response.get_data(as_text=True) == first
+
+
+@pytest.mark.parametrize('path', ['/api/v1/venues', '/api/v1/artists', '/api/v1/areas', '/api/v1/shows'])
+def test_api_rejects_invalid_cursors(client, catalog, path):
+    catalog()
+    response = client.get(path, query_string={'after': raw_cursor(['x', 1, 2])})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor'}
+
+
+def test_api_follows_its_own_cursors(client, catalog):
+    catalog(venues_per_city=3)
+    page = client.get('/api/v1/venues', query_string={'limit': 4, 'fields': 'id'}).get_json()
+    rest = client.get('/api/v1/venues', query_string={'limit': 4, 'fields': 'id', 'after': page['next']})
+    assert rest.status_code == 200
+    assert len(page['data']) + len(rest.get_json()['data']) == 6
+
+
+@pytest.mark.parametrize('table, column', [
+    ('Venue', 'name'), ('Venue', 'city'), ('Venue', 'state'), ('Artist', 'name')])
+def test_keyset_columns_refuse_nulls(app, catalog, table, column):
+    # a row comparison with a NULL is never true: the row would be on no page
+    catalog()
+    with app.app_context():
+        with pytest.raises(IntegrityError):
+            db.session.execute(db.text('UPDATE "{0}" SET {1} = NULL'.format(table, column)))
+        db.session.rollback()
+
+
+def test_api_pages_reach_blank_names(app, client, catalog):
+    catalog(venues_per_city=3)
+    with app.app_context():
+        db.session.execute(db.text('''UPDATE "Venue" SET name = '' WHERE id IN (2, 5)'''))
+        db.session.commit()
+    ids, query = [], {'limit': 4, 'fields': 'id'}
+    while True:
+        page = client.get('/api/v1/venues', query_string=query).get_json()
+        ids += [venue['id'] for venue in page['data']]
+        if not page.get('next'):
+            break
+        query['after'] = page['next']
+    assert sorted(ids) == [1, 2, 3, 4, 5, 6]
@@ -0,0 +1,90 @@
+import datetime
+import logging
+
+import pytest
+
+from models import db, Show
+import partitions
+from tests.conftest import migrate_database
+
+
+@pytest.fixture
+def repartitioned(app):
+    """Rebuild the schema after the test, whose partition changes the
+    truncation between tests doesn't undo."""
+    yield
+    migrate_database(app)
+
+
+def show_counts():
+    return db.session.query(Show.venue_id, db.func.count()).group_by(Show.venue_id).order_by(
+        Show.venue_id).all()
+
+
+def test_archive_partitions_folds_ended_months(app, catalog, repartitioned, caplog, monkeypatch):
+    catalog(shows_per_venue=4)
+    now = datetime.datetime.now()
+    before = partitions.month_start(now)
+    with app.app_context():
+        counts = show_counts()
+        months, archived_until = partitions.partitions()
+        expected = Show.query.filter(Show.start_time >= archived_until, Show.start_time < before).count()
+
+        # Postgres reports skipping the scan of an attached table at DEBUG1;
+        # the psycopg2 dialect logs the notices it receives (to a logger
+        # the migrations' logging config disabled)
+        db.session.execute(db.text('SET client_min_messages = debug1'))
+        monkeypatch.setattr(logging.getLogger('sqlalchemy.dialects.postgresql'), 'disabled', False)
+        caplog.set_level(logging.INFO, logger='sqlalchemy.dialects.postgresql')
+        assert partitions.archive_partitions(before) == expected
+        assert 'partition constraint for table "Show_archive_new" is implied by existing constraints' \
+            in caplog.text
+        months, archived_until = partitions.partitions()
+        assert archived_until == before
+        assert min(months) == before
+        assert show_counts() == counts
+        # the bound was proven by a CHECK, and the indexes kept their names
+        constraints = db.session.execute(db.text(
+            "SELECT conname FROM pg_constraint WHERE conrelid = '\"Show_archive\"'::regclass "
+            "AND contype = 'c'")).scalars().all()
+        assert constraints == ['Show_archive_bound']
+        indexes = db.session.execute(db.text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = 'Show_archive'")).scalars().all()
+        assert 'Show_archive_pkey' in indexes
+        assert not [name for name in indexes if name.startswith(partitions.ARCHIVE_REWRITE)]
+
+        # a second fold swaps in a new archive the same way
+        later = partitions.add_months(before, 2)
+        partitions.create_partitions(1, now=later)
+        partitions.archive_partitions(partitions.add_months(before, 1), now=later)
+        assert partitions.partitions()[1] == partitions.add_months(before, 1)
+        assert show_counts() == counts
+
+
+def test_archive_partitions_rejects_months_not_ended(app, database):
+    with app.app_context(), pytest.raises(ValueError):
+        partitions.archive_partitions(datetime.datetime.now() + datetime.timedelta(days=62))
+
+
+def test_create_partitions_without_months_or_archive(app, catalog, repartitioned):
+    catalog()
+    with app.app_context():
+        months, archived_until = partitions.partitions()
+        for name in list(months.values()) + [partitions.ARCHIVE]:
+            db.session.execute(db.text('ALTER TABLE "Show" DETACH PARTITION "{0}"'.format(name)))
+            db.session.execute(db.text('DROP TABLE "{0}"'.format(name)))
+        db.session.commit()
+        assert partitions.partitions() == ({}, None)
+        counts = show_counts()
+
+        now = datetime.datetime.now()
+        current = partitions.month_start(now)
+        created = partitions.create_partitions(1, now=now)
+        assert created == [partitions.MONTH_NAME.format(current),
+                           partitions.MONTH_NAME.format(partitions.add_months(current, 1))]
+        assert sorted(partitions.partitions()[0]) == [current, partitions.add_months(current, 1)]
+        # the shows of those months moved out of the default partition
+        assert show_counts() == counts
+        assert not db.session.execute(db.text(
+            'SELECT count(*) FROM "Show_default" WHERE start_time >= :start AND start_time < :end'),
+            {'start': current, 'end': partitions.add_months(current, 2)}).scalar()
@@ -0,0 +1,113 @@
+import re
+
+import pytest
+import sqlalchemy as sa
+
+from models import db, Venue
+from replicas import ReplicaSet
+
+# Two stand-in replicas, copies of the test database that differ from it
+# and from each other by the name of venue 1, and a third URI whose
+# database doesn't exist, which fails its health check.
+STAND_INS = ['replica_a', 'replica_b']
+
+
+def venue_name(client):
+    page = client.get('/venues/1').get_data(as_text=True)
+    return re.search(r'<h1 class="monospace">\s*(.*?)\s*</h1>', page).group(1)
+
+
+@pytest.fixture
+def replicas(app, catalog, monkeypatch):
+    """Route the app's reads to the stand-ins; yields make(names) which
+    points it at the named ones ('missing' for the dead one)."""
+    catalog()
+    url = sa.engine.make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    names = {name: url.set(database='{0}_{1}'.format(url.database, name)) for name in STAND_INS + ['missing']}
+    with app.app_context():
+        # a template database must have no open connections
+        db.engine.dispose()
+    server = sa.create_engine(url.set(database='postgres'), isolation_level='AUTOCOMMIT')
+    with server.connect() as connection:
+        for name in STAND_INS:
+            connection.exec_driver_sql('DROP DATABASE IF EXISTS "{0}"'.format(names[name].database))
+            connection.exec_driver_sql('CREATE DATABASE "{0}" TEMPLATE "{1}"'.format(
+                names[name].database, url.database))
+    for name in STAND_INS:
+        stand_in = sa.create_engine(names[name])
+        with stand_in.begin() as connection:
+            connection.execute(sa.update(Venue.__table__).where(Venue.id == 1).values(name=name))
+        stand_in.dispose()
+
+    monkeypatch.setitem(app.config, 'REPLICA_CHECK_INTERVAL', 0)
+    monkeypatch.setitem(app.extensions, 'replicas', app.extensions['replicas'])
+    sets = []
+
+    def make(replica_names):
+        monkeypatch.setitem(app.config, 'SQLALCHEMY_REPLICA_URIS', [
+            names[name].render_as_string(hide_password=False) for name in replica_names])
+        sets.append(ReplicaSet(app))
+        return sets[-1]
+    yield make
+
+    for replica_set in sets:
+        for replica in replica_set.replicas:
+            replica.engine.dispose()
+    with server.connect() as connection:
+        for name in STAND_INS:
+            connection.exec_driver_sql('DROP DATABASE IF EXISTS "{0}"'.format(names[name].database))
+    server.dispose()
+
+
+def edit_venue(client, name):
+    return client.post('/venues/1/edit', data={
+        'name': name, 'city': 'New York', 'state': 'NY', 'address': '1 Main St', 'genres': ['Jazz'],
+        'phone': '', 'image_link': '', 'facebook_link': '', 'website_link': '',
+        'seeking_description': ''})
+
+
+def test_reads_round_robin_over_the_replicas(client, replicas):
+    replicas(STAND_INS)
+    names = [venue_name(client) for number in range(4)]
+    assert set(names) == set(STAND_INS)
+    assert names[0] != names[1] and names[:2] == names[2:]
+
+
+def test_unhealthy_replicas_are_skipped(client, replicas):
+    replica_set = replicas(['missing', 'replica_a'])
+    assert [venue_name(client) for number in range(3)] == ['replica_a'] * 3
+    assert [replica['healthy'] for replica in replica_set.stats()] == [False, True]
+
+
+def test_reads_fall_back_to_the_primary_without_healthy_replicas(client, replicas):
+    replicas(['missing'])
+    assert venue_name(client) == 'Venue New York 0'
+
+
+def test_writes_go_to_the_primary(app, client, replicas):
+    replicas(STAND_INS)
+    assert edit_venue(client, 'Edited').status_code == 302
+    with app.app_context():
+        assert db.session.get(Venue, 1).name == 'Edited'
+
+
+def test_browser_reads_its_writes_from_the_primary(client, replicas):
+    replicas(STAND_INS)
+    edit_venue(client, 'Edited')
+    # the replicas haven't got the edit
+    assert [venue_name(client) for number in range(2)] == ['Edited'] * 2
+    with client.session_transaction() as session:
+        session['read_primary_until'] = 0
+    assert venue_name(client) in STAND_INS
+
+
+def test_request_reads_from_the_primary_after_it_writes(app, replicas):
+    replicas(STAND_INS)
+    with app.test_request_context('/venues/1'):
+        read = db.session.get_bind(clause=sa.select(Venue.id))
+        assert read is not db.engine
+        venue = db.session.get(Venue, 1)
+        venue.seeking_description = 'Still here'
+        db.session.flush()
+        assert db.session.get_bind(clause=sa.select(Venue.id)) is db.engine
+        db.session.rollback()
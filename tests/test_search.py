@@ -0,0 +1,45 @@
+import re
+
+from flask import template_rendered
+
+
+def search(app, client, path, **form):
+    rendered = []
+    with template_rendered.connected_to(lambda sender, template, context: rendered.append(context), app):
+        response = client.post(path, data=form)
+    assert response.status_code == 200
+    return rendered[0], response.get_data(as_text=True)
+
+
+def test_search_filters_by_city_and_state(app, client, catalog):
+    catalog()
+    context, page = search(app, client, '/venues/search', search_term='venue', city='new  york', state='NY')
+    assert [venue['name'] for venue in context['results']['data']] == [
+        'Venue New York 0', 'Venue New York 1']
+    assert context['results']['count'] == 2
+    assert 'in new  york, NY: 2' in page
+    context, page = search(app, client, '/venues/search', search_term='venue', state='CA')
+    assert context['results']['count'] == 2
+    assert 'in CA: 2' in page
+
+
+def test_genre_filter_carries_the_city_and_state(app, client, catalog):
+    catalog()
+    context, page = search(app, client, '/artists/search', search_term='artist', city='New York', state='NY')
+    form = page[page.index('<form class="genre-facets"'):]
+    form = form[:form.index('</form>')]
+    assert re.search(r'name="search_term" value="artist"', form)
+    assert re.search(r'name="city" value="New York"', form)
+    assert re.search(r'<option value="NY" selected>', form)
+
+
+def test_count_is_of_every_match(app, client, catalog, monkeypatch):
+    catalog(venues_per_city=3)
+    monkeypatch.setitem(app.config, 'SEARCH_RESULTS_LIMIT', 2)
+    context, page = search(app, client, '/venues/search', search_term='venue')
+    assert context['results']['count'] == 6 and len(context['results']['data']) == 2
+    assert 'Showing the best 2.' in page
+    context, page = search(app, client, '/venues/search', search_term='venue', genre='Blues')
+    assert context['results']['count'] == 0
+    context, page = search(app, client, '/venues/search', search_term='venue', genre='Jazz')
+    assert context['results']['count'] == 6
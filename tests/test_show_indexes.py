@@ -0,0 +1,87 @@
+import datetime
+import json
+
+import pytest
+
+from models import db, Venue
+from queries import artist_shows_select, venue_shows_select
+from tests.conftest import empty_tables
+
+# Shows of the seeded table, spread over two years back and one ahead,
+# shared by VENUES venues and as many artists
+SHOWS = 1000000
+VENUES = 10000
+
+
+@pytest.fixture(scope='module')
+def million_shows(app):
+    empty_tables(app)
+    with app.app_context():
+        for table in ('Venue', 'Artist'):
+            db.session.execute(db.text(
+                "INSERT INTO \"{0}\" (name, city, state, genres) SELECT '{0} ' || i, 'Austin', 'TX', '{{}}' "
+                'FROM generate_series(1, :count) AS i'.format(table)), {'count': VENUES})
+        # plans of the foreign key checks cached while the tables were small
+        # would scan them for every show
+        db.session.execute(db.text('ANALYZE "Venue", "Artist"'))
+        db.session.execute(db.text('''
+            INSERT INTO "Show" (venue_id, artist_id, start_time, counted_as_past)
+            SELECT 1 + i % :venues, 1 + (i::bigint * 7919) % :venues, start_time, start_time <= now()
+            FROM generate_series(1, :shows) AS i,
+                 LATERAL (SELECT now()::timestamp - interval '730 days'
+                                 + (i * 7 % 1095) * interval '1 day' + (i % 24) * interval '1 hour'
+                          AS start_time) AS times'''), {'venues': VENUES, 'shows': SHOWS})
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE "Venue", "Artist", "Show"'))
+        db.session.commit()
+    yield
+    empty_tables(app)
+
+
+def plan_nodes(statement):
+    """The nodes of statement's plan, depth first."""
+    compiled = statement.compile(db.engine)
+    plan = db.session.connection().exec_driver_sql(
+        'EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes, pending = [], [plan[0]['Plan']]
+    while pending:
+        node = pending.pop()
+        nodes.append(node)
+        pending.extend(node.get('Plans', []))
+    return nodes
+
+
+# a bitmap heap scan reads the rows found by its Bitmap Index Scan child
+INDEX_SCANS = {'Index Scan', 'Index Only Scan', 'Bitmap Heap Scan'}
+
+
+def show_scans(nodes):
+    return [node['Node Type'] for node in nodes
+            if node.get('Relation Name', '').startswith('Show')]
+
+
+@pytest.mark.parametrize('shows_select', [venue_shows_select, artist_shows_select])
+def test_detail_page_shows_use_index_scans(app, million_shows, shows_select):
+    with app.app_context():
+        scans = show_scans(plan_nodes(shows_select(42, datetime.datetime.now())))
+    assert scans and set(scans) <= INDEX_SCANS, scans
+
+
+def test_shows_by_start_time_use_index_scans(app, million_shows):
+    now = datetime.datetime.now()
+    statement = db.select(db.text('id')).select_from(db.table('Show')).where(
+        db.column('start_time').between(now, now + datetime.timedelta(days=1)))
+    with app.app_context():
+        scans = show_scans(plan_nodes(statement))
+    assert scans and set(scans) <= INDEX_SCANS, scans
+
+
+def test_api_venue_order_uses_an_index(app, million_shows):
+    # /api/v1/venues pages by (name, id)
+    statement = db.select(Venue.id, Venue.name).order_by(Venue.name, Venue.id).limit(50)
+    with app.app_context():
+        nodes = plan_nodes(statement)
+    assert 'Sort' not in [node['Node Type'] for node in nodes]
+    assert {node.get('Index Name') for node in nodes} >= {'ix_Venue_name_id'}
@@ -0,0 +1,32 @@
+import pytest
+import sqlalchemy as sa
+
+from models import db
+import sql_stats
+
+
+def test_server_timing_header(client, catalog):
+    catalog()
+    timings = client.get('/venues').headers.getlist('Server-Timing')
+    assert timings[0].startswith('db;dur=') and timings[0].endswith('desc="3 statements"')
+    assert timings[1].startswith('app;dur=')
+
+
+def test_query_budget_fails_over_budget(query_budget, catalog):
+    catalog()
+    with pytest.raises(sql_stats.QueryBudgetExceeded, match='ran 3 statements, the budget is 2'):
+        query_budget('/venues', 2)
+
+
+def test_failed_statements_leave_no_state_on_the_connection(app, database):
+    with app.test_request_context('/'):
+        app.preprocess_request()
+        with db.engine.connect() as connection:
+            for number in range(3):
+                with pytest.raises(sa.exc.DBAPIError):
+                    connection.exec_driver_sql('SELECT 1 / 0')
+                connection.rollback()
+            connection.exec_driver_sql('SELECT 1')
+            assert not [key for key in connection.info if key.startswith('sql_stats')]
+        # only the statement that ran to completion was counted
+        assert sql_stats.g.sql_stats.statements == 1
@@ -0,0 +1,55 @@
+import tracemalloc
+
+import pytest
+
+from models import db
+
+
+def add_show_cards(app, count, first=1):
+    """count more cards on /shows, show ids from first on and a minute
+    apart, for the catalog's first venue and artist."""
+    with app.app_context():
+        db.session.execute(db.text('''
+            INSERT INTO "ShowCard" (show_id, start_time, venue_id, venue_name, artist_id,
+                                    artist_name, artist_image_link)
+            SELECT i, now()::timestamp + i * interval '1 minute', 1, 'Venue ' || i, 1,
+                   'Artist ' || i, 'https://example.com/a.png'
+            FROM generate_series(:first, :first + :count - 1) AS i'''),
+            {'first': first, 'count': count})
+        db.session.commit()
+
+
+def streamed_peak(client, path):
+    """(bytes, peak traced memory) of reading the response of path."""
+    tracemalloc.start()
+    try:
+        response = client.get(path, buffered=False)
+        size = sum(len(chunk) for chunk in response.response)
+        response.close()
+        return size, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture
+def streamed_shows(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'STREAMED_ROUTES', {'shows'})
+    monkeypatch.setitem(app.config, 'STREAM_BATCH_SIZE', 500)
+
+
+def test_streamed_shows_lists_every_show(app, client, catalog, streamed_shows):
+    catalog(shows_per_venue=0)
+    add_show_cards(app, 1200)
+    page = client.get('/shows').get_data(as_text=True)
+    assert page.count('href="/venues/1"') == 1200
+
+
+def test_streamed_shows_memory_stays_flat(app, client, catalog, streamed_shows):
+    catalog(shows_per_venue=0)
+    add_show_cards(app, 5000)
+    small_size, small_peak = streamed_peak(client, '/shows')
+    # ten times the rows, read in the same batches
+    add_show_cards(app, 45000, first=5001)
+    large_size, large_peak = streamed_peak(client, '/shows')
+    assert large_size > 9 * small_size
+    assert large_peak < 1.5 * small_peak, (small_peak, large_peak)
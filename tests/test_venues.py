@@ -0,0 +1,54 @@
+from flask import template_rendered
+
+from models import db, Venue
+from pagination import encode_cursor
+
+# /venues: the keyset page of venues with their areas and counters, the
+# genre facet counts (once per listing state) and, for the ETag, the
+# listing state. One statement each, however many venues and areas there are.
+VENUES_STATEMENTS = 3
+
+
+def test_venues_statement_count(query_budget, catalog):
+    catalog(cities=[('City {0}'.format(number), 'NY') for number in range(20)],
+            venues_per_city=2, shows_per_venue=4)
+    response = query_budget('/venues', VENUES_STATEMENTS, repeats=1)
+    assert response.status_code == 200
+    assert response.sql_stats.statements == VENUES_STATEMENTS
+
+
+def test_venues_statement_count_is_independent_of_areas(query_budget, catalog):
+    catalog(cities=[('City {0}'.format(number), 'NY') for number in range(2)], venues_per_city=1)
+    small = query_budget('/venues', VENUES_STATEMENTS, repeats=1).sql_stats
+    catalog(cities=[('Town {0}'.format(number), 'CA') for number in range(40)], venues_per_city=1)
+    large = query_budget('/venues', VENUES_STATEMENTS, repeats=1).sql_stats
+    assert small.statements == large.statements
+
+
+def test_later_pages_reuse_the_facet_counts(app, query_budget, catalog):
+    catalog()
+    after = encode_cursor(['New York', 'NY', 'Venue New York 0', 1])
+    query_budget('/venues', VENUES_STATEMENTS, repeats=1)
+    # the facets of this listing state are counted already
+    response = query_budget('/venues?after=' + after, VENUES_STATEMENTS - 1, repeats=1)
+    assert response.status_code == 200
+    with app.app_context():
+        db.session.add(Venue(name='Venue Boston', city='Boston', state='MA', address='1 Main St',
+                             genres=['Jazz']))
+        db.session.commit()
+    response = query_budget('/venues?after=' + after, VENUES_STATEMENTS, repeats=1)
+    assert response.sql_stats.statements == VENUES_STATEMENTS
+
+
+def test_venues_groups_venues_by_area(app, client, catalog):
+    catalog(cities=[('New York', 'NY'), ('San Francisco', 'CA')], venues_per_city=2, shows_per_venue=2)
+    rendered = []
+    with template_rendered.connected_to(lambda sender, template, context: rendered.append(context), app):
+        client.get('/venues')
+    assert [(area['city'], area['state'], [venue['name'] for venue in area['venues']])
+            for area in rendered[0]['areas']] == [
+        ('New York', 'NY', ['Venue New York 0', 'Venue New York 1']),
+        ('San Francisco', 'CA', ['Venue San Francisco 0', 'Venue San Francisco 1']),
+    ]
+    # each venue has one past and one upcoming show
+    assert {venue['num_upcoming_shows'] for area in rendered[0]['areas'] for venue in area['venues']} == {1}